@@ -1,7 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 from PyInstaller.utils.hooks import collect_submodules
 
-hiddenimports = ['playwright', 'playwright.sync_api', 'playwright._impl._driver', 'playwright.async_api']
+hiddenimports = ['playwright', 'playwright.sync_api', 'playwright._impl._driver', 'playwright.async_api', 'aiosqlite']
 hiddenimports += collect_submodules('src')
 
 
@@ -9,10 +9,13 @@ from PyQt6.QtWidgets import (QApplication, QHBoxLayout, QMainWindow,
 
 from src.config.config import Config
 from src.core.browser import BrowserThread
+from src.core.http_client import http_client
+from src.core.image_preprocess import image_preprocessor
 from src.core.pages.home import HomePage
 from src.core.pages.setting import SettingsPage
 from src.core.pages.tools import ToolsPage
 from src.core.pages.user_management import UserManagementPage
+from src.cron.cron_base import ScheduleTaskManager
 from src.logger.logger import Logger
 
 # 设置日志文件路径
@@ -195,8 +198,15 @@ class XiaohongshuUI(QMainWindow):
             self.home_page.handle_preview_result)
         self.browser_thread.preview_error.connect(
             self.home_page.handle_preview_error)
+        self.browser_thread.publish_success.connect(
+            self.home_page.handle_publish_success)
+        self.browser_thread.publish_error.connect(
+            self.home_page.handle_publish_error)
         self.browser_thread.start()
         
+        # 启动定时发布调度
+        self.schedule_manager = ScheduleTaskManager(self)
+        
         # 启动下载器线程
         self.start_downloader_thread()
 
@@ -247,6 +257,9 @@ class XiaohongshuUI(QMainWindow):
         print("关闭应用")
         try:
             # 停止所有线程
+            if hasattr(self, 'schedule_manager'):
+                self.schedule_manager.stop()
+
             if hasattr(self, 'browser_thread'):
                 self.browser_thread.stop()
                 self.browser_thread.wait(1000)  # 等待最多1秒
@@ -254,6 +267,10 @@ class XiaohongshuUI(QMainWindow):
                     self.browser_thread.terminate()  # 强制终止
                     self.browser_thread.wait()  # 等待终止完成
 
+            # 取消批量下载，已下载的部分保留为 .part，下次从断点继续
+            if hasattr(self, 'tools_page'):
+                self.tools_page.cancel_batch_download(wait_ms=3000)
+
             if hasattr(self, 'generator_thread') and self.generator_thread.isRunning():
                 self.generator_thread.terminate()
                 self.generator_thread.wait()
@@ -268,6 +285,9 @@ class XiaohongshuUI(QMainWindow):
             self.current_image_index = 0
             # 关闭本机8000端口
             self.stop_downloader()
+            # 关闭共享HTTP连接池和图片预处理进程池
+            http_client.close()
+            image_preprocessor.close()
             # 调用父类的closeEvent
             super().closeEvent(event)
 
@@ -1,48 +1,84 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from typing import Generator
+from sqlalchemy.pool import QueuePool
+from typing import Generator, Optional
 
 # 数据库基类
 Base = declarative_base()
 
+# 每个连接建立时执行的SQLite参数
+# WAL 模式下读写互不阻塞，synchronous=NORMAL 在 WAL 下仍能保证断电后数据库一致
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,       # 负数单位为KB，约20MB页缓存
+    'mmap_size': 268435456,     # 256MB 内存映射读
+    'temp_store': 'MEMORY',
+    'busy_timeout': 30000,      # 写锁等待上限（毫秒）
+}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """连接建立时设置SQLite参数"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
 class DatabaseManager:
-    """数据库管理器"""
-    
-    def __init__(self):
-        # 获取用户主目录
-        home_dir = os.path.expanduser('~')
-        # 创建应用配置目录
-        app_config_dir = os.path.join(home_dir, '.xhs_system')
-        if not os.path.exists(app_config_dir):
-            os.makedirs(app_config_dir)
-        
-        # 数据库文件路径
-        self.db_path = os.path.join(app_config_dir, 'xhs_data.db')
-        
+    """数据库管理器
+
+    使用连接池：每个线程/会话检出自己的连接，GUI、Web、发布工作者之间不再共用同一个连接；
+    连接统一开启 WAL 并设置缓存、内存映射等参数。
+    安装了 aiosqlite 时可通过 get_async_session() 在事件循环中使用异步会话。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            # 获取用户主目录
+            home_dir = os.path.expanduser('~')
+            # 创建应用配置目录
+            app_config_dir = os.path.join(home_dir, '.xhs_system')
+            if not os.path.exists(app_config_dir):
+                os.makedirs(app_config_dir)
+
+            # 数据库文件路径
+            db_path = os.path.join(app_config_dir, 'xhs_data.db')
+        self.db_path = db_path
+
         # 创建数据库引擎
         self.engine = create_engine(
             f"sqlite:///{self.db_path}",
-            poolclass=StaticPool,
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
             connect_args={
+                # 连接归还后可能被其他线程检出，同一时间仍只有一个线程使用
                 "check_same_thread": False,
                 "timeout": 30
             },
             echo=False  # 设置为True可以看到SQL语句
         )
-        
+        event.listen(self.engine, "connect", _apply_sqlite_pragmas)
+
         # 创建会话工厂
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
             bind=self.engine
         )
-        
+
+        self._async_engine = None
+        self.AsyncSessionLocal = None
+
         # 创建所有表
         self.create_tables()
-    
+
     def create_tables(self):
         """创建数据库表"""
         try:
@@ -50,7 +86,7 @@ class DatabaseManager:
             print("数据库表创建成功")
         except Exception as e:
             print(f"创建数据库表失败: {str(e)}")
-    
+
     def get_session(self) -> Generator:
         """获取数据库会话"""
         session = self.SessionLocal()
@@ -58,15 +94,113 @@ class DatabaseManager:
             yield session
         finally:
             session.close()
-    
+
     def get_session_direct(self):
         """直接获取数据库会话（需要手动关闭）"""
         return self.SessionLocal()
 
+    @property
+    def async_available(self) -> bool:
+        """是否可以使用异步引擎（需要安装 aiosqlite）"""
+        try:
+            import aiosqlite  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def get_async_engine(self):
+        """获取异步引擎（基于 aiosqlite，首次调用时创建）"""
+        if self._async_engine is None:
+            if not self.async_available:
+                raise RuntimeError("未安装 aiosqlite，无法使用异步数据库引擎")
+
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            self._async_engine = create_async_engine(
+                f"sqlite+aiosqlite:///{self.db_path}",
+                connect_args={"timeout": 30},
+                echo=False
+            )
+            event.listen(self._async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+            self.AsyncSessionLocal = async_sessionmaker(self._async_engine, expire_on_commit=False)
+        return self._async_engine
+
+    def get_async_session(self):
+        """获取异步会话（async with db_manager.get_async_session() as session: ...）"""
+        self.get_async_engine()
+        return self.AsyncSessionLocal()
+
+    async def dispose_async(self):
+        """关闭异步引擎的连接"""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
+            self.AsyncSessionLocal = None
+
 # 全局数据库管理器实例
 db_manager = DatabaseManager()
 
 # 便捷函数
 def get_db():
     """获取数据库会话的便捷函数"""
-    return next(db_manager.get_session()) 
\ No newline at end of file
+    return next(db_manager.get_session())
+
+
+if __name__ == "__main__":
+    # 并发读写基准测试: python -m src.config.database [线程数] [每线程操作数]
+    import sys
+    import tempfile
+    import threading
+    import time
+    from sqlalchemy import text
+    from sqlalchemy.pool import StaticPool
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    def legacy_engine(path):
+        """调整前的配置：所有线程共用一个连接，默认日志模式"""
+        return create_engine(
+            f"sqlite:///{path}",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+
+    def tuned_engine(path):
+        return DatabaseManager(path).engine
+
+    def run(name, make_engine):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            engine = make_engine(os.path.join(temp_dir, 'bench.db'))
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE IF NOT EXISTS bench (id INTEGER PRIMARY KEY, value TEXT)"))
+            errors = []
+
+            def worker(index):
+                try:
+                    for i in range(operations):
+                        with engine.begin() as conn:
+                            if i % 4 == 0:
+                                conn.execute(text("INSERT INTO bench (value) VALUES (:v)"), {'v': f"{index}-{i}"})
+                            else:
+                                conn.execute(text("SELECT COUNT(*) FROM bench")).scalar()
+                except Exception as e:
+                    errors.append(str(e))
+
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            elapsed = time.perf_counter() - started
+            engine.dispose()
+
+            total = threads * operations
+            print(f"{name}: {total} 次操作 / {elapsed:.2f}s = {total / elapsed:.0f} ops/s, 错误 {len(errors)}")
+            for error in errors[:3]:
+                print(f"  {error}")
+
+    print(f"线程数 {threads}，每线程 {operations} 次操作（25% 写入，75% 读取）")
+    run("调整前 (StaticPool, 默认日志模式)", legacy_engine)
+    run("调整后 (连接池, WAL)", tuned_engine)
@@ -2,11 +2,81 @@ import asyncio
 import json
 import os
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pathlib import Path
 
 from .logger import logger
 from .config import config
+from .session_store import session_store, valid_auth_cookies
+
+
+class LoginStateCache:
+    """登录状态缓存
+
+    状态来源：
+    - cookies 的过期时间：缓存有效期不会超过登录cookie的过期时间
+    - 被动观察：页面每次导航到小红书域名时根据URL更新状态
+    - 轻量探测：检查上下文中是否有未过期的登录cookie，不驱动页面导航
+      （创作者中心由前端路由跳转登录页，直接请求页面无法看到跳转，页面导航由被动观察负责）
+
+    读取缓存（is_fresh / logged_in）不访问浏览器。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.logged_in: Optional[bool] = None
+        self.user_info: Optional[Dict[str, Any]] = None
+        self.source: Optional[str] = None
+        self.checked_at: float = 0
+        self.expires_at: float = 0
+        self.cookie_expires_at: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        """缓存是否仍然有效"""
+        return self.logged_in is not None and time.time() < self.expires_at
+
+    def set(self, logged_in: bool, source: str) -> None:
+        """更新状态，有效期受登录cookie过期时间约束"""
+        now = time.time()
+        if logged_in != self.logged_in:
+            self.user_info = None
+        self.logged_in = logged_in
+        self.source = source
+        self.checked_at = now
+        self.expires_at = now + self.ttl
+        if logged_in and self.cookie_expires_at:
+            self.expires_at = min(self.expires_at, self.cookie_expires_at)
+
+    def invalidate(self) -> None:
+        """使缓存失效，下次读取时重新探测"""
+        self.expires_at = 0
+
+    def observe_cookies(self, cookies: List[Dict[str, Any]]) -> Optional[bool]:
+        """根据cookies更新过期时间
+
+        Returns:
+            Optional[bool]: 没有未过期的登录cookie时返回False，其余情况无法仅凭cookie判断，返回None
+        """
+        auth_cookies = valid_auth_cookies(cookies)
+        if not auth_cookies:
+            self.cookie_expires_at = None
+            return False
+
+        # expires 为 -1 表示会话cookie，不限制有效期
+        expires = [c['expires'] for c in auth_cookies if c.get('expires', -1) > 0]
+        self.cookie_expires_at = min(expires) if expires else None
+        if self.cookie_expires_at and self.logged_in:
+            self.expires_at = min(self.expires_at, self.cookie_expires_at)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'logged_in': self.logged_in,
+            'source': self.source,
+            'checked_at': self.checked_at,
+            'expires_at': self.expires_at,
+            'cookie_expires_at': self.cookie_expires_at
+        }
 
 
 class AuthManager:
@@ -17,6 +87,10 @@ class AuthManager:
         self.token_file = None
         self.cookies_file = None
         self.token = None
+        self.login_state = LoginStateCache(config.xiaohongshu.login_state_ttl / 1000)
+        self._observed_page = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
         self._setup_storage()
     
     def _setup_storage(self):
@@ -32,10 +106,27 @@ class AuthManager:
         self.browser_manager = browser_manager
         self.token = self._load_token()
         await self._load_cookies()
+        self._observe_page()
+
+        # 预先填充登录状态缓存，/api/status 首次读取时即有结果
+        if not self.login_state.is_fresh() and self.browser_manager.context:
+            try:
+                await self._probe_login_state()
+            except Exception as e:
+                logger.debug(f"初始登录状态探测失败: {str(e)}")
+        
+        probe_interval = config.xiaohongshu.login_probe_interval / 1000
+        if probe_interval > 0 and self._probe_task is None:
+            self._probe_task = asyncio.ensure_future(self._probe_loop(probe_interval))
         logger.info("认证管理器初始化完成")
     
     async def cleanup(self):
         """清理资源"""
+        for task in (self._probe_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+        self._probe_task = None
+        self._refresh_task = None
         await self._save_cookies()
         logger.info("认证管理器清理完成")
     
@@ -78,42 +169,32 @@ class AuthManager:
             logger.error(f"保存token失败: {str(e)}")
     
     async def _load_cookies(self):
-        """从文件加载cookies"""
-        if not self.cookies_file.exists():
-            return
+        """恢复会话
         
+        浏览器池创建上下文时已从会话快照恢复；旧版cookies文件在首次启动时导入快照并加载。
+        快照在有效期内时直接视为已登录，无需访问网络。
+        """
+        key = self.browser_manager.context_key
         try:
-            with open(self.cookies_file, 'r', encoding='utf-8') as f:
-                cookies = json.load(f)
-            
-            # 确保cookies包含必要的字段
-            for cookie in cookies:
-                if 'domain' not in cookie:
-                    cookie['domain'] = '.xiaohongshu.com'
-                if 'path' not in cookie:
-                    cookie['path'] = '/'
-            
-            await self.browser_manager.context.add_cookies(cookies)
-            logger.info(f"已加载 {len(cookies)} 个cookies")
-            
+            if session_store.import_cookies_file(key, self.cookies_file):
+                cookies = session_store.get_storage_state(key)['cookies']
+                await self.browser_manager.context.add_cookies(cookies)
+                logger.info(f"已加载 {len(cookies)} 个cookies")
         except Exception as e:
             logger.error(f"加载cookies失败: {str(e)}")
+        
+        if session_store.is_valid(key):
+            self.login_state.cookie_expires_at = session_store.expires_at(key)
+            self.login_state.set(True, 'snapshot')
+        else:
+            self.login_state.invalidate()
     
     async def _save_cookies(self):
-        """保存cookies到文件"""
+        """保存会话快照"""
         if not self.browser_manager or not self.browser_manager.context:
             return
         
-        try:
-            cookies = await self.browser_manager.context.cookies()
-            
-            with open(self.cookies_file, 'w', encoding='utf-8') as f:
-                json.dump(cookies, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"已保存 {len(cookies)} 个cookies")
-            
-        except Exception as e:
-            logger.error(f"保存cookies失败: {str(e)}")
+        await session_store.save(self.browser_manager.context_key, self.browser_manager.context)
     
     async def login(self, phone: str, country_code: str = "+86") -> bool:
         """登录小红书
@@ -136,6 +217,7 @@ class AuthManager:
             
             # 这里不实际执行登录，因为登录逻辑在Web API中处理
             # 这个方法主要用于保存登录状态
+            self.login_state.invalidate()
             return True
             
         except Exception as e:
@@ -152,9 +234,11 @@ class AuthManager:
             # 检查是否已经登录
             current_url = self.browser_manager.page.url
             if "login" not in current_url:
+                self.login_state.set(True, 'navigation')
                 logger.info("cookies登录成功")
                 return True
             else:
+                self.login_state.set(False, 'navigation')
                 logger.info("cookies登录失败")
                 return False
                 
@@ -162,26 +246,83 @@ class AuthManager:
             logger.error(f"cookies登录尝试失败: {str(e)}")
             return False
     
-    async def is_logged_in(self) -> bool:
-        """检查是否已登录"""
+    def _observe_page(self):
+        """监听页面导航，被动更新登录状态"""
+        page = self.browser_manager.page if self.browser_manager else None
+        if not page or page is self._observed_page:
+            return
+        
+        def on_navigated(frame):
+            if frame is not page.main_frame or "xiaohongshu.com" not in frame.url:
+                return
+            self.login_state.set("login" not in frame.url, 'navigation')
+        
+        page.on("framenavigated", on_navigated)
+        self._observed_page = page
+    
+    async def _probe_login_state(self) -> bool:
+        """轻量探测登录状态：检查登录cookie，再参考当前页面URL（不导航页面）"""
+        context = self.browser_manager.context
+        
+        if self.login_state.observe_cookies(await context.cookies()) is False:
+            self.login_state.set(False, 'cookies')
+            return False
+        
+        # 登录cookie仍在但服务端会话已失效时，页面会被前端路由跳转到登录页，以页面为准
+        current_url = self.browser_manager.page.url if self.browser_manager.page else ""
+        if "xiaohongshu.com" in current_url and "login" in current_url:
+            self.login_state.set(False, 'page_url')
+        else:
+            self.login_state.set(True, 'cookies')
+        
+        logger.debug(f"登录状态检查: {self.login_state.logged_in} ({self.login_state.source})")
+        return self.login_state.logged_in
+    
+    async def _probe_loop(self, interval: float):
+        """后台定期探测登录状态"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.browser_manager or not self.browser_manager.context:
+                continue
+            try:
+                await self._probe_login_state()
+            except Exception as e:
+                logger.debug(f"后台登录状态探测失败: {str(e)}")
+    
+    def get_cached_login_state(self) -> Optional[bool]:
+        """立即返回缓存的登录状态（不访问浏览器），缓存过期时在后台刷新
+        
+        Returns:
+            Optional[bool]: 登录状态，从未检查过时为None
+        """
+        if not self.login_state.is_fresh() and self.browser_manager and self.browser_manager.context:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.ensure_future(self._background_refresh())
+        return self.login_state.logged_in
+    
+    async def _background_refresh(self):
+        try:
+            await self.is_logged_in()
+            if self.login_state.logged_in:
+                await self.get_user_info()
+        except Exception as e:
+            logger.debug(f"刷新登录状态失败: {str(e)}")
+    
+    async def is_logged_in(self, force: bool = False) -> bool:
+        """检查是否已登录（缓存有效时直接返回）
+        
+        Args:
+            force: 忽略缓存重新探测
+        """
         if not self.browser_manager or not self.browser_manager.page:
             return False
         
+        self._observe_page()
+        if not force and self.login_state.is_fresh():
+            return self.login_state.logged_in
+        
         try:
-            current_url = self.browser_manager.page.url
-            
-            # 如果当前不在小红书域名，先导航过去
-            if "xiaohongshu.com" not in current_url:
-                await self.browser_manager.page.goto(config.xiaohongshu.base_url, wait_until="networkidle")
-                await asyncio.sleep(2)
-                current_url = self.browser_manager.page.url
-            
-            # 检查URL是否包含login，如果不包含说明已登录
-            is_logged_in = "login" not in current_url
-            logger.debug(f"登录状态检查: {is_logged_in}, URL: {current_url}")
-            
-            return is_logged_in
-            
+            return await self._probe_login_state()
         except Exception as e:
             logger.error(f"检查登录状态失败: {str(e)}")
             return False
@@ -191,6 +332,10 @@ class AuthManager:
         if not await self.is_logged_in():
             return None
         
+        # 用户信息与登录状态一同缓存，状态变化时清空
+        if self.login_state.user_info is not None:
+            return self.login_state.user_info
+        
         try:
             # 尝试从页面获取用户信息
             user_info = await self.browser_manager.page.evaluate("""
@@ -207,6 +352,7 @@ class AuthManager:
                 }
             """)
             
+            self.login_state.user_info = user_info
             return user_info
             
         except Exception as e:
@@ -227,7 +373,11 @@ class AuthManager:
             if self.cookies_file.exists():
                 self.cookies_file.unlink()
             
+            if self.browser_manager:
+                session_store.delete(self.browser_manager.context_key)
+            
             self.token = None
+            self.login_state.set(False, 'logout')
             logger.info("已登出")
             return True
             
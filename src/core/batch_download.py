@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .logger import logger
+from .config import config
+from .http_client import http_client
+
+
+@dataclass
+class DownloadItem:
+    """一个待下载的文件"""
+    url: str
+    path: str
+    # 已知的文件大小/SHA-256，用于判断本地文件是否已完整（未提供时用服务器返回的大小判断）
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+
+
+@dataclass
+class DownloadResult:
+    """单个文件的下载结果"""
+    url: str
+    path: str
+    # downloaded / resumed / skipped / failed
+    status: str
+    size: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class DownloadProgress:
+    """批量下载的整体进度"""
+    total: int
+    completed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # 本次实际下载的字节数（不含续传前已有的部分）
+    bytes_downloaded: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def finished(self) -> int:
+        return self.completed + self.skipped + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started_at, 1e-6)
+
+    @property
+    def throughput(self) -> float:
+        """平均下载速度（字节/秒）"""
+        return self.bytes_downloaded / self.elapsed
+
+    def summary(self) -> str:
+        return (f"{self.finished}/{self.total} "
+                f"(跳过 {self.skipped}，失败 {self.failed})，"
+                f"{self.bytes_downloaded / 1024 / 1024:.1f}MB，"
+                f"{self.throughput / 1024 / 1024:.2f}MB/s")
+
+
+class BatchDownloader:
+    """批量下载引擎
+
+    - 并发下载（并发数 config.http.download_concurrency），同一主机的连接数仍受 max_per_host 限制
+    - 响应体按块流式写入 <文件名>.part，完整后原子重命名，内存占用与文件大小无关
+    - 中断或失败后保留 .part，重试或下次下载时用 Range 请求从断点继续；
+      .part.json 记录 .part 对应的URL和 ETag/Last-Modified，续传时带 If-Range，
+      URL不同、没有校验值或服务器上的文件已变化时丢弃 .part 从头下载
+    - 目标文件已存在且大小（或SHA-256）一致时跳过
+    - 通过 on_progress 回调按 download_progress_interval 节流报告整体进度和吞吐量
+    """
+
+    PART_SUFFIX = '.part'
+    META_SUFFIX = '.json'
+
+    def __init__(self, concurrency: Optional[int] = None, chunk_size: Optional[int] = None,
+                 retries: Optional[int] = None, headers: Optional[Dict[str, str]] = None,
+                 on_progress: Optional[Callable[[DownloadProgress], None]] = None,
+                 on_result: Optional[Callable[[DownloadResult], None]] = None):
+        http_config = config.http
+        self.concurrency = concurrency or http_config.download_concurrency
+        self.chunk_size = chunk_size or http_config.download_chunk_size
+        self.retries = retries or http_config.download_retries
+        self.backoff = http_config.image_retry_backoff / 1000
+        self.progress_interval = http_config.download_progress_interval / 1000
+        self.headers = dict(headers or {})
+        # 按原始字节写入和续传，Content-Length/Range 都以未压缩的内容计算
+        self.headers.setdefault('Accept-Encoding', 'identity')
+        self.on_progress = on_progress
+        self.on_result = on_result
+        self.progress: Optional[DownloadProgress] = None
+        self._last_report = 0.0
+
+    async def download(self, items: List[DownloadItem]) -> List[DownloadResult]:
+        """下载一组文件，返回与输入顺序一致的结果（单个失败不影响其他文件）"""
+        self.progress = DownloadProgress(total=len(items))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def download_one(item):
+            async with semaphore:
+                result = await self._download_with_retry(item)
+            if result.status == 'skipped':
+                self.progress.skipped += 1
+            elif result.status == 'failed':
+                self.progress.failed += 1
+            else:
+                self.progress.completed += 1
+            if self.on_result:
+                self.on_result(result)
+            self._report(force=True)
+            return result
+
+        results = await asyncio.gather(*(download_one(item) for item in items))
+        logger.info(f"批量下载完成: {self.progress.summary()}")
+        return list(results)
+
+    def _report(self, force: bool = False) -> None:
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            self.on_progress(self.progress)
+
+    async def _download_with_retry(self, item: DownloadItem) -> DownloadResult:
+        error = None
+        for attempt in range(self.retries):
+            try:
+                return await self._download_one(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                if attempt + 1 < self.retries:
+                    delay = self.backoff * (2 ** attempt)
+                    logger.warning(f"下载失败，{delay:.1f}秒后从断点重试: {item.url}, {error}")
+                    await asyncio.sleep(delay)
+        logger.error(f"下载失败，重试次数已用完: {item.url}, {error}")
+        return DownloadResult(item.url, item.path, 'failed', error=error)
+
+    async def _download_one(self, item: DownloadItem) -> DownloadResult:
+        if await self._is_complete(item):
+            return DownloadResult(item.url, item.path, 'skipped', size=os.path.getsize(item.path))
+
+        part_path = item.path + self.PART_SUFFIX
+        offset, validator = self._load_part(item, part_path)
+        headers = dict(self.headers)
+        if offset:
+            # 文件在服务器上变化时 If-Range 不成立，服务器忽略 Range 返回完整的 200 响应
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+
+        async with http_client.astream('GET', item.url, headers=headers) as response:
+            if response.status_code == 416 and offset:
+                # 已下载的部分就是完整文件（Content-Range: bytes */<总大小>）
+                total = self._parse_total(response.headers.get('content-range'))
+                if total != offset:
+                    self._discard_part(part_path)
+                    raise Exception(f"断点续传失败: 本地 {offset} 字节，服务器 {total} 字节")
+                return self._finish(item, part_path, offset, resumed=True)
+
+            if response.status_code == 206:
+                if (not offset or self._parse_start(response.headers.get('content-range')) != offset
+                        or self._validator(response.headers) not in (None, validator)):
+                    self._discard_part(part_path)
+                    raise Exception("断点续传失败: 服务器返回的范围与本地不一致")
+                mode = 'ab'
+                total = self._parse_total(response.headers.get('content-range'))
+            elif response.status_code == 200:
+                # 服务器不支持Range或文件已变化，从头下载
+                mode, offset = 'wb', 0
+                length = response.headers.get('content-length')
+                total = int(length) if length and length.isdigit() else None
+                self._save_part_meta(item, part_path, self._validator(response.headers))
+            else:
+                raise Exception(f"下载失败: HTTP {response.status_code}")
+
+            with open(part_path, mode) as f:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    f.write(chunk)
+                    self.progress.bytes_downloaded += len(chunk)
+                    self._report()
+
+        size = os.path.getsize(part_path)
+        if total is not None and size != total:
+            raise Exception(f"下载不完整: {size}/{total} 字节")
+        return self._finish(item, part_path, size, resumed=mode == 'ab')
+
+    def _finish(self, item: DownloadItem, part_path: str, size: int, resumed: bool) -> DownloadResult:
+        if item.sha256 and self._sha256(part_path) != item.sha256.lower():
+            self._discard_part(part_path)
+            raise Exception("下载内容校验失败: SHA-256不一致")
+        os.replace(part_path, item.path)
+        self._discard_part(part_path)
+        return DownloadResult(item.url, item.path, 'resumed' if resumed else 'downloaded', size=size)
+
+    def _load_part(self, item: DownloadItem, part_path: str):
+        """返回可续传的 (已下载字节数, If-Range校验值)，.part 不属于该URL或无法校验时丢弃"""
+        if not os.path.exists(part_path):
+            return 0, None
+        try:
+            with open(part_path + self.META_SUFFIX, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {}
+        if meta.get('url') != item.url or not meta.get('validator'):
+            self._discard_part(part_path)
+            return 0, None
+        return os.path.getsize(part_path), meta['validator']
+
+    def _save_part_meta(self, item: DownloadItem, part_path: str, validator: Optional[str]) -> None:
+        with open(part_path + self.META_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump({'url': item.url, 'validator': validator}, f)
+
+    def _discard_part(self, part_path: str) -> None:
+        for path in (part_path, part_path + self.META_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _validator(headers) -> Optional[str]:
+        """If-Range 可用的校验值：强 ETag，其次 Last-Modified（弱 ETag 不能用于 If-Range）"""
+        etag = headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return headers.get('last-modified')
+
+    async def _is_complete(self, item: DownloadItem) -> bool:
+        """目标文件已存在且完整时返回True"""
+        if not os.path.exists(item.path):
+            return False
+        size = os.path.getsize(item.path)
+        if item.sha256:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._sha256, item.path) == item.sha256.lower()
+        if item.size is not None:
+            return size == item.size
+
+        # 未提供大小时向服务器查询
+        try:
+            response = await http_client.arequest('HEAD', item.url, headers=self.headers)
+        except Exception as e:
+            logger.debug(f"查询文件大小失败，重新下载: {item.url}, {str(e)}")
+            return False
+        length = response.headers.get('content-length')
+        return response.status_code == 200 and length is not None and length.isdigit() and int(length) == size
+
+    @staticmethod
+    def _parse_start(content_range: Optional[str]) -> Optional[int]:
+        match = re.match(r'bytes (\d+)-\d+/', content_range or '')
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _parse_total(content_range: Optional[str]) -> Optional[int]:
+        match = re.search(r'/(\d+)$', content_range or '')
+        return int(match.group(1)) if match else None
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
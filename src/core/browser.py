@@ -1,7 +1,32 @@
 from PyQt6.QtCore import QThread, pyqtSignal
 import asyncio
+import itertools
+import threading
+import uuid
+from concurrent.futures import Future
 
 from src.core.write_xiaohongshu import XiaohongshuPoster
+from src.core.browser_pool import browser_pool
+from src.core.publish_engine import publish_engine
+
+
+class BrowserCommand:
+    """浏览器线程命令"""
+
+    # 数值越小越先执行：登录优先于预览/发布
+    PRIORITIES = {
+        'login': 0,
+        'preview': 10,
+        'publish': 10,
+    }
+
+    def __init__(self, type, **payload):
+        self.id = uuid.uuid4().hex
+        self.type = type
+        self.payload = payload
+        self.priority = self.PRIORITIES.get(type, 10)
+        # 线程安全的Future，Qt线程可通过 add_done_callback / result() 获取结果
+        self.future = Future()
 
 
 class BrowserThread(QThread):
@@ -12,53 +37,189 @@ class BrowserThread(QThread):
     login_error = pyqtSignal(str)  # 用于传递错误信息
     preview_success = pyqtSignal()  # 用于通知预览成功
     preview_error = pyqtSignal(str)  # 用于传递预览错误信息
+    publish_success = pyqtSignal(str)  # 多账号发布成功，传递任务ID
+    publish_error = pyqtSignal(str, str)  # 多账号发布失败，传递任务ID和错误信息
+    command_progress = pyqtSignal(str, str, str)  # 命令ID、命令类型、阶段(queued/started/finished/failed/cancelled)
+
+    # 不阻塞命令队列、可与其他命令并行执行的命令类型
+    CONCURRENT_COMMANDS = {'publish'}
 
     def __init__(self):
         super().__init__()
         self.poster = None
-        self.action_queue = []
         self.is_running = True
         self.loop = None
+        self._queue = None
+        self._pending = []  # 事件循环启动前提交的命令
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._commands = {}
+        self._tasks = {}
+
+    def submit(self, type, **payload):
+        """提交命令（可在任意线程调用）
+
+        Args:
+            type: 命令类型，login / preview / publish
+            **payload: 命令参数
+
+        Returns:
+            BrowserCommand: 命令对象，command.future 在执行结束后完成
+        """
+        command = BrowserCommand(type, **payload)
+        self._commands[command.id] = command
+        item = (command.priority, next(self._seq), command)
+
+        with self._lock:
+            if self._queue is None:
+                self._pending.append(item)
+            else:
+                self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+        self.command_progress.emit(command.id, command.type, "queued")
+        return command
+
+    def cancel(self, command_id):
+        """取消排队中或正在执行的命令（可在任意线程调用）"""
+        command = self._commands.get(command_id)
+        if not command or command.future.done():
+            return False
+
+        # 排队中的命令出队时会被跳过；正在执行的命令在事件循环中取消
+        command.future.cancel()
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._cancel_task, command_id)
+        self.command_progress.emit(command.id, command.type, "cancelled")
+        return True
+
+    def _cancel_task(self, command_id):
+        task = self._tasks.get(command_id)
+        if task and not task.done():
+            task.cancel()
+
+    def _cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
 
     def run(self):
         # 创建新的事件循环
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
-        
+
+        with self._lock:
+            self._queue = asyncio.PriorityQueue()
+            for item in self._pending:
+                self._queue.put_nowait(item)
+            self._pending = []
+
         # 在事件循环中运行主循环
         self.loop.run_until_complete(self.async_run())
-        
+
+        # 关闭浏览器池（浏览器进程绑定在本线程的事件循环上）
+        self.loop.run_until_complete(browser_pool.close())
+
         # 关闭事件循环
         self.loop.close()
-        
+
     async def async_run(self):
-        """异步主循环"""
+        """异步主循环：阻塞等待命令，空闲时不占用CPU"""
         while self.is_running:
-            if self.action_queue:
-                action = self.action_queue.pop(0)
-                try:
-                    if action['type'] == 'login':
-                        self.poster = XiaohongshuPoster()
-                        await self.poster.initialize()
-                        await self.poster.login(action['phone'])
-                        self.login_success.emit(self.poster)
-                    elif action['type'] == 'preview' and self.poster:
-                        await self.poster.post_article(
-                            action['title'],
-                            action['content'],
-                            action['images']
-                        )
-                        self.preview_success.emit()
-                except Exception as e:
-                    if action['type'] == 'login':
-                        self.login_error.emit(str(e))
-                    elif action['type'] == 'preview':
-                        self.preview_error.emit(str(e))
-            # 使用异步sleep而不是QThread.msleep
-            await asyncio.sleep(0.1)  # 避免CPU占用过高
+            _, _, command = await self._queue.get()
+            if command is None:
+                break
+            if command.future.cancelled():
+                continue
+
+            task = asyncio.ensure_future(self._execute(command))
+            self._tasks[command.id] = task
+            if command.type not in self.CONCURRENT_COMMANDS:
+                # 登录/预览共用同一个poster，需按顺序执行
+                await asyncio.wait([task])
+
+        self._cancel_all()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        await publish_engine.close()
+
+    async def _execute(self, command):
+        """执行单个命令并完成其Future"""
+        self.command_progress.emit(command.id, command.type, "started")
+        try:
+            result = await self._dispatch(command)
+            if not command.future.done():
+                command.future.set_result(result)
+            self.command_progress.emit(command.id, command.type, "finished")
+        except asyncio.CancelledError:
+            # 经 cancel() 取消时已发出过 cancelled（concurrent Future 对已取消的 Future 再次 cancel 也返回True），
+            # 这里只为其他原因的取消（如线程退出）发出
+            if not command.future.cancelled() and command.future.cancel():
+                self.command_progress.emit(command.id, command.type, "cancelled")
+            # 让界面恢复按钮状态
+            if command.type == 'login':
+                self.login_error.emit("已取消")
+            elif command.type == 'preview':
+                self.preview_error.emit("已取消")
+        except Exception as e:
+            if not command.future.done():
+                command.future.set_exception(e)
+            self.command_progress.emit(command.id, command.type, "failed")
+            if command.type == 'login':
+                self.login_error.emit(str(e))
+            elif command.type == 'preview':
+                self.preview_error.emit(str(e))
+        finally:
+            self._tasks.pop(command.id, None)
+            self._commands.pop(command.id, None)
+
+    async def _dispatch(self, command):
+        payload = command.payload
+        if command.type == 'login':
+            if self.poster:
+                # 归还旧的上下文，浏览器进程保持运行
+                await self.poster.close(force=True)
+            self.poster = XiaohongshuPoster()
+            await self.poster.initialize()
+            await self.poster.login(payload['phone'])
+            self.login_success.emit(self.poster)
+            return self.poster
+
+        if command.type == 'preview':
+            if not self.poster:
+                raise Exception("请先登录")
+            await self.poster.post_article(
+                payload['title'],
+                payload['content'],
+                payload['images']
+            )
+            self.preview_success.emit()
+            return None
+
+        if command.type == 'publish':
+            # 多账号发布交给发布引擎并发执行
+            job = publish_engine.submit(
+                payload['user_id'],
+                payload['title'],
+                payload['content'],
+                payload.get('images')
+            )
+            try:
+                job = await publish_engine.wait(job.job_id)
+            except asyncio.CancelledError:
+                publish_engine.cancel(job.job_id)
+                raise
+            if job.status == "published":
+                self.publish_success.emit(job.job_id)
+            else:
+                self.publish_error.emit(job.job_id, job.error_message or "发布失败")
+            return job
+
+        raise ValueError(f"未知的命令类型: {command.type}")
 
     def stop(self):
         self.is_running = False
-        # 确保浏览器资源被释放
-        if self.poster and self.loop and self.loop.is_running():
-            asyncio.run_coroutine_threadsafe(self.poster.close(force=True), self.loop)
+        # 唤醒主循环并取消正在执行的命令，浏览器资源在循环退出后统一释放
+        with self._lock:
+            if self._queue is not None and self.loop.is_running():
+                self.loop.call_soon_threadsafe(self._cancel_all)
+                self.loop.call_soon_threadsafe(self._queue.put_nowait, (-1, -1, None))
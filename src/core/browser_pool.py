@@ -0,0 +1,334 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
+
+from playwright.async_api import async_playwright, Browser, BrowserContext
+
+from .logger import logger
+from .config import config
+from .session_store import session_store
+
+
+@dataclass
+class PooledContext:
+    """池中的浏览器上下文"""
+    key: str
+    context: BrowserContext
+    browser: Browser
+    options_key: str
+    ref_count: int = 0
+    last_used_at: float = 0.0
+
+
+class BrowserPool:
+    """浏览器池 - 进程内共享少量常驻的Chromium进程，按账号分配隔离的BrowserContext
+
+    同一个key的上下文可被多个管理器共享（引用计数）；引用归零后保留为空闲上下文，
+    再次获取时直接复用，空闲数量超过上限时关闭最久未使用的上下文。
+    某个key的配置（代理、指纹等）变化时若旧上下文仍被持有，旧上下文转为退役状态，
+    等持有者全部释放后再关闭，新的获取使用按新配置创建的上下文。
+    新建上下文时从会话快照恢复登录状态，关闭上下文前保存快照。
+    Playwright对象绑定创建它的事件循环，因此一个池只能在一个事件循环中使用。
+    """
+
+    def __init__(self, max_browsers: int = 2, contexts_per_browser: int = 8,
+                 max_idle_contexts: int = 4):
+        self.max_browsers = max_browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.max_idle_contexts = max_idle_contexts
+        self.playwright = None
+        self._browsers: Dict[bool, List[Browser]] = {}
+        self._contexts: Dict[str, PooledContext] = {}
+        # 配置已变化但仍被持有的旧上下文
+        self._retired: List[PooledContext] = []
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._prewarm_tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self) -> None:
+        """启动Playwright（幂等）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not None and self._loop is not loop:
+            if not self._loop.is_closed():
+                raise RuntimeError("浏览器池已绑定到其他事件循环")
+            # 原事件循环已关闭，其中的浏览器对象均已失效
+            logger.warning("浏览器池所在的事件循环已关闭，重新初始化浏览器池")
+            self._reset()
+
+        if self._loop is None:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+
+        if self.playwright is None:
+            logger.info("启动浏览器池...")
+            self.playwright = await async_playwright().start()
+
+    async def acquire_context(self, key: str, headless: Optional[bool] = None,
+                              **context_options) -> BrowserContext:
+        """获取（或创建）指定key的浏览器上下文
+
+        Args:
+            key: 上下文标识，通常对应一个账号，如 "user:1"
+            headless: 是否无头模式，默认取 config.browser.headless
+            **context_options: 传给 browser.new_context 的参数（proxy、user_agent、viewport等）
+
+        Returns:
+            BrowserContext: 已隔离的浏览器上下文
+        """
+        await self.start()
+        if headless is None:
+            headless = config.browser.headless
+
+        options_key = json.dumps({'headless': headless, **context_options}, sort_keys=True, default=str)
+
+        async with self._lock:
+            entry = self._contexts.get(key)
+            if entry and (entry.options_key != options_key or not entry.browser.is_connected()):
+                # 代理、指纹等配置发生变化，旧上下文不可复用
+                if entry.ref_count > 0 and entry.browser.is_connected():
+                    # 仍有持有者（如正在发布），不能直接关闭：转为退役状态，释放后再关闭
+                    logger.info(f"上下文配置已变化，旧上下文仍在使用，释放后关闭: {key}")
+                    self._forget_entry(entry)
+                    self._retired.append(entry)
+                else:
+                    logger.info(f"上下文配置已变化，重新创建: {key}")
+                    await self._close_entry(entry)
+                entry = None
+
+            if entry is None:
+                browser = await self._get_browser(headless)
+                context = await browser.new_context(
+                    storage_state=session_store.get_storage_state(key),
+                    **context_options
+                )
+                await session_store.apply_session_storage(context, key)
+                entry = PooledContext(
+                    key=key,
+                    context=context,
+                    browser=browser,
+                    options_key=options_key
+                )
+                context.on("close", lambda _context, entry=entry: self._forget_entry(entry))
+                self._contexts[key] = entry
+                logger.info(f"创建浏览器上下文: {key}")
+            else:
+                logger.debug(f"复用浏览器上下文: {key}")
+
+            entry.ref_count += 1
+            entry.last_used_at = time.time()
+            return entry.context
+
+    async def release_context(self, key: str, discard: bool = False,
+                              context: Optional[BrowserContext] = None) -> None:
+        """释放上下文引用
+
+        Args:
+            key: 上下文标识
+            discard: 引用归零时是否直接关闭上下文，而不是保留为空闲上下文
+            context: 调用方持有的上下文（该key的配置变化后，用于找到已退役的旧上下文）
+        """
+        if self._lock is None:
+            return
+
+        async with self._lock:
+            entry = self._contexts.get(key)
+            if context is not None and (entry is None or entry.context is not context):
+                entry = next((e for e in self._retired if e.context is context), None)
+            if not entry:
+                return
+
+            entry.ref_count = max(0, entry.ref_count - 1)
+            entry.last_used_at = time.time()
+
+            if entry.ref_count == 0 and (discard or entry in self._retired):
+                await self._close_entry(entry)
+
+            await self._evict_idle_contexts()
+
+    async def prewarm(self, key: str, headless: Optional[bool] = None, **context_options) -> None:
+        """预热上下文：创建（并恢复会话）后保留为空闲上下文，之后获取时直接复用"""
+        await self.acquire_context(key, headless, **context_options)
+        await self.release_context(key)
+
+    def schedule_prewarm(self, key: str, headless: Optional[bool] = None, **context_options) -> None:
+        """在后台预热上下文（需在事件循环中调用），同一key已存在或正在预热时忽略"""
+        if key in self._contexts or key in self._prewarm_tasks:
+            return
+
+        async def run():
+            try:
+                await self.prewarm(key, headless, **context_options)
+                logger.info(f"已预热浏览器上下文: {key}")
+            except Exception as e:
+                logger.warning(f"预热浏览器上下文失败: {key}, {str(e)}")
+            finally:
+                self._prewarm_tasks.pop(key, None)
+
+        self._prewarm_tasks[key] = asyncio.ensure_future(run())
+
+    def has_context(self, key: str) -> bool:
+        """是否存在指定key的上下文（包括空闲上下文）"""
+        return key in self._contexts
+
+    async def _get_browser(self, headless: bool) -> Browser:
+        """选择负载最低的浏览器进程，必要时启动新进程"""
+        browsers = [b for b in self._browsers.get(headless, []) if b.is_connected()]
+        self._browsers[headless] = browsers
+
+        def load(browser: Browser) -> int:
+            return sum(1 for entry in [*self._contexts.values(), *self._retired] if entry.browser is browser)
+
+        available = [b for b in browsers if load(b) < self.contexts_per_browser]
+        if available:
+            return min(available, key=load)
+
+        if len(browsers) < self.max_browsers:
+            launch_args = self._get_launch_args(headless)
+            chromium_path = self._get_chromium_path()
+            if chromium_path:
+                launch_args['executable_path'] = chromium_path
+
+            browser = await self.playwright.chromium.launch(**launch_args)
+            browser.on("disconnected", lambda _browser: self._forget_browser(_browser))
+            browsers.append(browser)
+            logger.info(f"浏览器池启动新的浏览器进程（共 {len(browsers)} 个, headless={headless}）")
+            return browser
+
+        return min(browsers, key=load)
+
+    async def _evict_idle_contexts(self) -> None:
+        """关闭超出空闲上限的上下文（最久未使用的优先）"""
+        idle = [entry for entry in self._contexts.values() if entry.ref_count == 0]
+        if len(idle) <= self.max_idle_contexts:
+            return
+
+        idle.sort(key=lambda entry: entry.last_used_at)
+        for entry in idle[:len(idle) - self.max_idle_contexts]:
+            logger.debug(f"关闭空闲浏览器上下文: {entry.key}")
+            await self._close_entry(entry)
+
+    async def _close_entry(self, entry: PooledContext) -> None:
+        """保存会话快照后关闭上下文并从池中移除"""
+        self._forget_entry(entry)
+        try:
+            await session_store.save(entry.key, entry.context)
+            await entry.context.close()
+        except Exception as e:
+            logger.debug(f"关闭浏览器上下文时出错: {str(e)}")
+
+    def _forget_entry(self, entry: PooledContext) -> None:
+        if self._contexts.get(entry.key) is entry:
+            del self._contexts[entry.key]
+        if entry in self._retired:
+            self._retired.remove(entry)
+
+    def _forget_browser(self, browser: Browser) -> None:
+        """浏览器进程退出时，清理其上的上下文"""
+        for entry in [*self._contexts.values(), *self._retired]:
+            if entry.browser is browser:
+                self._forget_entry(entry)
+        for browsers in self._browsers.values():
+            if browser in browsers:
+                browsers.remove(browser)
+        logger.warning("浏览器进程已断开连接")
+
+    def _get_launch_args(self, headless: bool) -> Dict[str, Any]:
+        """获取浏览器启动参数"""
+        return {
+            'headless': headless,
+            'args': [
+                '--no-sandbox',
+                '--disable-dev-shm-usage',
+                '--disable-gpu',
+                '--disable-extensions',
+                '--disable-infobars',
+                '--start-maximized',
+                '--ignore-certificate-errors',
+                '--ignore-ssl-errors'
+            ]
+        }
+
+    def _get_chromium_path(self) -> Optional[str]:
+        """获取Chromium路径"""
+        if not getattr(sys, 'frozen', False):
+            return None
+
+        executable_dir = sys._MEIPASS if hasattr(sys, '_MEIPASS') else os.path.dirname(sys.executable)
+
+        if sys.platform == 'darwin':
+            return self._get_macos_chromium_path(executable_dir)
+        else:
+            return self._get_windows_chromium_path(executable_dir)
+
+    def _get_macos_chromium_path(self, executable_dir: str) -> str:
+        """获取macOS Chromium路径"""
+        if 'XhsAi' in executable_dir:
+            browser_path = os.path.join(executable_dir, "ms-playwright")
+        else:
+            browser_path = os.path.join(executable_dir, "Contents", "MacOS", "ms-playwright")
+
+        return os.path.join(browser_path, "chromium-1161/chrome-mac/Chromium.app/Contents/MacOS/Chromium")
+
+    def _get_windows_chromium_path(self, executable_dir: str) -> str:
+        """获取Windows Chromium路径"""
+        browser_path = os.path.join(executable_dir, "ms-playwright")
+        chromium_path = os.path.join(browser_path, "chrome-win", "chrome.exe")
+
+        if os.path.exists(chromium_path):
+            os.chmod(chromium_path, 0o755)
+            return chromium_path
+
+        raise FileNotFoundError(f"浏览器文件不存在: {chromium_path}")
+
+    async def close(self) -> None:
+        """关闭所有上下文、浏览器进程并停止Playwright"""
+        try:
+            for task in list(self._prewarm_tasks.values()):
+                task.cancel()
+            if self._prewarm_tasks:
+                await asyncio.gather(*self._prewarm_tasks.values(), return_exceptions=True)
+
+            for entry in [*self._contexts.values(), *self._retired]:
+                await self._close_entry(entry)
+
+            for browsers in self._browsers.values():
+                for browser in list(browsers):
+                    try:
+                        await browser.close()
+                    except Exception as e:
+                        logger.debug(f"关闭浏览器时出错: {str(e)}")
+
+            if self.playwright:
+                await self.playwright.stop()
+                logger.info("浏览器池已关闭")
+        except Exception as e:
+            logger.error(f"关闭浏览器池时出错: {str(e)}", exc_info=True)
+        finally:
+            self._reset()
+
+    def _reset(self) -> None:
+        self.playwright = None
+        self._browsers = {}
+        self._contexts = {}
+        self._retired = []
+        self._prewarm_tasks = {}
+        self._lock = None
+        self._loop = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取浏览器池统计信息"""
+        return {
+            'browsers': sum(len(browsers) for browsers in self._browsers.values()),
+            'contexts': len(self._contexts),
+            'idle_contexts': len([e for e in self._contexts.values() if e.ref_count == 0]),
+            'retired_contexts': len(self._retired),
+            'keys': list(self._contexts.keys())
+        }
+
+
+# 全局浏览器池实例（GUI与Web服务在各自进程内共享）
+browser_pool = BrowserPool()
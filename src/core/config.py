@@ -1,7 +1,7 @@
 import os
 import json
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
 
 
@@ -22,6 +22,9 @@ class WebConfig:
     port: int = 8000
     debug: bool = True
     reload: bool = True
+    # 上传：单个文件大小上限与流式写盘的分块大小（字节）
+    max_upload_size: int = 20 * 1024 * 1024
+    upload_chunk_size: int = 256 * 1024
 
 
 @dataclass
@@ -31,11 +34,55 @@ class XiaohongshuConfig:
     login_url: str = "https://creator.xiaohongshu.com/login"
     max_retry_times: int = 3
     upload_timeout: int = 60000
-    
+
+    # 发布流程等待上限（毫秒），各步骤在页面就绪后立即继续
+    page_ready_timeout: int = 20000
+    editor_ready_timeout: int = 15000
+    upload_settle_ms: int = 800
+    selector_probe_timeout: int = 3000
+    manual_publish_timeout: int = 60000
+
+    # 多账号并发发布：全局并发上限，以及同一代理两次发布之间的最小间隔（毫秒）
+    max_concurrent_publishes: int = 3
+    proxy_publish_interval: int = 30000
+
+    # 持久化发布队列：工作协程数、最大尝试次数、重试退避基数与任务租约（毫秒）
+    publish_workers: int = 2
+    publish_max_attempts: int = 3
+    publish_retry_backoff: int = 30000
+    publish_job_lease: int = 300000
+
+    # 登录状态缓存有效期，以及后台轻量探测间隔（毫秒，0表示不启用后台探测）
+    login_state_ttl: int = 300000
+    login_probe_interval: int = 0
+
+    # 会话快照的最长有效期（毫秒），登录cookie更早过期时以cookie为准
+    session_snapshot_ttl: int = 7 * 24 * 3600 * 1000
+
+    # 上传前图片预处理：最大长边/短边（像素）、允许的宽高比范围（宽/高）、JPEG质量、进程数（0为CPU核数）
+    preprocess_images: bool = True
+    upload_max_long_edge: int = 1440
+    upload_max_short_edge: int = 1080
+    upload_min_aspect: float = 0.75
+    upload_max_aspect: float = 4 / 3
+    upload_jpeg_quality: int = 88
+    preprocess_workers: int = 2
+    # 预处理结果缓存的总大小上限（字节），以及最近多久内用过的文件不淘汰（毫秒）
+    upload_cache_size: int = 200 * 1024 * 1024
+    upload_cache_min_age: int = 3600000
+
+    # 定时发布：错过的任务在该时间窗口内仍会补发一次（毫秒），以及调度器每批加载的任务数
+    schedule_catchup_window: int = 6 * 3600 * 1000
+    schedule_batch_size: int = 500
+
     # 选择器配置
     selectors: Dict[str, Any] = None
+    # 各步骤上次成功的选择器/上传方式，下次优先尝试
+    selector_cache: Dict[str, str] = None
     
     def __post_init__(self):
+        if self.selector_cache is None:
+            self.selector_cache = {}
         if self.selectors is None:
             self.selectors = {
                 "phone_input": "//input[@placeholder='手机号']",
@@ -66,6 +113,54 @@ class XiaohongshuConfig:
             }
 
 
+@dataclass
+class HttpConfig:
+    """出站HTTP配置（超时、连接池单位：毫秒/个）"""
+    connect_timeout: int = 10000
+    read_timeout: int = 30000
+    max_connections: int = 50
+    max_keepalive_connections: int = 20
+    keepalive_expiry: int = 30000
+    # 同一主机同时进行的请求数上限
+    max_per_host: int = 6
+    # 安装了 h2 时启用HTTP/2
+    http2: bool = True
+
+    # 生成内容后的图片下载：并发数、单张超时、尝试次数与重试退避基数（毫秒）
+    image_concurrency: int = 4
+    image_timeout: int = 20000
+    image_retries: int = 3
+    image_retry_backoff: int = 500
+
+    # 图片磁盘缓存的容量上限（字节），以及最近访问过的文件至少保留的时长（毫秒，避免淘汰正在使用的图片）
+    media_cache_size: int = 500 * 1024 * 1024
+    media_cache_min_age: int = 3600000
+
+    # 批量下载：并发文件数、流式写入的块大小（字节）、尝试次数、进度报告间隔（毫秒）
+    download_concurrency: int = 4
+    download_chunk_size: int = 64 * 1024
+    download_retries: int = 3
+    download_progress_interval: int = 500
+
+
+@dataclass
+class ScraperConfig:
+    """内容采集配置（时间单位：毫秒）"""
+    headless: bool = True
+    # 共享浏览器上下文中同时打开的页面数
+    page_concurrency: int = 4
+    # 同一主机同时进行的页面请求数，以及相邻两次请求开始的最小间隔（实际间隔在1~1.5倍之间随机）
+    per_host_concurrency: int = 2
+    min_request_interval: int = 1000
+    navigation_timeout: int = 30000
+    # 数据提取方式：network 解析页面自身的JSON接口响应，dom 从页面元素读取（接口不可用时的回退）
+    extraction_mode: str = "network"
+    # 采集上下文中直接拦截的资源类型（不下载图片、字体、音视频）
+    block_resource_types: List[str] = field(default_factory=lambda: ["image", "font", "media"])
+    # 滚动后等待下一页数据的最长时间，超时视为没有更多内容
+    feed_idle_timeout: int = 8000
+
+
 @dataclass
 class AppConfig:
     """应用配置"""
@@ -73,6 +168,8 @@ class AppConfig:
     version: str = "1.0.0"
     data_dir: str = None
     log_level: str = "INFO"
+    # 图片存储垃圾回收的最小间隔（毫秒），释放图片引用时按此间隔回收
+    image_gc_interval: int = 3600000
     
     def __post_init__(self):
         if self.data_dir is None:
@@ -80,6 +177,47 @@ class AppConfig:
             self.data_dir = str(home_dir / '.xhs_system')
 
 
+class SelectorCache:
+    """选择器缓存 - 记录每个步骤上次命中的选择器，持久化到 xiaohongshu.selector_cache"""
+
+    def __init__(self, manager: 'ConfigManager'):
+        self.manager = manager
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get(self, step: str) -> Optional[str]:
+        """获取步骤上次命中的选择器"""
+        return self.manager.xiaohongshu.selector_cache.get(step)
+
+    def record_hit(self, step: str) -> None:
+        """记录一次缓存命中"""
+        self.hits[step] = self.hits.get(step, 0) + 1
+
+    def record_miss(self, step: str) -> None:
+        """记录一次缓存未命中"""
+        self.misses[step] = self.misses.get(step, 0) + 1
+
+    def remember(self, step: str, selector: str) -> None:
+        """记录步骤命中的选择器，有变化时才写盘"""
+        if self.get(step) == selector:
+            return
+        self.manager.xiaohongshu.selector_cache[step] = selector
+        self.manager.save_config()
+
+    def forget(self, step: str) -> None:
+        """清除步骤的缓存（选择器失效时调用）"""
+        if self.manager.xiaohongshu.selector_cache.pop(step, None) is not None:
+            self.manager.save_config()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        return {
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'cached': dict(self.manager.xiaohongshu.selector_cache)
+        }
+
+
 class ConfigManager:
     """配置管理器"""
     
@@ -88,7 +226,10 @@ class ConfigManager:
         self.browser = BrowserConfig()
         self.web = WebConfig()
         self.xiaohongshu = XiaohongshuConfig()
+        self.http = HttpConfig()
+        self.scraper = ScraperConfig()
         self.app = AppConfig()
+        self.selector_cache = SelectorCache(self)
         
         # 加载配置文件
         self.load_config()
@@ -127,6 +268,12 @@ class ConfigManager:
                 else:
                     self.xiaohongshu = XiaohongshuConfig(**xhs_data)
             
+            if 'http' in config_data:
+                self.http = HttpConfig(**config_data['http'])
+
+            if 'scraper' in config_data:
+                self.scraper = ScraperConfig(**config_data['scraper'])
+            
             if 'app' in config_data:
                 self.app = AppConfig(**config_data['app'])
                 
@@ -141,6 +288,8 @@ class ConfigManager:
                 'browser': asdict(self.browser),
                 'web': asdict(self.web),
                 'xiaohongshu': asdict(self.xiaohongshu),
+                'http': asdict(self.http),
+                'scraper': asdict(self.scraper),
                 'app': asdict(self.app)
             }
             
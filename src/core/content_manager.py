@@ -1,15 +1,14 @@
 import os
-import json
 import time
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass, asdict
-from datetime import datetime
 import hashlib
-import mimetypes
 
 from .logger import logger
 from .config import config
+from .content_store import ContentStore
+from .image_store import ImageStore
 
 
 @dataclass
@@ -21,7 +20,7 @@ class ContentItem:
     images: List[str]
     tags: List[str]
     created_at: float
-    status: str = "draft"  # draft, published, failed
+    status: str = "draft"  # draft, published, awaiting_manual, failed
     published_at: Optional[float] = None
     error_message: Optional[str] = None
     
@@ -42,7 +41,8 @@ class ContentManager:
         self.storage_dir = None
         self.images_dir = None
         self.content_file = None
-        self.contents: Dict[str, ContentItem] = {}
+        self.store: Optional[ContentStore] = None
+        self.image_store: Optional[ImageStore] = None
         self._setup_storage()
     
     def _setup_storage(self):
@@ -58,42 +58,23 @@ class ContentManager:
         
         self.content_file = self.storage_dir / "contents.json"
         
-        # 加载已有内容
-        self._load_contents()
-    
-    def _load_contents(self):
-        """从文件加载内容"""
-        if not self.content_file.exists():
-            return
-        
+        # 内容保存在SQLite中，旧版 contents.json 首次启动时一次性迁移
+        self.store = ContentStore()
         try:
-            with open(self.content_file, 'r', encoding='utf-8') as f:
-                contents_data = json.load(f)
-            
-            self.contents = {}
-            for content_id, data in contents_data.items():
-                self.contents[content_id] = ContentItem.from_dict(data)
-            
-            logger.info(f"已加载 {len(self.contents)} 个内容项")
-            
+            self.store.migrate_from_json(self.content_file)
         except Exception as e:
-            logger.error(f"加载内容失败: {str(e)}")
-            self.contents = {}
+            logger.error(f"迁移内容失败: {str(e)}")
+        
+        # 图片按内容哈希去重存储，启动时回收不再被引用的图片
+        self.image_store = ImageStore(self.images_dir)
+        self.image_store.collect_garbage()
     
-    def _save_contents(self):
-        """保存内容到文件"""
+    def _collect_garbage(self) -> None:
+        """释放图片引用后按间隔回收不再被引用的图片"""
         try:
-            contents_data = {}
-            for content_id, content in self.contents.items():
-                contents_data[content_id] = content.to_dict()
-            
-            with open(self.content_file, 'w', encoding='utf-8') as f:
-                json.dump(contents_data, f, ensure_ascii=False, indent=2)
-            
-            logger.debug(f"已保存 {len(self.contents)} 个内容项")
-            
+            self.image_store.maybe_collect_garbage(config.app.image_gc_interval / 1000)
         except Exception as e:
-            logger.error(f"保存内容失败: {str(e)}")
+            logger.warning(f"图片垃圾回收失败: {str(e)}")
     
     def _generate_content_id(self, title: str, content: str) -> str:
         """生成内容ID"""
@@ -125,8 +106,7 @@ class ContentManager:
             created_at=time.time()
         )
         
-        self.contents[content_id] = content_item
-        self._save_contents()
+        self.store.insert(content_item.to_dict())
         
         logger.info(f"创建内容: {content_id} - {title}")
         return content_id
@@ -144,20 +124,20 @@ class ContentManager:
         Returns:
             bool: 更新是否成功
         """
-        if content_id not in self.contents:
-            logger.error(f"内容不存在: {content_id}")
-            return False
-        
-        content_item = self.contents[content_id]
-        
+        fields = {}
         if title is not None:
-            content_item.title = title
+            fields['title'] = title
         if content is not None:
-            content_item.content = content
+            fields['content'] = content
         if tags is not None:
-            content_item.tags = tags
+            fields['tags'] = tags
+        
+        if not self.store.get(content_id):
+            logger.error(f"内容不存在: {content_id}")
+            return False
         
-        self._save_contents()
+        if fields:
+            self.store.update(content_id, **fields)
         logger.info(f"更新内容: {content_id}")
         return True
     
@@ -170,23 +150,24 @@ class ContentManager:
         Returns:
             bool: 删除是否成功
         """
-        if content_id not in self.contents:
+        content_item = self.get_content(content_id)
+        if not content_item:
             logger.error(f"内容不存在: {content_id}")
             return False
         
-        content_item = self.contents[content_id]
-        
-        # 删除关联的图片文件
+        # 释放关联的图片：存储中的图片减少引用计数，由垃圾回收删除；旧版图片直接删除
         for image_path in content_item.images:
             try:
-                if os.path.exists(image_path):
+                if self.image_store.is_managed(image_path):
+                    self.image_store.decref(image_path)
+                elif os.path.exists(image_path):
                     os.remove(image_path)
             except Exception as e:
                 logger.warning(f"删除图片失败: {image_path}, {str(e)}")
         
         # 删除内容项
-        del self.contents[content_id]
-        self._save_contents()
+        self.store.delete(content_id)
+        self._collect_garbage()
         
         logger.info(f"删除内容: {content_id}")
         return True
@@ -200,7 +181,8 @@ class ContentManager:
         Returns:
             ContentItem: 内容项，如果不存在返回None
         """
-        return self.contents.get(content_id)
+        data = self.store.get(content_id)
+        return ContentItem.from_dict(data) if data else None
     
     def list_contents(self, status: str = None, limit: int = None) -> List[ContentItem]:
         """列出内容
@@ -212,20 +194,27 @@ class ContentManager:
         Returns:
             List[ContentItem]: 内容列表
         """
-        contents = list(self.contents.values())
-        
-        # 状态过滤
-        if status:
-            contents = [c for c in contents if c.status == status]
-        
-        # 按创建时间倒序排序
-        contents.sort(key=lambda x: x.created_at, reverse=True)
-        
-        # 限制数量
-        if limit:
-            contents = contents[:limit]
+        # 状态过滤、按创建时间倒序和数量限制均在数据库中完成
+        return [ContentItem.from_dict(data) for data in self.store.list(status, limit)]
+    
+    def list_contents_page(self, status: str = None, limit: int = 50,
+                           cursor: str = None) -> Tuple[List[ContentItem], Optional[str]]:
+        """分页列出内容（键集分页，按创建时间倒序）
         
-        return contents
+        Args:
+            status: 状态过滤
+            limit: 每页数量
+            cursor: 上一页返回的游标
+            
+        Returns:
+            Tuple[List[ContentItem], Optional[str]]: (内容列表, 下一页游标)
+        """
+        items, next_cursor = self.store.list_page(status, limit, cursor)
+        return [ContentItem.from_dict(data) for data in items], next_cursor
+    
+    def count_contents(self, status: str = None) -> int:
+        """内容数量（由计数器维护，不扫描内容表）"""
+        return self.store.count(status)
     
     def save_image(self, image_data: bytes, filename: str = None) -> str:
         """保存图片
@@ -237,27 +226,9 @@ class ContentManager:
         Returns:
             str: 保存的图片路径
         """
-        if filename is None:
-            # 生成文件名
-            timestamp = int(time.time() * 1000)
-            filename = f"image_{timestamp}.jpg"
-        
-        # 确保文件名唯一
-        counter = 1
-        base_name, ext = os.path.splitext(filename)
-        while (self.images_dir / filename).exists():
-            filename = f"{base_name}_{counter}{ext}"
-            counter += 1
-        
-        image_path = self.images_dir / filename
-        
         try:
-            with open(image_path, 'wb') as f:
-                f.write(image_data)
-            
-            logger.info(f"保存图片: {image_path}")
-            return str(image_path)
-            
+            # 相同内容的图片只保存一份，文件名由SHA-256决定
+            return self.image_store.put_bytes(image_data, filename)
         except Exception as e:
             logger.error(f"保存图片失败: {str(e)}")
             raise
@@ -272,15 +243,15 @@ class ContentManager:
         Returns:
             bool: 添加是否成功
         """
-        if content_id not in self.contents:
+        content_item = self.get_content(content_id)
+        if not content_item:
             logger.error(f"内容不存在: {content_id}")
             return False
         
-        content_item = self.contents[content_id]
-        
         if image_path not in content_item.images:
             content_item.images.append(image_path)
-            self._save_contents()
+            self.store.update(content_id, images=content_item.images)
+            self.image_store.incref(image_path)
             logger.info(f"为内容 {content_id} 添加图片: {image_path}")
         
         return True
@@ -295,16 +266,17 @@ class ContentManager:
         Returns:
             bool: 移除是否成功
         """
-        if content_id not in self.contents:
+        content_item = self.get_content(content_id)
+        if not content_item:
             logger.error(f"内容不存在: {content_id}")
             return False
         
-        content_item = self.contents[content_id]
-        
         if image_path in content_item.images:
             content_item.images.remove(image_path)
-            self._save_contents()
+            self.store.update(content_id, images=content_item.images)
+            self.image_store.decref(image_path)
             logger.info(f"从内容 {content_id} 移除图片: {image_path}")
+            self._collect_garbage()
         
         return True
     
@@ -320,20 +292,17 @@ class ContentManager:
         Returns:
             bool: 更新是否成功
         """
-        if content_id not in self.contents:
+        fields = {'status': status}
+        if status == "published":
+            fields['published_at'] = time.time()
+            fields['error_message'] = None
+        elif status in ("failed", "awaiting_manual"):
+            fields['error_message'] = error_message
+        
+        if not self.store.update(content_id, **fields):
             logger.error(f"内容不存在: {content_id}")
             return False
         
-        content_item = self.contents[content_id]
-        content_item.status = status
-        
-        if status == "published":
-            content_item.published_at = time.time()
-            content_item.error_message = None
-        elif status == "failed":
-            content_item.error_message = error_message
-        
-        self._save_contents()
         logger.info(f"更新内容状态: {content_id} -> {status}")
         return True
     
@@ -344,14 +313,16 @@ class ContentManager:
             Dict[str, int]: 统计信息
         """
         stats = {
-            'total': len(self.contents),
+            'total': 0,
             'draft': 0,
             'published': 0,
+            'awaiting_manual': 0,
             'failed': 0
         }
         
-        for content in self.contents.values():
-            stats[content.status] = stats.get(content.status, 0) + 1
+        for status, count in self.store.count_by_status().items():
+            stats[status] = count
+            stats['total'] += count
         
         return stats
     
@@ -0,0 +1,270 @@
+import os
+import json
+import base64
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import func, and_, or_
+
+from .logger import logger
+from .models.content import ContentRecord, ContentCounter
+from ..config.database import db_manager
+
+
+class ContentStore:
+    """内容存储 - 基于SQLite（contents 表），每次增删改只写单条记录
+
+    读写使用与 ContentItem.to_dict() 相同结构的字典。
+    各状态的数量保存在 content_counters 表中，随增删改在同一事务内维护。
+    """
+
+    JSON_FIELDS = ('images', 'tags')
+
+    def __init__(self):
+        self.db_manager = db_manager
+        ContentRecord.__table__.create(bind=self.db_manager.engine, checkfirst=True)
+        ContentCounter.__table__.create(bind=self.db_manager.engine, checkfirst=True)
+        self._init_counters()
+
+    def _init_counters(self) -> None:
+        """计数器为空而内容不为空时（旧数据库）按状态重建一次"""
+        session = self.db_manager.get_session_direct()
+        try:
+            if session.query(ContentCounter).first() is not None:
+                return
+            rows = session.query(ContentRecord.status, func.count(ContentRecord.id)).group_by(
+                ContentRecord.status
+            ).all()
+            for status, count in rows:
+                session.add(ContentCounter(status=status, count=count))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def _adjust_counter(self, session, status: str, delta: int) -> None:
+        """在当前事务中调整某状态的计数"""
+        updated = session.query(ContentCounter).filter(ContentCounter.status == status).update(
+            {ContentCounter.count: ContentCounter.count + delta}, synchronize_session=False
+        )
+        if not updated:
+            session.add(ContentCounter(status=status, count=delta))
+            session.flush()
+
+    def _to_columns(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """字典字段转换为数据库列值"""
+        columns = {}
+        for key, value in data.items():
+            if key in self.JSON_FIELDS:
+                value = json.dumps(value or [], ensure_ascii=False)
+            columns[key] = value
+        return columns
+
+    def insert(self, data: Dict[str, Any]) -> None:
+        """新增内容"""
+        session = self.db_manager.get_session_direct()
+        try:
+            record = ContentRecord(**self._to_columns(data))
+            session.add(record)
+            self._adjust_counter(session, record.status or 'draft', 1)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def update(self, content_id: str, **fields) -> bool:
+        """更新指定字段
+
+        Returns:
+            bool: 内容是否存在
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            old_status = None
+            if 'status' in fields:
+                row = session.query(ContentRecord.status).filter(ContentRecord.id == content_id).first()
+                if not row:
+                    return False
+                old_status = row.status
+
+            updated = session.query(ContentRecord).filter(
+                ContentRecord.id == content_id
+            ).update(self._to_columns(fields), synchronize_session=False)
+
+            if updated and old_status is not None and old_status != fields['status']:
+                self._adjust_counter(session, old_status, -1)
+                self._adjust_counter(session, fields['status'], 1)
+
+            session.commit()
+            return updated > 0
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def delete(self, content_id: str) -> bool:
+        """删除内容"""
+        session = self.db_manager.get_session_direct()
+        try:
+            row = session.query(ContentRecord.status).filter(ContentRecord.id == content_id).first()
+            if not row:
+                return False
+            session.query(ContentRecord).filter(ContentRecord.id == content_id).delete()
+            self._adjust_counter(session, row.status, -1)
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def get(self, content_id: str) -> Optional[Dict[str, Any]]:
+        """获取内容"""
+        session = self.db_manager.get_session_direct()
+        try:
+            record = session.query(ContentRecord).filter(ContentRecord.id == content_id).first()
+            return record.to_dict() if record else None
+        finally:
+            session.close()
+
+    def list(self, status: str = None, limit: int = None) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出内容（走 status/created_at 索引）"""
+        session = self.db_manager.get_session_direct()
+        try:
+            query = session.query(ContentRecord)
+            if status:
+                query = query.filter(ContentRecord.status == status)
+            query = query.order_by(ContentRecord.created_at.desc())
+            if limit:
+                query = query.limit(limit)
+            return [record.to_dict() for record in query.all()]
+        finally:
+            session.close()
+
+    def list_page(self, status: str = None, limit: int = 50,
+                  cursor: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """键集分页：按 (created_at, id) 倒序返回一页
+
+        与偏移分页不同，翻页代价与总数据量无关，只取决于 limit。
+
+        Args:
+            status: 状态过滤
+            limit: 每页数量
+            cursor: 上一页返回的游标，为空时从最新开始
+
+        Returns:
+            Tuple[List[Dict], Optional[str]]: (本页内容, 下一页游标；没有更多时为None)
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            query = session.query(ContentRecord)
+            if status:
+                query = query.filter(ContentRecord.status == status)
+            if cursor:
+                created_at, content_id = self.decode_cursor(cursor)
+                query = query.filter(or_(
+                    ContentRecord.created_at < created_at,
+                    and_(ContentRecord.created_at == created_at, ContentRecord.id < content_id)
+                ))
+
+            # 多取一条用于判断是否还有下一页
+            records = query.order_by(
+                ContentRecord.created_at.desc(), ContentRecord.id.desc()
+            ).limit(limit + 1).all()
+
+            next_cursor = None
+            if len(records) > limit:
+                records = records[:limit]
+                last = records[-1]
+                next_cursor = self.encode_cursor(last.created_at, last.id)
+
+            return [record.to_dict() for record in records], next_cursor
+        finally:
+            session.close()
+
+    @staticmethod
+    def encode_cursor(created_at: float, content_id: str) -> str:
+        """编码分页游标"""
+        raw = json.dumps([created_at, content_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        """解码分页游标"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, content_id = json.loads(base64.urlsafe_b64decode(padded))
+            return float(created_at), str(content_id)
+        except Exception:
+            raise ValueError(f"无效的分页游标: {cursor}")
+
+    def count_by_status(self) -> Dict[str, int]:
+        """按状态统计数量（读取计数器，不扫描内容表）"""
+        session = self.db_manager.get_session_direct()
+        try:
+            return {counter.status: counter.count for counter in session.query(ContentCounter).all()}
+        finally:
+            session.close()
+
+    def count(self, status: str = None) -> int:
+        """内容总数（读取计数器）"""
+        counts = self.count_by_status()
+        if status:
+            return counts.get(status, 0)
+        return sum(counts.values())
+
+    def migrate_from_json(self, json_file: Path) -> int:
+        """一次性从旧的 contents.json 迁移数据
+
+        已存在的ID会被跳过，迁移完成后原文件重命名为 contents.json.migrated，
+        之后启动不再读取。
+
+        Returns:
+            int: 迁移的内容数量
+        """
+        json_file = Path(json_file)
+        if not json_file.exists():
+            return 0
+
+        with open(json_file, 'r', encoding='utf-8') as f:
+            contents_data = json.load(f)
+
+        session = self.db_manager.get_session_direct()
+        try:
+            existing_ids = {row.id for row in session.query(ContentRecord.id).all()}
+            rows = [
+                self._to_columns(data)
+                for content_id, data in contents_data.items()
+                if content_id not in existing_ids
+            ]
+            if rows:
+                session.bulk_insert_mappings(ContentRecord, rows)
+                for status, count in Counter(row.get('status') or 'draft' for row in rows).items():
+                    self._adjust_counter(session, status, count)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"迁移 contents.json 失败: {str(e)}")
+            raise
+        finally:
+            session.close()
+
+        os.replace(json_file, json_file.with_name(json_file.name + '.migrated'))
+        logger.info(f"已从 {json_file} 迁移 {len(rows)} 个内容项")
+        return len(rows)
+
+
+if __name__ == "__main__":
+    # 手动执行迁移: python -m src.core.content_store [contents.json路径]
+    import sys
+    from .config import config
+
+    default_file = Path(config.app.data_dir) / "contents" / "contents.json"
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else default_file
+    print(f"迁移完成，共 {ContentStore().migrate_from_json(target)} 条")
@@ -31,6 +31,9 @@ def init_database():
         Base.metadata.create_all(db_manager.engine)
         print("✅ 数据库表创建完成")
         
+        # 执行数据库迁移（为旧数据库补建索引等）
+        upgrade_database(db_manager)
+        
         # 创建默认用户
         create_default_user()
         
@@ -42,6 +45,23 @@ def init_database():
         return False
 
 
+def upgrade_database(db_manager=None):
+    """执行Alembic迁移到最新版本"""
+    from alembic import command
+    from alembic.config import Config
+    
+    db_manager = db_manager or DatabaseManager()
+    
+    print("🔧 执行数据库迁移...")
+    alembic_cfg = Config()
+    alembic_cfg.set_main_option("script_location", os.path.join(project_root, "src", "core", "migrations"))
+    with db_manager.engine.begin() as connection:
+        alembic_cfg.attributes["connection"] = connection
+        command.upgrade(alembic_cfg, "head")
+    print("✅ 数据库迁移完成")
+    return True
+
+
 def create_default_user():
     """创建默认用户"""
     try:
@@ -163,8 +183,8 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="数据库管理工具")
-    parser.add_argument('action', choices=['init', 'reset', 'status'], 
-                       help='操作类型: init=初始化, reset=重置, status=检查状态')
+    parser.add_argument('action', choices=['init', 'reset', 'status', 'upgrade'], 
+                       help='操作类型: init=初始化, reset=重置, status=检查状态, upgrade=迁移')
     
     args = parser.parse_args()
     
@@ -174,6 +194,8 @@ def main():
         success = reset_database()
     elif args.action == 'status':
         success = check_database_status()
+    elif args.action == 'upgrade':
+        success = upgrade_database()
     else:
         print("❌ 未知操作类型")
         success = False
@@ -1,14 +1,15 @@
 import asyncio
-import os
-import sys
 from contextlib import asynccontextmanager
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import Browser, BrowserContext, Page
 from typing import Optional, Dict, Any
 
 from .logger import logger
+from .browser_pool import browser_pool
+from .session_store import session_store
 from .services.user_service import user_service
 from .services.proxy_service import proxy_service
 from .services.fingerprint_service import fingerprint_service
+from .services.account_cache import ProxySnapshot, FingerprintSnapshot
 
 
 class EnhancedBrowserManager:
@@ -23,6 +24,7 @@ class EnhancedBrowserManager:
         self.current_user = None
         self.current_proxy = None
         self.current_fingerprint = None
+        self.context_key: Optional[str] = None
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -41,9 +43,9 @@ class EnhancedBrowserManager:
         try:
             logger.info("开始初始化增强浏览器管理器...")
             
-            # 获取当前用户
+            # 获取当前用户（用户、代理、指纹均读取账号缓存中的快照）
             if user_id:
-                self.current_user = user_service.get_user_by_id(user_id)
+                self.current_user = user_service.get_user_snapshot(user_id)
             else:
                 self.current_user = user_service.get_current_user()
             
@@ -53,42 +55,29 @@ class EnhancedBrowserManager:
             logger.info(f"当前用户: {self.current_user.username} ({self.current_user.display_name})")
             
             # 获取用户的代理配置
-            self.current_proxy = proxy_service.get_default_proxy_config(self.current_user.id)
+            self.current_proxy = proxy_service.get_default_proxy_snapshot(self.current_user.id)
             if self.current_proxy:
                 logger.info(f"使用代理: {self.current_proxy.name} ({self.current_proxy.host}:{self.current_proxy.port})")
             
             # 获取用户的浏览器指纹配置
-            self.current_fingerprint = fingerprint_service.get_default_fingerprint(self.current_user.id)
+            self.current_fingerprint = fingerprint_service.get_default_fingerprint_snapshot(self.current_user.id)
             if self.current_fingerprint:
                 logger.info(f"使用浏览器指纹: {self.current_fingerprint.name}")
             
-            # 启动Playwright
-            self.playwright = await async_playwright().start()
-            
-            # 获取启动参数
-            launch_args = self._get_launch_args()
-            chromium_path = self._get_chromium_path()
-            
-            if chromium_path:
-                launch_args['executable_path'] = chromium_path
-            
-            # 启动浏览器
-            self.browser = await self.playwright.chromium.launch(**launch_args)
-            
-            # 创建浏览器上下文（应用代理和指纹配置）
+            # 从浏览器池获取该用户的上下文（应用代理和指纹配置），共享浏览器进程
             context_options = self._get_context_options()
-            self.context = await self.browser.new_context(**context_options)
+            self.context_key = f"user:{self.current_user.id}"
+            self.context = await browser_pool.acquire_context(self.context_key, **context_options)
+            self.browser = self.context.browser
+            self.playwright = browser_pool.playwright
             
             # 创建页面
             self.page = await self.context.new_page()
             
-            # 注入反检测脚本和指纹配置
+            # 注入反检测脚本和指纹配置（登录状态在创建上下文时已从会话快照恢复）
             await self._inject_stealth_script()
             await self._inject_fingerprint_script()
             
-            # 恢复用户的登录状态
-            await self._restore_user_session()
-            
             self._initialized = True
             logger.info("增强浏览器管理器初始化成功")
             
@@ -97,29 +86,6 @@ class EnhancedBrowserManager:
             await self.close()
             raise
     
-    def _get_launch_args(self) -> Dict[str, Any]:
-        """获取浏览器启动参数"""
-        args = [
-            '--no-sandbox',
-            '--disable-dev-shm-usage',
-            '--disable-gpu',
-            '--disable-extensions',
-            '--disable-infobars',
-            '--start-maximized',
-            '--ignore-certificate-errors',
-            '--ignore-ssl-errors'
-        ]
-        
-        # 如果有代理配置，添加代理参数
-        if self.current_proxy:
-            proxy_url = self.current_proxy.get_proxy_url()
-            args.append(f'--proxy-server={proxy_url}')
-        
-        return {
-            'headless': False,
-            'args': args
-        }
-    
     def _get_context_options(self) -> Dict[str, Any]:
         """获取浏览器上下文选项"""
         options = {
@@ -131,46 +97,12 @@ class EnhancedBrowserManager:
             fingerprint_options = self.current_fingerprint.get_browser_context_options()
             options.update(fingerprint_options)
         
-        # 应用代理配置（如果Playwright支持上下文级代理）
+        # 应用代理配置（上下文级代理，不同用户可共享同一浏览器进程）
         if self.current_proxy:
-            proxy_dict = self.current_proxy.get_proxy_dict()
-            # 注意：Playwright的代理配置通常在启动时设置，这里主要用于记录
-            logger.info(f"代理配置: {proxy_dict}")
+            options['proxy'] = self.current_proxy.get_proxy_dict()
         
         return options
     
-    def _get_chromium_path(self) -> Optional[str]:
-        """获取Chromium路径"""
-        if not getattr(sys, 'frozen', False):
-            return None
-        
-        executable_dir = sys._MEIPASS if hasattr(sys, '_MEIPASS') else os.path.dirname(sys.executable)
-        
-        if sys.platform == 'darwin':
-            return self._get_macos_chromium_path(executable_dir)
-        else:
-            return self._get_windows_chromium_path(executable_dir)
-    
-    def _get_macos_chromium_path(self, executable_dir: str) -> str:
-        """获取macOS Chromium路径"""
-        if 'XhsAi' in executable_dir:
-            browser_path = os.path.join(executable_dir, "ms-playwright")
-        else:
-            browser_path = os.path.join(executable_dir, "Contents", "MacOS", "ms-playwright")
-        
-        return os.path.join(browser_path, "chromium-1161/chrome-mac/Chromium.app/Contents/MacOS/Chromium")
-    
-    def _get_windows_chromium_path(self, executable_dir: str) -> str:
-        """获取Windows Chromium路径"""
-        browser_path = os.path.join(executable_dir, "ms-playwright")
-        chromium_path = os.path.join(browser_path, "chrome-win", "chrome.exe")
-        
-        if os.path.exists(chromium_path):
-            os.chmod(chromium_path, 0o755)
-            return chromium_path
-        
-        raise FileNotFoundError(f"浏览器文件不存在: {chromium_path}")
-    
     async def _inject_stealth_script(self) -> None:
         """注入反检测脚本"""
         stealth_js = """
@@ -271,33 +203,15 @@ class EnhancedBrowserManager:
         """
         await self.page.add_init_script(fingerprint_js)
     
-    async def _restore_user_session(self) -> None:
-        """恢复用户的登录会话"""
-        if not self.current_user or not self.current_user.is_logged_in:
-            return
-        
-        try:
-            cookies = self.current_user.get_login_cookies()
-            if cookies:
-                await self.context.add_cookies(cookies)
-                logger.info("已恢复用户登录会话")
-        except Exception as e:
-            logger.warning(f"恢复用户会话失败: {str(e)}")
-    
     async def save_user_session(self) -> None:
-        """保存用户的登录会话"""
+        """保存用户的会话快照，并同步登录状态"""
         if not self.current_user or not self.context:
             return
         
         try:
-            cookies = await self.context.cookies()
-            if cookies:
-                user_service.update_login_status(
-                    self.current_user.id, 
-                    True, 
-                    cookies
-                )
-                logger.info("已保存用户登录会话")
+            await session_store.save(self.context_key, self.context)
+            user_service.update_login_status(self.current_user.id, session_store.is_valid(self.context_key))
+            logger.info("已保存用户登录会话")
         except Exception as e:
             logger.error(f"保存用户会话失败: {str(e)}")
     
@@ -309,10 +223,7 @@ class EnhancedBrowserManager:
         
         logger.info(f"切换用户到 ID: {user_id}")
         
-        # 保存当前用户会话
-        await self.save_user_session()
-        
-        # 关闭当前浏览器
+        # 保存当前用户会话并归还上下文（浏览器进程保持运行，切换回来时可直接复用）
         await self.close()
         
         # 切换用户
@@ -327,18 +238,18 @@ class EnhancedBrowserManager:
             raise ValueError("未找到当前用户")
         
         if proxy_id:
-            new_proxy = proxy_service.get_proxy_config_by_id(proxy_id)
+            new_proxy = ProxySnapshot.from_model(proxy_service.get_proxy_config_by_id(proxy_id))
             if not new_proxy or new_proxy.user_id != self.current_user.id:
                 raise ValueError("代理配置不存在或不属于当前用户")
         else:
-            new_proxy = proxy_service.get_default_proxy_config(self.current_user.id)
+            new_proxy = proxy_service.get_default_proxy_snapshot(self.current_user.id)
         
         if new_proxy != self.current_proxy:
             logger.info(f"更新代理配置: {new_proxy.name if new_proxy else '无代理'}")
             self.current_proxy = new_proxy
             
-            # 重新初始化浏览器以应用新的代理配置
-            await self.close()
+            # 丢弃旧上下文并以新的代理配置重新创建
+            await self.close(discard=True)
             await self.initialize()
     
     async def update_fingerprint_config(self, fingerprint_id: Optional[int] = None) -> None:
@@ -347,37 +258,36 @@ class EnhancedBrowserManager:
             raise ValueError("未找到当前用户")
         
         if fingerprint_id:
-            new_fingerprint = fingerprint_service.get_fingerprint_by_id(fingerprint_id)
+            new_fingerprint = FingerprintSnapshot.from_model(fingerprint_service.get_fingerprint_by_id(fingerprint_id))
             if not new_fingerprint or new_fingerprint.user_id != self.current_user.id:
                 raise ValueError("浏览器指纹配置不存在或不属于当前用户")
         else:
-            new_fingerprint = fingerprint_service.get_default_fingerprint(self.current_user.id)
+            new_fingerprint = fingerprint_service.get_default_fingerprint_snapshot(self.current_user.id)
         
         if new_fingerprint != self.current_fingerprint:
             logger.info(f"更新浏览器指纹配置: {new_fingerprint.name if new_fingerprint else '默认指纹'}")
             self.current_fingerprint = new_fingerprint
             
-            # 重新初始化浏览器以应用新的指纹配置
-            await self.close()
+            # 丢弃旧上下文并以新的指纹配置重新创建
+            await self.close(discard=True)
             await self.initialize()
     
-    async def close(self) -> None:
-        """关闭浏览器资源"""
+    async def close(self, discard: bool = False) -> None:
+        """关闭页面并归还浏览器上下文（浏览器进程由浏览器池管理）
+        
+        Args:
+            discard: 是否直接关闭上下文，而不是保留为空闲上下文
+        """
         try:
             # 保存用户会话
             await self.save_user_session()
             
-            if self.context:
-                await self.context.close()
-                logger.debug("浏览器上下文已关闭")
-            
-            if self.browser:
-                await self.browser.close()
-                logger.debug("浏览器已关闭")
+            if self.page and not self.page.is_closed():
+                await self.page.close()
             
-            if self.playwright:
-                await self.playwright.stop()
-                logger.debug("Playwright已停止")
+            if self.context and self.context_key:
+                await browser_pool.release_context(self.context_key, discard=discard, context=self.context)
+                logger.debug("浏览器上下文已归还")
                 
         except Exception as e:
             logger.error(f"关闭浏览器时出错: {str(e)}", exc_info=True)
@@ -386,6 +296,7 @@ class EnhancedBrowserManager:
             self.browser = None
             self.context = None
             self.page = None
+            self.context_key = None
             self._initialized = False
     
     async def ensure_initialized(self) -> None:
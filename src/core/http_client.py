@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from .logger import logger
+from .config import config
+
+
+# 访问小红书图片/视频CDN时使用的请求头
+XHS_MEDIA_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.xiaohongshu.com/'
+}
+
+
+def http2_available() -> bool:
+    """是否可以启用HTTP/2（需要安装 h2）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HttpClient:
+    """共享的出站HTTP客户端
+
+    所有出站请求共用连接池（keep-alive），同一主机的后续请求复用已建立的TCP/TLS连接；
+    安装了 h2 时启用HTTP/2。同步接口（get/post/request/stream）可在任意线程调用，
+    异步接口（aget/apost/arequest/astream）为每个事件循环创建独立的 AsyncClient。
+    同一主机的并发请求数受 max_per_host 限制，默认超时来自 config.http。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]' = \
+            weakref.WeakKeyDictionary()
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_host_semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]' = \
+            weakref.WeakKeyDictionary()
+
+    def _client_options(self) -> Dict[str, Any]:
+        http_config = config.http
+        return {
+            'http2': http_config.http2 and http2_available(),
+            'follow_redirects': True,
+            'timeout': httpx.Timeout(
+                http_config.read_timeout / 1000,
+                connect=http_config.connect_timeout / 1000
+            ),
+            'limits': httpx.Limits(
+                max_connections=http_config.max_connections,
+                max_keepalive_connections=http_config.max_keepalive_connections,
+                keepalive_expiry=http_config.keepalive_expiry / 1000
+            )
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        """同步客户端（首次使用时创建）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """当前事件循环的异步客户端（首次使用时创建）"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**self._client_options())
+            self._async_clients[loop] = client
+        return client
+
+    @staticmethod
+    def _host_of(url: str) -> str:
+        return urlsplit(str(url)).netloc
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = self._host_of(url)
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(config.http.max_per_host)
+                self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _async_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._async_host_semaphores.setdefault(loop, {})
+        host = self._host_of(url)
+        semaphore = semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(config.http.max_per_host)
+            semaphores[host] = semaphore
+        return semaphore
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """发送同步请求（读取完整响应体）"""
+        with self._host_semaphore(url):
+            return self.client.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request('POST', url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs):
+        """流式同步请求，响应体读取完毕（退出上下文）前一直占用主机名额"""
+        with self._host_semaphore(url):
+            with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """发送异步请求（读取完整响应体）"""
+        async with self._async_host_semaphore(url):
+            return await self.async_client.request(method, url, **kwargs)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest('GET', url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest('POST', url, **kwargs)
+
+    @asynccontextmanager
+    async def astream(self, method: str, url: str, **kwargs):
+        """流式异步请求"""
+        async with self._async_host_semaphore(url):
+            async with self.async_client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的异步客户端（事件循环结束前调用）"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.pop(loop, None)
+        self._async_host_semaphores.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self) -> None:
+        """关闭同步客户端"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+            logger.debug("已关闭共享HTTP客户端")
+
+
+# 全局HTTP客户端实例
+http_client = HttpClient()
@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+
+from PIL import Image, ImageOps
+
+from .logger import logger
+from .config import config
+
+
+@dataclass(frozen=True)
+class PlatformImageSpec:
+    """平台对上传图片的要求"""
+    max_long_edge: int = 1440
+    max_short_edge: int = 1080
+    # 宽高比（宽/高）范围，超出时用背景色补边到最近的边界
+    min_aspect: float = 3 / 4
+    max_aspect: float = 4 / 3
+    jpeg_quality: int = 88
+    background: str = 'white'
+
+    @classmethod
+    def from_config(cls) -> 'PlatformImageSpec':
+        xhs = config.xiaohongshu
+        return cls(
+            max_long_edge=xhs.upload_max_long_edge,
+            max_short_edge=xhs.upload_max_short_edge,
+            min_aspect=xhs.upload_min_aspect,
+            max_aspect=xhs.upload_max_aspect,
+            jpeg_quality=xhs.upload_jpeg_quality
+        )
+
+    @property
+    def cache_key(self) -> str:
+        """参数变化时缓存随之失效"""
+        raw = json.dumps(asdict(self), sort_keys=True).encode()
+        return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def preprocess_file(source: str, target: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """预处理单张图片（在子进程中执行，只依赖PIL）
+
+    按EXIF方向摆正、去除EXIF、补边到允许的宽高比、缩放到平台最大尺寸，再以JPEG重新编码。
+    """
+    spec = PlatformImageSpec(**spec)
+    with Image.open(source) as image:
+        # JPEG在解码时按1/2、1/4、1/8缩小，结果仍不小于目标尺寸
+        # （按长边估算，EXIF旋转90度时宽高互换，两个方向都取长边）
+        image.draft('RGB', (spec.max_long_edge, spec.max_long_edge))
+        image = ImageOps.exif_transpose(image)
+        icc_profile = image.info.get('icc_profile')
+
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, spec.background)
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # 补边到允许的宽高比
+        width, height = image.size
+        aspect = width / height
+        if aspect < spec.min_aspect:
+            width = round(height * spec.min_aspect)
+        elif aspect > spec.max_aspect:
+            height = round(width / spec.max_aspect)
+        if (width, height) != image.size:
+            canvas = Image.new('RGB', (width, height), spec.background)
+            canvas.paste(image, ((width - image.width) // 2, (height - image.height) // 2))
+            image = canvas
+
+        # 缩放到平台最大尺寸（只缩小不放大）
+        long_edge, short_edge = max(image.size), min(image.size)
+        scale = min(spec.max_long_edge / long_edge, spec.max_short_edge / short_edge, 1)
+        if scale < 1:
+            image = image.resize(
+                (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                Image.LANCZOS
+            )
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+        os.close(fd)
+        try:
+            options = {'quality': spec.jpeg_quality, 'optimize': True, 'progressive': True}
+            if icc_profile:
+                options['icc_profile'] = icc_profile
+            image.save(temp_path, format='JPEG', **options)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return {'size': os.path.getsize(target), 'width': image.width, 'height': image.height}
+
+
+class ImagePreprocessor:
+    """上传前的图片预处理
+
+    在进程池中并行处理（解码/缩放/编码都是CPU密集操作，不占用事件循环所在进程的GIL），
+    结果按 原图内容SHA-256 + 参数 缓存，同一张图片再次发布时直接复用；
+    缓存总大小超过 upload_cache_size 时按最近使用时间淘汰。
+    进程池不可用时退回到线程池。
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_workers: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(config.app.data_dir) / "cache" / "upload"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or config.xiaohongshu.preprocess_workers or None
+        self.max_bytes = max_bytes or config.xiaohongshu.upload_cache_size
+        self.min_age = config.xiaohongshu.upload_cache_min_age / 1000
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None:
+            try:
+                # 使用spawn启动子进程：GUI和Web进程中有多个线程，fork可能复制到被持有的锁
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            except (OSError, NotImplementedError) as e:
+                logger.warning(f"无法创建图片预处理进程池，改用线程池: {str(e)}")
+        return self._pool
+
+    @staticmethod
+    def _digest(path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def target_path(self, source: str, spec: PlatformImageSpec) -> Path:
+        return self.cache_dir / f"{self._digest(source)}_{spec.cache_key}.jpg"
+
+    async def prepare(self, images: List[str], spec: Optional[PlatformImageSpec] = None) -> List[str]:
+        """预处理一组图片，返回可直接上传的路径（顺序不变；单张失败时使用原图）"""
+        spec = spec or PlatformImageSpec.from_config()
+        prepared = list(await asyncio.gather(*(self._prepare_one(path, spec) for path in images)))
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.trim_cache)
+        except Exception as e:
+            logger.warning(f"清理图片预处理缓存失败: {str(e)}")
+        return prepared
+
+    async def _prepare_one(self, source: str, spec: PlatformImageSpec) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            target = await loop.run_in_executor(None, self.target_path, source, spec)
+            if target.exists():
+                # 更新修改时间，作为淘汰时的最近使用时间
+                await loop.run_in_executor(None, os.utime, target)
+                return str(target)
+
+            args = (source, str(target), asdict(spec))
+            pool = self._get_pool()
+            try:
+                if pool is None:
+                    raise BrokenProcessPool("进程池不可用")
+                result = await loop.run_in_executor(pool, preprocess_file, *args)
+            except BrokenProcessPool:
+                self._pool = None
+                result = await loop.run_in_executor(None, preprocess_file, *args)
+
+            logger.info(
+                f"图片预处理: {os.path.basename(source)} {os.path.getsize(source) // 1024}KB -> "
+                f"{result['width']}x{result['height']} {result['size'] // 1024}KB"
+            )
+            return str(target)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"图片预处理失败，使用原图: {source}, {str(e)}")
+            return source
+
+    def trim_cache(self) -> int:
+        """缓存总大小超过上限时按最近使用时间淘汰，返回删除的文件数
+
+        最近 upload_cache_min_age 内用过的文件（可能正在上传）不淘汰。
+        """
+        files = []
+        for path in self.cache_dir.glob('*.jpg'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return 0
+
+        cutoff = time.time() - self.min_age
+        removed = 0
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes or mtime >= cutoff:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"已淘汰 {removed} 个预处理缓存文件，当前 {total // 1024 // 1024}MB")
+        return removed
+
+    def close(self) -> None:
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# 全局图片预处理实例
+image_preprocessor = ImagePreprocessor()
+
+
+if __name__ == "__main__":
+    # 预处理基准测试: python -m src.core.image_preprocess [图片目录]
+    # 未指定目录时生成一组测试图片（12MP照片、带EXIF旋转的照片、超长截图、透明PNG）
+    import sys
+    import glob
+    import shutil
+    import time
+    # 进程池按模块名查找 preprocess_file，需使用包内模块而不是 __main__ 中的副本
+    from src.core.image_preprocess import ImagePreprocessor
+
+    def build_corpus(directory):
+        def photo(size, seed):
+            return Image.merge('RGB', (
+                Image.linear_gradient('L').resize(size),
+                Image.effect_noise(size, 30 + seed),
+                Image.linear_gradient('L').rotate(90).resize(size),
+            ))
+
+        paths = []
+        for i in range(4):
+            path = os.path.join(directory, f"photo_{i}.jpg")
+            photo((4032, 3024), i).save(path, quality=95)
+            paths.append(path)
+
+        rotated = photo((4032, 3024), 9)
+        exif = rotated.getexif()
+        exif[0x0112] = 6  # Orientation: 顺时针旋转90度
+        path = os.path.join(directory, "rotated.jpg")
+        rotated.save(path, quality=95, exif=exif)
+        paths.append(path)
+
+        path = os.path.join(directory, "screenshot.png")
+        photo((1170, 6000), 5).save(path)
+        paths.append(path)
+
+        path = os.path.join(directory, "sticker.png")
+        photo((2000, 2000), 7).convert('RGBA').save(path)
+        paths.append(path)
+        return paths
+
+    async def run(paths):
+        work_dir = tempfile.mkdtemp()
+        preprocessor = ImagePreprocessor(cache_dir=work_dir)
+        try:
+            started = time.perf_counter()
+            prepared = await preprocessor.prepare(paths)
+            elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            await preprocessor.prepare(paths)
+            cached_elapsed = time.perf_counter() - started
+        finally:
+            preprocessor.close()
+
+        before = sum(os.path.getsize(path) for path in paths)
+        after = sum(os.path.getsize(path) for path in prepared)
+        for source, target in zip(paths, prepared):
+            with Image.open(target) as image:
+                size = image.size
+            print(f"  {os.path.basename(source)}: {os.path.getsize(source) // 1024}KB -> "
+                  f"{size[0]}x{size[1]} {os.path.getsize(target) // 1024}KB")
+        print(f"上传字节: {before / 1024 / 1024:.1f}MB -> {after / 1024 / 1024:.1f}MB ({after / before:.0%})")
+        print(f"预处理耗时: {elapsed:.2f}s，命中缓存再次处理: {cached_elapsed * 1000:.0f}ms")
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if len(sys.argv) > 1:
+        corpus = sorted(p for p in glob.glob(os.path.join(sys.argv[1], '*'))
+                        if p.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')))
+        asyncio.run(run(corpus))
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            asyncio.run(run(build_corpus(corpus_dir)))
@@ -0,0 +1,232 @@
+import os
+import hashlib
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from .logger import logger
+from .models.content import ImageBlob
+from ..config.database import db_manager
+
+
+class ImageStore:
+    """内容寻址的图片存储
+
+    文件按SHA-256保存在两级分片目录中（ab/cd/abcd....jpg），相同内容只存一份。
+    image_blobs 表记录每个文件被内容引用的次数，引用归零的文件由 collect_garbage 回收
+    （启动时回收一次，之后在释放引用时由 maybe_collect_garbage 按间隔回收）。
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._last_gc = 0.0
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 临时文件与存储在同一文件系统，保证移入时的重命名是原子的
+        self.temp_dir = self.root / ".tmp"
+        self.temp_dir.mkdir(exist_ok=True)
+        self.db_manager = db_manager
+        ImageBlob.__table__.create(bind=self.db_manager.engine, checkfirst=True)
+
+    def _blob_path(self, digest: str, ext: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{ext}"
+
+    @staticmethod
+    def _normalize_ext(filename: Optional[str]) -> str:
+        ext = os.path.splitext(filename or '')[1].lower()
+        return ext if ext else '.jpg'
+
+    def put_bytes(self, data: bytes, filename: str = None) -> str:
+        """保存图片数据，已存在相同内容时直接复用
+
+        Returns:
+            str: 存储路径
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self._get_blob(digest)
+        if existing and os.path.exists(existing.path):
+            return self._register(digest, Path(existing.path), existing.size)
+
+        path = self._blob_path(digest, self._normalize_ext(filename))
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 先写临时文件再原子替换，避免读到写了一半的文件
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return self._register(digest, path, len(data))
+
+    def create_temp_file(self) -> str:
+        """创建用于流式写入的临时文件，返回路径"""
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir, suffix='.part')
+        os.close(fd)
+        return temp_path
+
+    def put_file(self, temp_path: str, digest: str, size: int, filename: str = None) -> str:
+        """将已计算好摘要的临时文件移入存储（原子重命名），已存在相同内容时删除临时文件
+
+        Returns:
+            str: 存储路径
+        """
+        existing = self._get_blob(digest)
+        if existing and os.path.exists(existing.path):
+            os.remove(temp_path)
+            return self._register(digest, Path(existing.path), existing.size)
+
+        path = self._blob_path(digest, self._normalize_ext(filename))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, path)
+
+        return self._register(digest, path, size)
+
+    def _register(self, digest: str, path: Path, size: int) -> str:
+        session = self.db_manager.get_session_direct()
+        try:
+            blob = session.query(ImageBlob).filter(ImageBlob.sha256 == digest).first()
+            if blob:
+                blob.path = str(path)
+                blob.size = size
+                # 复用未被引用的图片时重新计算宽限期，避免在关联到内容前被回收
+                if blob.ref_count <= 0:
+                    blob.created_at = datetime.utcnow()
+            else:
+                session.add(ImageBlob(sha256=digest, path=str(path), size=size, ref_count=0))
+            session.commit()
+            logger.info(f"保存图片: {path}")
+            return str(path)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def _get_blob(self, digest: str) -> Optional[ImageBlob]:
+        session = self.db_manager.get_session_direct()
+        try:
+            return session.query(ImageBlob).filter(ImageBlob.sha256 == digest).first()
+        finally:
+            session.close()
+
+    def digest_of(self, path: str) -> Optional[str]:
+        """存储内文件的摘要，不属于存储的路径返回None"""
+        try:
+            relative = Path(path).resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return None
+
+        # 分片目录结构: ab/cd/<sha256>.<ext>
+        if len(relative.parts) != 3:
+            return None
+        digest = relative.stem
+        return digest if len(digest) == 64 else None
+
+    def is_managed(self, path: str) -> bool:
+        """路径是否属于内容寻址存储"""
+        return self.digest_of(path) is not None
+
+    def incref(self, path: str) -> None:
+        """增加引用计数"""
+        self._adjust_ref(path, 1)
+
+    def decref(self, path: str) -> None:
+        """减少引用计数（文件在垃圾回收时删除）"""
+        self._adjust_ref(path, -1)
+
+    def _adjust_ref(self, path: str, delta: int) -> None:
+        digest = self.digest_of(path)
+        if not digest:
+            return
+
+        session = self.db_manager.get_session_direct()
+        try:
+            session.query(ImageBlob).filter(ImageBlob.sha256 == digest).update(
+                {ImageBlob.ref_count: ImageBlob.ref_count + delta}, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def collect_garbage(self, grace_seconds: float = 3600, sweep_disk: bool = False) -> int:
+        """回收未被引用的图片
+
+        Args:
+            grace_seconds: 宽限期，刚上传尚未关联到内容的图片不会被回收
+            sweep_disk: 是否同时清理磁盘上没有记录的文件（如崩溃残留的临时文件）
+
+        Returns:
+            int: 删除的文件数
+        """
+        removed = 0
+        self._last_gc = time.time()
+        # created_at 按UTC保存，与数据库比较用UTC；文件修改时间是时间戳，直接与当前时间戳比较
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        cutoff_ts = time.time() - grace_seconds
+
+        session = self.db_manager.get_session_direct()
+        try:
+            orphans = session.query(ImageBlob.sha256, ImageBlob.path).filter(
+                ImageBlob.ref_count <= 0, ImageBlob.created_at < cutoff
+            ).all()
+            for digest, path in orphans:
+                # 条件删除：查询之后又被引用或被重新上传的图片不删除
+                deleted = session.query(ImageBlob).filter(
+                    ImageBlob.sha256 == digest, ImageBlob.ref_count <= 0, ImageBlob.created_at < cutoff
+                ).delete(synchronize_session=False)
+                session.commit()
+                if not deleted:
+                    continue
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"删除图片失败: {path}, {str(e)}")
+
+            if sweep_disk:
+                known = {row.path for row in session.query(ImageBlob.path).all()}
+                for path in list(self.root.glob('??/??/*')) + list(self.temp_dir.glob('*.part')):
+                    if str(path) in known or path.stat().st_mtime >= cutoff_ts:
+                        continue
+                    try:
+                        path.unlink()
+                        removed += 1
+                    except OSError as e:
+                        logger.warning(f"删除图片失败: {path}, {str(e)}")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"图片垃圾回收失败: {str(e)}")
+        finally:
+            session.close()
+
+        if removed:
+            logger.info(f"图片垃圾回收: 删除 {removed} 个文件")
+        return removed
+
+    def maybe_collect_garbage(self, interval: float) -> int:
+        """距上次回收超过 interval 秒时回收一次（长时间运行的进程中定期回收，不只在启动时）"""
+        if time.time() - self._last_gc < interval:
+            return 0
+        return self.collect_garbage()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        from sqlalchemy import func
+
+        session = self.db_manager.get_session_direct()
+        try:
+            count, total_size = session.query(func.count(ImageBlob.sha256), func.sum(ImageBlob.size)).one()
+            orphans = session.query(ImageBlob).filter(ImageBlob.ref_count <= 0).count()
+            return {'files': count, 'bytes': total_size or 0, 'orphans': orphans}
+        finally:
+            session.close()
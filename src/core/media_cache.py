@@ -0,0 +1,352 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, Any, Union, List
+
+from sqlalchemy import func
+
+from .logger import logger
+from .config import config
+from .http_client import http_client
+from .models.content import MediaCacheEntry
+from ..config.database import db_manager
+
+
+@dataclass(frozen=True)
+class CachedMedia:
+    """缓存中的一个网络文件"""
+    url: str
+    path: str
+    sha256: str
+    size: int
+    content_type: Optional[str]
+    # 是否直接使用了缓存（未修改或网络失败时回退到缓存）
+    from_cache: bool
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class MediaCache:
+    """网络图片的磁盘缓存（原图 + 缩略图）
+
+    - 以URL为键，已缓存的URL用 ETag / Last-Modified 做条件请求，304时直接复用本地文件
+    - 文件按内容SHA-256命名（objects/ab/<sha256>.jpg），不同URL、并发的多次生成互不覆盖
+    - 总大小超过 media_cache_size 时按最近访问时间淘汰，最近 media_cache_min_age 内用过的文件不淘汰；
+      同一内容被多个URL引用时只计一次大小
+    - 网络请求失败且本地有缓存时返回缓存
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root) if root else Path(config.app.data_dir) / "cache" / "media"
+        self.objects_dir = self.root / "objects"
+        self.thumbs_dir = self.root / "thumbs"
+        self.temp_dir = self.root / ".tmp"
+        for directory in (self.objects_dir, self.thumbs_dir, self.temp_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or config.http.media_cache_size
+        self.db_manager = db_manager
+        MediaCacheEntry.__table__.create(bind=self.db_manager.engine, checkfirst=True)
+
+    @staticmethod
+    def _url_key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _ext_for(url: str, content_type: Optional[str]) -> str:
+        ext = os.path.splitext(url.split('?', 1)[0])[1].lower()
+        if ext and len(ext) <= 5:
+            return ext
+        ext = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) if content_type else None
+        return ext or '.jpg'
+
+    def _object_path(self, digest: str, ext: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}{ext}"
+
+    def thumbnail_path(self, digest: str, variant: Union[int, str]) -> Path:
+        """缩略图路径（调用方生成后调用 register_thumbnail），variant 为缩略图规格"""
+        return self.thumbs_dir / digest[:2] / f"{digest}_{variant}.jpg"
+
+    def get_thumbnail(self, digest: str, variant: Union[int, str]) -> Optional[str]:
+        """已生成的缩略图路径"""
+        path = self.thumbnail_path(digest, variant)
+        return str(path) if path.exists() else None
+
+    def register_thumbnail(self, digest: str, variant: Union[int, str]) -> None:
+        """登记已写入的缩略图大小（同一内容各规格缩略图合计，计入缓存容量）"""
+        path = self.thumbnail_path(digest, variant)
+        if not path.exists():
+            return
+        thumb_size = sum(
+            thumb.stat().st_size for thumb in self.thumbs_dir.glob(f"{digest[:2]}/{digest}_*.jpg")
+        )
+        session = self.db_manager.get_session_direct()
+        try:
+            session.query(MediaCacheEntry).filter(MediaCacheEntry.sha256 == digest).update(
+                {MediaCacheEntry.thumb_size: thumb_size}, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def lookup(self, url: str) -> Optional[CachedMedia]:
+        """不访问网络，直接读取缓存"""
+        entry = self._get_entry(url)
+        if entry is None or not os.path.exists(entry.path):
+            return None
+        self._touch(entry.url_key)
+        return self._to_media(entry, from_cache=True)
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> CachedMedia:
+        """获取URL内容（同步），已缓存时先做条件请求"""
+        entry = self._get_entry(url)
+        request_headers = self._conditional_headers(entry, headers)
+        try:
+            response = http_client.get(url, headers=request_headers, **kwargs)
+        except Exception:
+            if self._usable(entry):
+                logger.warning(f"请求失败，使用缓存: {url}")
+                return self._to_media(entry, from_cache=True)
+            raise
+        return self._handle_response(url, entry, response)
+
+    async def afetch(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> CachedMedia:
+        """获取URL内容（异步），数据库和文件写入在线程池中执行"""
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, self._get_entry, url)
+        request_headers = self._conditional_headers(entry, headers)
+        try:
+            response = await http_client.aget(url, headers=request_headers, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if self._usable(entry):
+                logger.warning(f"请求失败，使用缓存: {url}")
+                return self._to_media(entry, from_cache=True)
+            raise
+        return await loop.run_in_executor(None, self._handle_response, url, entry, response)
+
+    @staticmethod
+    def _usable(entry: Optional[MediaCacheEntry]) -> bool:
+        return entry is not None and os.path.exists(entry.path)
+
+    def _conditional_headers(self, entry: Optional[MediaCacheEntry],
+                             headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        request_headers = dict(headers or {})
+        if self._usable(entry):
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+        return request_headers
+
+    def _handle_response(self, url: str, entry: Optional[MediaCacheEntry], response) -> CachedMedia:
+        if response.status_code == 304 and self._usable(entry):
+            self._touch(entry.url_key)
+            return self._to_media(entry, from_cache=True)
+
+        if response.status_code != 200:
+            raise Exception(f"下载失败: HTTP {response.status_code}")
+
+        return self._store(url, response)
+
+    def _store(self, url: str, response) -> CachedMedia:
+        """保存响应内容：按内容摘要命名，相同内容只存一份"""
+        data = response.content
+        digest = hashlib.sha256(data).hexdigest()
+        content_type = response.headers.get('content-type')
+        path = self._object_path(digest, self._ext_for(url, content_type))
+
+        existing = next(iter(self.objects_dir.glob(f"{digest[:2]}/{digest}.*")), None)
+        if existing is not None:
+            path = existing
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再原子替换，并发写入同一内容时结果相同
+            fd, temp_path = tempfile.mkstemp(dir=self.temp_dir, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        session = self.db_manager.get_session_direct()
+        try:
+            previous = session.query(MediaCacheEntry.sha256, MediaCacheEntry.path).filter(
+                MediaCacheEntry.url_key == self._url_key(url)
+            ).first()
+            entry = session.merge(MediaCacheEntry(
+                url_key=self._url_key(url),
+                url=url,
+                sha256=digest,
+                path=str(path),
+                size=len(data),
+                content_type=content_type,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified'),
+                last_access=time.time()
+            ))
+            session.commit()
+            media = self._to_media(entry, from_cache=False)
+
+            # URL的内容已变化，旧文件不再被任何URL引用时删除
+            if previous and previous.sha256 != digest and session.query(MediaCacheEntry).filter(
+                MediaCacheEntry.sha256 == previous.sha256
+            ).first() is None:
+                self._remove_files(previous.sha256, previous.path)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        self.evict()
+        return media
+
+    def _get_entry(self, url: str) -> Optional[MediaCacheEntry]:
+        session = self.db_manager.get_session_direct()
+        try:
+            return session.query(MediaCacheEntry).filter(
+                MediaCacheEntry.url_key == self._url_key(url)
+            ).first()
+        finally:
+            session.close()
+
+    def touch_paths(self, paths: List[str]) -> List[str]:
+        """发布前刷新缓存文件的访问时间，使其在 media_cache_min_age 内不被淘汰
+
+        Returns:
+            List[str]: 已不存在的文件路径（已被淘汰，需要重新下载）
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            session.query(MediaCacheEntry).filter(MediaCacheEntry.path.in_(paths)).update(
+                {MediaCacheEntry.last_access: time.time()}, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.debug(f"更新缓存访问时间失败: {str(e)}")
+        finally:
+            session.close()
+        return [path for path in paths if not os.path.exists(path)]
+
+    def _touch(self, url_key: str) -> None:
+        session = self.db_manager.get_session_direct()
+        try:
+            session.query(MediaCacheEntry).filter(MediaCacheEntry.url_key == url_key).update(
+                {MediaCacheEntry.last_access: time.time()}, synchronize_session=False
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.debug(f"更新缓存访问时间失败: {str(e)}")
+        finally:
+            session.close()
+
+    @staticmethod
+    def _to_media(entry: MediaCacheEntry, from_cache: bool) -> CachedMedia:
+        return CachedMedia(
+            url=entry.url,
+            path=entry.path,
+            sha256=entry.sha256,
+            size=entry.size,
+            content_type=entry.content_type,
+            from_cache=from_cache
+        )
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """超过容量上限时按最近访问时间淘汰
+
+        Returns:
+            int: 淘汰的记录数
+        """
+        max_bytes = max_bytes or self.max_bytes
+        cutoff = time.time() - config.http.media_cache_min_age / 1000
+        removed = 0
+        orphaned = []
+
+        session = self.db_manager.get_session_direct()
+        try:
+            # 按内容统计：同一内容只占一份原图和一组缩略图
+            digests = {
+                row.sha256: [row.refs, row.size]
+                for row in session.query(
+                    MediaCacheEntry.sha256,
+                    func.count(MediaCacheEntry.url_key).label('refs'),
+                    (func.max(MediaCacheEntry.size) + func.max(MediaCacheEntry.thumb_size)).label('size')
+                ).group_by(MediaCacheEntry.sha256)
+            }
+            total = sum(size for _, size in digests.values())
+            if total <= max_bytes:
+                return 0
+
+            candidates = session.query(
+                MediaCacheEntry.url_key, MediaCacheEntry.sha256, MediaCacheEntry.path
+            ).filter(
+                MediaCacheEntry.last_access < cutoff
+            ).order_by(MediaCacheEntry.last_access).all()
+
+            for entry in candidates:
+                if total <= max_bytes:
+                    break
+                session.query(MediaCacheEntry).filter(MediaCacheEntry.url_key == entry.url_key).delete()
+                removed += 1
+                # 其他URL仍引用同一内容时保留文件
+                digest = digests[entry.sha256]
+                digest[0] -= 1
+                if digest[0] == 0:
+                    total -= digest[1]
+                    orphaned.append((entry.sha256, entry.path))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"图片缓存淘汰失败: {str(e)}")
+            return 0
+        finally:
+            session.close()
+
+        # 记录删除提交后再删除文件，提交失败时文件仍可用
+        for digest, path in orphaned:
+            self._remove_files(digest, path)
+
+        if removed:
+            logger.info(f"图片缓存淘汰: {removed} 项")
+        return removed
+
+    def _remove_files(self, digest: str, path: str) -> None:
+        for file_path in [Path(path), *self.thumbs_dir.glob(f"{digest[:2]}/{digest}_*")]:
+            try:
+                if file_path.exists():
+                    file_path.unlink()
+            except OSError as e:
+                logger.warning(f"删除缓存文件失败: {file_path}, {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        session = self.db_manager.get_session_direct()
+        try:
+            count = session.query(func.count(MediaCacheEntry.url_key)).scalar()
+            per_digest = session.query(
+                (func.max(MediaCacheEntry.size) + func.max(MediaCacheEntry.thumb_size)).label('size')
+            ).group_by(MediaCacheEntry.sha256).subquery()
+            size = session.query(func.coalesce(func.sum(per_digest.c.size), 0)).scalar()
+            return {'entries': count, 'bytes': size, 'max_bytes': self.max_bytes}
+        finally:
+            session.close()
+
+
+# 全局图片缓存实例
+media_cache = MediaCache()
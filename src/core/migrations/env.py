@@ -0,0 +1,73 @@
+"""
+Alembic 迁移环境
+默认连接 ~/.xhs_system/xhs_data.db，也可通过 alembic.ini 的 sqlalchemy.url 指定
+"""
+
+import os
+import sys
+
+from alembic import context
+from sqlalchemy import create_engine
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.core.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """获取数据库地址"""
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        return url
+    from src.config.database import db_manager
+    return f"sqlite:///{db_manager.db_path}"
+
+
+def run_migrations_offline() -> None:
+    """离线模式：只生成SQL"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """在线模式：直接连接数据库执行（程序内调用时复用传入的连接）"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    engine = create_engine(get_url())
+    try:
+        with engine.connect() as connection:
+            _run_with_connection(connection)
+    finally:
+        engine.dispose()
+
+
+def _run_with_connection(connection) -> None:
+    # SQLite 不支持大部分 ALTER TABLE，使用批量模式重建表
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
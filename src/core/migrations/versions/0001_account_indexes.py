@@ -0,0 +1,33 @@
+"""为用户、代理配置、浏览器指纹表添加复合索引
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (索引名, 表名, 列)
+INDEXES = [
+    ('ix_users_is_current', 'users', ['is_current']),
+    ('ix_proxy_configs_user_default_active', 'proxy_configs', ['user_id', 'is_default', 'is_active']),
+    ('ix_proxy_configs_user_name', 'proxy_configs', ['user_id', 'name']),
+    ('ix_browser_fingerprints_user_default_active', 'browser_fingerprints', ['user_id', 'is_default', 'is_active']),
+    ('ix_browser_fingerprints_user_name', 'browser_fingerprints', ['user_id', 'name']),
+]
+
+
+def upgrade() -> None:
+    # 新建的数据库由 create_all 直接创建了索引，这里只为旧数据库补建
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
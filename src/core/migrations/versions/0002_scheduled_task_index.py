@@ -0,0 +1,22 @@
+"""为定时任务表添加 (is_active, next_run_time) 索引
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_scheduled_tasks_active_next_run', 'scheduled_tasks',
+                    ['is_active', 'next_run_time'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scheduled_tasks_active_next_run', table_name='scheduled_tasks', if_exists=True)
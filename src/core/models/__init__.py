@@ -5,7 +5,7 @@
 
 # 从user模块导入Base和所有模型类
 from .user import Base, User, ProxyConfig, BrowserFingerprint
-from .content import ContentTemplate, PublishHistory, ScheduledTask
+from .content import ContentTemplate, PublishHistory, ScheduledTask, PublishQueueJob, ContentRecord, ContentCounter, ImageBlob, MediaCacheEntry
 
 # 公开的模型接口
 __all__ = [
@@ -15,5 +15,10 @@ __all__ = [
     'BrowserFingerprint',
     'ContentTemplate',
     'PublishHistory',
-    'ScheduledTask'
+    'ScheduledTask',
+    'PublishQueueJob',
+    'ContentRecord',
+    'ContentCounter',
+    'ImageBlob',
+    'MediaCacheEntry'
 ] 
\ No newline at end of file
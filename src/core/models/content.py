@@ -4,7 +4,8 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+import json
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index, Float
 from sqlalchemy.orm import relationship
 
 # 从user模块导入Base
@@ -106,6 +107,11 @@ class ScheduledTask(Base):
     created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
     
+    # 调度器按 (is_active, next_run_time) 顺序读取最近到期的任务
+    __table_args__ = (
+        Index('ix_scheduled_tasks_active_next_run', 'is_active', 'next_run_time'),
+    )
+    
     # 关联关系
     user = relationship("User", back_populates="scheduled_tasks")
     template = relationship("ContentTemplate")
@@ -129,4 +135,149 @@ class ScheduledTask(Base):
             'run_count': self.run_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        }
+
+
+class PublishQueueJob(Base):
+    """发布队列任务模型（持久化，进程重启后可继续执行）"""
+    __tablename__ = 'publish_jobs'
+    
+    id = Column(String(32), primary_key=True, comment='任务ID')
+    idempotency_key = Column(String(128), unique=True, comment='幂等键')
+    user_id = Column(Integer, ForeignKey('users.id'), comment='用户ID（为空时使用默认账号）')
+    content_id = Column(String(50), comment='内容ID')
+    title = Column(String(200), nullable=False, comment='发布标题')
+    content = Column(Text, nullable=False, comment='发布内容')
+    images = Column(Text, comment='图片路径（JSON数组）')
+    status = Column(String(20), default='pending', comment='任务状态: pending, running, succeeded, awaiting_manual, failed')
+    attempts = Column(Integer, default=0, comment='已尝试次数')
+    max_attempts = Column(Integer, default=3, comment='最大尝试次数')
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, comment='下次可执行时间')
+    locked_by = Column(String(64), comment='执行中的工作者')
+    locked_until = Column(DateTime, comment='租约到期时间')
+    last_error = Column(Text, comment='最后一次错误信息')
+    created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+    finished_at = Column(DateTime, comment='完成时间')
+    
+    __table_args__ = (
+        Index('ix_publish_jobs_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f"<PublishQueueJob(id='{self.id}', status='{self.status}', attempts={self.attempts})>"
+    
+    def get_images(self):
+        """获取图片路径列表"""
+        return json.loads(self.images) if self.images else []
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'idempotency_key': self.idempotency_key,
+            'user_id': self.user_id,
+            'content_id': self.content_id,
+            'title': self.title,
+            'images': self.get_images(),
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ContentRecord(Base):
+    """内容草稿模型（ContentManager 的存储后端）"""
+    __tablename__ = 'contents'
+    
+    id = Column(String(32), primary_key=True, comment='内容ID')
+    title = Column(String(200), nullable=False, comment='标题')
+    content = Column(Text, nullable=False, comment='正文')
+    images = Column(Text, comment='图片路径（JSON数组）')
+    tags = Column(Text, comment='标签（JSON数组）')
+    status = Column(String(20), default='draft', comment='状态: draft, publishing, published, failed')
+    created_at = Column(Float, nullable=False, comment='创建时间（时间戳）')
+    published_at = Column(Float, comment='发布时间（时间戳）')
+    error_message = Column(Text, comment='错误信息')
+    
+    # 键集分页按 (created_at, id) 倒序，索引包含 id 以便直接定位游标位置
+    __table_args__ = (
+        Index('ix_contents_created_at', 'created_at', 'id'),
+        Index('ix_contents_status_created_at', 'status', 'created_at', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"<ContentRecord(id='{self.id}', title='{self.title}', status='{self.status}')>"
+    
+    def to_dict(self):
+        """转换为字典（与 ContentItem 字段一致）"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'content': self.content,
+            'images': json.loads(self.images) if self.images else [],
+            'tags': json.loads(self.tags) if self.tags else [],
+            'created_at': self.created_at,
+            'status': self.status,
+            'published_at': self.published_at,
+            'error_message': self.error_message
+        }
+
+
+class ContentCounter(Base):
+    """内容数量计数器（按状态维护，避免统计时全表扫描）"""
+    __tablename__ = 'content_counters'
+    
+    status = Column(String(20), primary_key=True, comment='状态')
+    count = Column(Integer, nullable=False, default=0, comment='数量')
+    
+    def __repr__(self):
+        return f"<ContentCounter(status='{self.status}', count={self.count})>"
+
+
+class ImageBlob(Base):
+    """图片存储中的内容寻址文件（按SHA-256去重，引用计数为0时可被回收）"""
+    __tablename__ = 'image_blobs'
+    
+    sha256 = Column(String(64), primary_key=True, comment='文件SHA-256')
+    path = Column(String(500), nullable=False, comment='存储路径')
+    size = Column(Integer, comment='文件大小（字节）')
+    ref_count = Column(Integer, nullable=False, default=0, comment='被内容引用的次数')
+    created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
+    
+    __table_args__ = (
+        Index('ix_image_blobs_ref_count', 'ref_count'),
+    )
+    
+    def __repr__(self):
+        return f"<ImageBlob(sha256='{self.sha256[:12]}', ref_count={self.ref_count})>"
+
+
+class MediaCacheEntry(Base):
+    """网络图片的磁盘缓存记录（按URL索引，文件按内容SHA-256命名，按最近访问时间淘汰）"""
+    __tablename__ = 'media_cache'
+    
+    url_key = Column(String(40), primary_key=True, comment='URL的SHA-1')
+    url = Column(Text, nullable=False, comment='原始URL')
+    sha256 = Column(String(64), nullable=False, comment='内容SHA-256')
+    path = Column(String(500), nullable=False, comment='原图路径')
+    size = Column(Integer, nullable=False, default=0, comment='原图大小（字节）')
+    thumb_size = Column(Integer, nullable=False, default=0, comment='缩略图大小（字节）')
+    content_type = Column(String(100), comment='Content-Type')
+    etag = Column(String(200), comment='ETag响应头')
+    last_modified = Column(String(100), comment='Last-Modified响应头')
+    last_access = Column(Float, nullable=False, comment='最近访问时间（时间戳）')
+    created_at = Column(DateTime, default=datetime.utcnow, comment='创建时间')
+    
+    __table_args__ = (
+        Index('ix_media_cache_last_access', 'last_access'),
+        Index('ix_media_cache_sha256', 'sha256'),
+    )
+    
+    def __repr__(self):
+        return f"<MediaCacheEntry(url='{self.url[:40]}', sha256='{self.sha256[:12]}')>"
@@ -4,7 +4,7 @@
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -34,6 +34,10 @@ class User(Base):
     publish_history = relationship("PublishHistory", back_populates="user", cascade="all, delete-orphan")
     scheduled_tasks = relationship("ScheduledTask", back_populates="user", cascade="all, delete-orphan")
     
+    __table_args__ = (
+        Index('ix_users_is_current', 'is_current'),
+    )
+    
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', phone='{self.phone}')>"
     
@@ -77,6 +81,12 @@ class ProxyConfig(Base):
     # 关联关系
     user = relationship("User", back_populates="proxy_configs")
     
+    # 服务层按 (user_id, is_default, is_active) 查默认代理、按 (user_id, name) 查重名
+    __table_args__ = (
+        Index('ix_proxy_configs_user_default_active', 'user_id', 'is_default', 'is_active'),
+        Index('ix_proxy_configs_user_name', 'user_id', 'name'),
+    )
+    
     def __repr__(self):
         return f"<ProxyConfig(id={self.id}, name='{self.name}', host='{self.host}:{self.port}')>"
     
@@ -106,6 +116,15 @@ class ProxyConfig(Base):
             return f"{self.proxy_type}://{self.username}:{self.password}@{self.host}:{self.port}"
         else:
             return f"{self.proxy_type}://{self.host}:{self.port}"
+    
+    def get_proxy_dict(self):
+        """获取Playwright上下文级代理配置"""
+        proxy = {'server': f"{self.proxy_type}://{self.host}:{self.port}"}
+        if self.username:
+            proxy['username'] = self.username
+        if self.password:
+            proxy['password'] = self.password
+        return proxy
 
 
 class BrowserFingerprint(Base):
@@ -138,6 +157,11 @@ class BrowserFingerprint(Base):
     # 关联关系
     user = relationship("User", back_populates="browser_fingerprints")
     
+    __table_args__ = (
+        Index('ix_browser_fingerprints_user_default_active', 'user_id', 'is_default', 'is_active'),
+        Index('ix_browser_fingerprints_user_name', 'user_id', 'name'),
+    )
+    
     def __repr__(self):
         return f"<BrowserFingerprint(id={self.id}, name='{self.name}', platform='{self.platform}')>"
     
@@ -166,4 +190,18 @@ class BrowserFingerprint(Base):
             'is_default': self.is_default,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        } 
\ No newline at end of file
+        }
+    
+    def get_browser_context_options(self):
+        """获取Playwright浏览器上下文参数"""
+        options = {
+            'viewport': {'width': self.viewport_width or 1920, 'height': self.viewport_height or 1080},
+            'screen': {'width': self.screen_width or 1920, 'height': self.screen_height or 1080},
+        }
+        if self.user_agent:
+            options['user_agent'] = self.user_agent
+        if self.locale:
+            options['locale'] = self.locale
+        if self.timezone:
+            options['timezone_id'] = self.timezone
+        return options
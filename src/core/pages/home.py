@@ -8,6 +8,7 @@ from PyQt6.QtWidgets import (QFrame, QHBoxLayout, QLabel, QLineEdit,
 from src.core.alert import TipWindow
 from src.core.processor.content import ContentGeneratorThread
 from src.core.processor.img import ImageProcessorThread
+from src.core.media_cache import media_cache
 
 class HomePage(QWidget):
     """主页类"""
@@ -19,6 +20,7 @@ class HomePage(QWidget):
         # 初始化变量
         self.images = []
         self.image_list = []
+        self.ready_images = {}
         self.current_image_index = 0
         # 创建占位图
         self.placeholder_photo = QPixmap(200, 200)
@@ -424,10 +426,7 @@ class HomePage(QWidget):
             self.parent.update_login_button("⏳ 登录中...", False)
 
             # 添加登录任务到浏览器线程
-            self.parent.browser_thread.action_queue.append({
-                'type': 'login',
-                'phone': phone
-            })
+            self.parent.browser_thread.submit('login', phone=phone)
 
         except Exception as e:
             TipWindow(self.parent, f"❌ 登录失败: {str(e)}").show()
@@ -576,10 +575,21 @@ class HomePage(QWidget):
 
     def update_ui_after_generate(self, title, content, cover_image_url, content_image_urls, input_text):
         try:
-            # 创建并启动图片处理线程
+            # 取消上一次尚未完成的图片下载，线程退出后再释放
+            previous = getattr(self.parent, 'image_processor', None)
+            if previous is not None:
+                previous.finished.connect(previous.deleteLater)
+                if previous.isRunning():
+                    previous.cancel()
+                else:
+                    previous.deleteLater()
+
+            # 创建并启动图片处理线程（以页面为父对象，引用被替换时不会在运行中被销毁）
             self.parent.image_processor = ImageProcessorThread(
-                cover_image_url, content_image_urls)
-            self.parent.image_processor.finished.connect(
+                cover_image_url, content_image_urls, parent=self)
+            self.parent.image_processor.image_ready.connect(
+                self.handle_image_ready)
+            self.parent.image_processor.all_ready.connect(
                 self.handle_image_processing_result)
             self.parent.image_processor.error.connect(
                 self.handle_image_processing_error)
@@ -600,6 +610,7 @@ class HomePage(QWidget):
             # 清空之前的图片列表
             self.images = []
             self.image_list = []
+            self.ready_images = {}
             self.current_image_index = 0
 
             # 显示占位图
@@ -610,7 +621,27 @@ class HomePage(QWidget):
             print(f"更新UI时出错: {str(e)}")
             TipWindow(self.parent, f"❌ 更新内容失败: {str(e)}").show()
 
+    def handle_image_ready(self, index, img_path, pixmap_info):
+        """单张图片处理完成：按原始顺序插入并立即显示，不等待其余图片"""
+        if self.sender() is not self.parent.image_processor:
+            return  # 上一次生成的图片，已过期
+
+        self.ready_images[index] = (img_path, pixmap_info)
+        ordered = [self.ready_images[i] for i in sorted(self.ready_images)]
+        current = self.image_list[self.current_image_index] if self.image_list else None
+
+        self.images = [img_path for img_path, _ in ordered]
+        self.image_list = [info for _, info in ordered]
+
+        # 保持当前正在查看的图片不变；首张到达的图片直接显示
+        if current is not None:
+            self.current_image_index = next(
+                i for i, info in enumerate(self.image_list) if info is current)
+        self.show_current_image()
+
     def handle_image_processing_result(self, images, image_list):
+        if self.sender() is not self.parent.image_processor:
+            return
         try:
             self.images = images
             self.image_list = image_list
@@ -619,9 +650,10 @@ class HomePage(QWidget):
             print(f"收到图片处理结果: {len(images)} 张图片")
 
             if self.image_list:
-                # 确保当前索引有效
-                self.current_image_index = 0
-                # 显示第一张图片
+                # 确保当前索引有效（逐张显示期间用户可能已切换到其他图片）
+                if self.current_image_index >= len(self.image_list):
+                    self.current_image_index = 0
+                # 显示当前图片
                 current_image = self.image_list[self.current_image_index]
                 if current_image and 'pixmap' in current_image:
                     self.image_label.setPixmap(current_image['pixmap'])
@@ -689,16 +721,21 @@ class HomePage(QWidget):
             title = self.title_input.text()
             content = self.subtitle_input.toPlainText()
 
+            # 图片直接使用图片缓存中的原图，发布前刷新访问时间，避免在发布过程中被淘汰
+            if media_cache.touch_paths(self.images):
+                TipWindow(self.parent, "❌ 部分图片缓存已被清理，请重新生成内容").show()
+                return
+
             # 更新预览按钮状态
             self.parent.update_preview_button("⏳ 发布中...", False)
 
             # 添加预览任务到浏览器线程
-            self.parent.browser_thread.action_queue.append({
-                'type': 'preview',
-                'title': title,
-                'content': content,
-                'images': self.images
-            })
+            self.parent.browser_thread.submit(
+                'preview',
+                title=title,
+                content=content,
+                images=self.images
+            )
 
         except Exception as e:
             TipWindow(self.parent, f"❌ 预览发布失败: {str(e)}").show()
@@ -713,6 +750,14 @@ class HomePage(QWidget):
         self.parent.update_preview_button("🎯 预览发布", True)
         TipWindow(self.parent, f"❌ 预览发布失败: {error_msg}").show()
 
+    def handle_publish_success(self, job_id):
+        """多账号/定时发布完成"""
+        TipWindow(self.parent, "🎉 发布成功").show()
+
+    def handle_publish_error(self, job_id, error_msg):
+        """多账号/定时发布未完成（失败或等待手动发布）"""
+        TipWindow(self.parent, f"❌ 发布未完成: {error_msg}").show()
+
     def update_title_config(self):
         """更新标题配置"""
         try:
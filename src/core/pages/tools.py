@@ -1,17 +1,23 @@
-import base64
 import sys
 import os
 import asyncio
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import requests
 from PyQt6.QtWidgets import (QFrame, QHBoxLayout, QLabel, QPushButton,
                              QScrollArea, QTextEdit, QVBoxLayout, QWidget,
                              QScrollArea, QGridLayout, QFileDialog)
-from PyQt6.QtCore import Qt, QByteArray, QThread, pyqtSignal
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImage
 
 from src.core.alert import TipWindow
+from src.core.config import config
+from src.core.http_client import http_client, XHS_MEDIA_HEADERS
+from src.core.media_cache import media_cache
+from src.core.batch_download import BatchDownloader, DownloadItem
+from src.core.processor.img import render_thumbnail, cached_thumbnail
+
+
+THUMB_WIDTH, THUMB_HEIGHT = 150, 200  # 工具箱图片卡片的缩略图尺寸
+THUMB_VARIANT = f"{THUMB_WIDTH}x{THUMB_HEIGHT}"
 
 
 class VideoProcessThread(QThread):
@@ -53,14 +59,11 @@ class VideoProcessThread(QThread):
                 "index": [3, 6, 9]
             }
 
-            # 使用aiohttp替代同步的requests可能更好，但为了最小修改，这里用异步包装requests
             self.progress.emit("正在获取视频信息...")
             
-            # 将同步请求封装成异步任务
-            response_data = await self.loop.run_in_executor(
-                None, 
-                lambda: requests.post(server, json=data).json()
-            )
+            # 本地解析服务需要下载视频，不限制读取超时
+            response = await http_client.apost(server, json=data, timeout=None)
+            response_data = response.json()
             
             if 'data' in response_data:
                 self.progress.emit("解析完成，正在处理数据...")
@@ -70,6 +73,8 @@ class VideoProcessThread(QThread):
                 
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            await http_client.aclose()
 
 class DownloadThread(QThread):
     """下载线程"""
@@ -84,10 +89,7 @@ class DownloadThread(QThread):
 
     def run(self):
         try:
-            response = requests.get(self.url, headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Referer': 'https://www.xiaohongshu.com/'
-            })
+            response = http_client.get(self.url, headers=XHS_MEDIA_HEADERS)
             if response.status_code == 200:
                 with open(self.save_path, 'wb') as f:
                     f.write(response.content)
@@ -98,35 +100,223 @@ class DownloadThread(QThread):
             self.error.emit(f"❌ 下载失败: {str(e)}")
 
 class BatchDownloadThread(QThread):
-    """批量下载线程"""
-    finished = pyqtSignal()     # 全部下载完成信号
+    """批量下载线程
+
+    在线程内的事件循环中用 BatchDownloader 并发下载，流式写入并支持断点续传，
+    已完整下载过的图片直接跳过。
+    """
+    finished = pyqtSignal(str)  # 全部下载完成信号（汇总信息）
     error = pyqtSignal(str)     # 下载错误信号
-    progress = pyqtSignal(str)  # 下载进度信号
+    progress = pyqtSignal(str)  # 下载进度信号（整体进度和速度）
 
     def __init__(self, urls, save_dir):
         super().__init__()
         self.urls = urls
         self.save_dir = save_dir
+        self.loop = None
+        self._main_task = None
 
     def run(self):
-        for i, url in enumerate(self.urls, 1):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._main_task = self.loop.create_task(self.download_all())
+            self.finished.emit(self.loop.run_until_complete(self._main_task))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error.emit(f"❌ 批量下载失败: {str(e)}")
+        finally:
+            self.loop.run_until_complete(http_client.aclose())
+            self.loop.close()
+
+    def cancel(self):
+        """取消下载（已下载的部分保留在 .part 文件中，下次从断点继续）"""
+        if self.loop and self._main_task and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+
+    async def download_all(self):
+        items = [
+            DownloadItem(url, os.path.join(self.save_dir, f"图片_{i}.jpg"))
+            for i, url in enumerate(self.urls, 1)
+        ]
+        downloader = BatchDownloader(
+            headers=XHS_MEDIA_HEADERS,
+            on_progress=lambda progress: self.progress.emit(f"⬇️ 下载中 {progress.summary()}")
+        )
+        results = await downloader.download(items)
+
+        progress = downloader.progress
+        message = (f"✅ 下载完成 {progress.completed} 张，已存在跳过 {progress.skipped} 张，"
+                   f"平均 {progress.throughput / 1024 / 1024:.2f}MB/s")
+        failed = [result for result in results if result.status == 'failed']
+        if failed:
+            message += f"，失败 {len(failed)} 张（{failed[0].error}）"
+        return message
+
+class MediaPreviewThread(QThread):
+    """媒体预览线程
+
+    在线程内的事件循环中并发下载图片（经由图片缓存，并发数 config.http.image_concurrency），
+    每张图片只生成卡片大小的缩略图（已缓存时直接读取），完成一张发出一张。
+    """
+    thumbnail_ready = pyqtSignal(int, QImage)  # 单张缩略图完成：序号、缩略图
+    thumbnail_failed = pyqtSignal(int, str)    # 单张图片失败：序号、错误信息
+
+    def __init__(self, urls, parent=None):
+        super().__init__(parent)
+        self.urls = list(urls)
+        self.loop = None
+        self._main_task = None
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._main_task = self.loop.create_task(self.load_all())
+            self.loop.run_until_complete(self._main_task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"加载媒体预览失败: {str(e)}")
+        finally:
+            self.loop.run_until_complete(http_client.aclose())
+            self.loop.close()
+
+    def cancel(self):
+        """取消尚未完成的下载（可在任意线程调用）"""
+        if self.loop and self._main_task and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+
+    async def load_all(self):
+        semaphore = asyncio.Semaphore(config.http.image_concurrency)
+
+        async def load_one(index, url):
+            async with semaphore:
+                await self.load_thumbnail(index, url)
+
+        await asyncio.gather(*(load_one(index, url) for index, url in enumerate(self.urls)))
+
+    async def load_thumbnail(self, index, url):
+        """下载并生成单张缩略图，失败时按指数退避重试"""
+        retries = config.http.image_retries
+        timeout = config.http.image_timeout / 1000
+        backoff = config.http.image_retry_backoff / 1000
+
+        for attempt in range(retries):
             try:
-                filename = f"图片_{i}.jpg"
-                file_path = os.path.join(self.save_dir, filename)
-                
-                response = requests.get(url, headers={
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Referer': 'https://www.xiaohongshu.com/'
-                })
-                if response.status_code == 200:
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-                    self.progress.emit(f"✅ 图片_{i} 已保存")
-                else:
-                    raise Exception(f"下载失败: HTTP {response.status_code}")
+                media = await asyncio.wait_for(
+                    media_cache.afetch(url, headers=XHS_MEDIA_HEADERS), timeout=timeout
+                )
+                qimage = await self.loop.run_in_executor(
+                    None, cached_thumbnail, media, THUMB_VARIANT,
+                    lambda data: render_thumbnail(data, THUMB_WIDTH, THUMB_HEIGHT)
+                )
+                if qimage.isNull():
+                    raise Exception("图片加载失败")
+                self.thumbnail_ready.emit(index, qimage)
+                return
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                self.error.emit(f"❌ 图片_{i} 下载失败: {str(e)}")
-        self.finished.emit()
+                error = str(e) or e.__class__.__name__
+                if attempt + 1 < retries:
+                    await asyncio.sleep(backoff * (2 ** attempt))
+                else:
+                    print(f"加载图片失败: {error}")
+                    self.thumbnail_failed.emit(index, error)
+
+
+class MediaGridWidget(QWidget):
+    """图片网格：先显示占位卡片，缩略图到达后逐张填充"""
+    download_requested = pyqtSignal(str, str)  # 图片URL、默认文件名
+
+    COLUMNS = 4  # 每行最多显示4个图片
+
+    def __init__(self, urls, parent=None):
+        super().__init__(parent)
+        self.image_labels = []
+
+        grid_layout = QGridLayout(self)
+        grid_layout.setSpacing(4)
+        grid_layout.setContentsMargins(0, 0, 0, 0)
+
+        for index, url in enumerate(urls):
+            row, col = divmod(index, self.COLUMNS)
+            grid_layout.addWidget(self.create_card(index, url), row, col)
+
+    def create_card(self, index, url):
+        """创建图片卡片（缩略图未到达前显示加载提示）"""
+        image_card = QFrame()
+        image_card.setFixedSize(THUMB_WIDTH, THUMB_HEIGHT + 30)
+        image_card.setStyleSheet("""
+            QFrame {
+                background-color: white;
+                margin: 0;
+                padding: 0;
+            }
+        """)
+        card_layout = QVBoxLayout(image_card)
+        card_layout.setContentsMargins(0, 0, 0, 0)
+        card_layout.setSpacing(0)
+
+        image_label = QLabel("加载中...")
+        image_label.setFixedSize(THUMB_WIDTH, THUMB_HEIGHT)
+        image_label.setStyleSheet("""
+            QLabel {
+                border: none;
+                padding: 0;
+                margin: 0;
+                color: #999999;
+                font-size: 12px;
+                background: #f8f9fa;
+            }
+        """)
+        image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        card_layout.addWidget(image_label)
+        self.image_labels.append(image_label)
+
+        # 添加下载按钮
+        download_link = QPushButton("下载图片")
+        download_link.setFixedHeight(20)
+        download_link.setCursor(Qt.CursorShape.PointingHandCursor)
+        download_link.setStyleSheet("""
+            QPushButton {
+                color: #4a90e2;
+                border: none;
+                background: none;
+                text-align: center;
+                padding: 0;
+                margin: 0;
+                font-size: 12px;
+            }
+            QPushButton:hover {
+                text-decoration: underline;
+            }
+        """)
+        download_link.clicked.connect(
+            lambda checked, u=url, i=index+1: self.download_requested.emit(u, f"图片_{i}.jpg"))
+        card_layout.addWidget(download_link)
+        return image_card
+
+    def set_thumbnail(self, index, qimage):
+        """显示已到达的缩略图"""
+        image_label = self.image_labels[index]
+        image_label.setStyleSheet("""
+            QLabel {
+                border: none;
+                padding: 0;
+                margin: 0;
+                background: transparent;
+            }
+        """)
+        image_label.setPixmap(QPixmap.fromImage(qimage))
+
+    def set_failed(self, index, error):
+        """图片加载失败，保留下载按钮"""
+        image_label = self.image_labels[index]
+        image_label.setText("图片加载失败")
+        image_label.setToolTip(error)
 
 class ToolsPage(QWidget):
     """工具箱页面类"""
@@ -140,7 +330,11 @@ class ToolsPage(QWidget):
         os.makedirs(self.download_path, exist_ok=True)
         self.download_thread = None
         self.batch_download_thread = None
+        self.download_status_label = None
+        self.cancel_download_btn = None
         self.video_process_thread = None
+        self.media_preview_thread = None
+        self.media_grid = None
         self.progress_label = None  # 添加进度标签属性
 
     def setup_ui(self):
@@ -448,6 +642,35 @@ class ToolsPage(QWidget):
 
             title_layout.addStretch()
 
+            # 批量下载进度
+            self.download_status_label = QLabel("")
+            self.download_status_label.setStyleSheet("""
+                color: #666666;
+                font-size: 12px;
+                border: none;
+                padding: 0;
+            """)
+            title_layout.addWidget(self.download_status_label)
+
+            # 取消批量下载按钮（仅在下载进行中显示）
+            self.cancel_download_btn = QPushButton("取消下载")
+            self.cancel_download_btn.setStyleSheet("""
+                QPushButton {
+                    padding: 4px 8px;
+                    font-size: 12px;
+                    background-color: #f5f5f5;
+                    color: #666666;
+                    border: 1px solid #dddddd;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #e8e8e8;
+                }
+            """)
+            self.cancel_download_btn.clicked.connect(self.cancel_batch_download)
+            self.cancel_download_btn.setVisible(self.is_batch_downloading())
+            title_layout.addWidget(self.cancel_download_btn)
+
             # 添加下载全部按钮
             download_btn = QPushButton("⬇️ 下载全部")
             download_btn.setStyleSheet("""
@@ -474,103 +697,18 @@ class ToolsPage(QWidget):
             images_layout.setSpacing(4)
             images_layout.setContentsMargins(0, 0, 0, 0)
 
-            # 创建图片网格容器
-            grid_widget = QWidget()
-            grid_layout = QGridLayout(grid_widget)
-            grid_layout.setSpacing(4)
-            grid_layout.setContentsMargins(0, 0, 0, 0)
-
-            # 加载图片
-            if '下载地址' in data:
-                row = 0
-                col = 0
-                for url in data['下载地址']:
-                    try:
-                        # 创建图片卡片
-                        image_card = QFrame()
-                        image_card.setFixedSize(150, 230)
-                        image_card.setStyleSheet("""
-                            QFrame {
-                                background-color: white;
-                                margin: 0;
-                                padding: 0;
-                            }
-                        """)
-                        card_layout = QVBoxLayout(image_card)
-                        card_layout.setContentsMargins(0, 0, 0, 0)
-                        card_layout.setSpacing(0)
-
-                        # 加载图片
-                        response = requests.get(url, headers={
-                            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                            'Referer': 'https://www.xiaohongshu.com/'
-                        })
-                        image_data = response.content
-
-                        # 创建QPixmap并设置图片
-                        pixmap = QPixmap()
-                        byte_array = QByteArray(image_data)
-                        pixmap.loadFromData(byte_array)
-
-                        if pixmap.isNull():
-                            raise Exception("图片加载失败")
-
-                        # 调整图片大小并保持比例
-                        image_label = QLabel()
-                        image_label.setFixedSize(150, 200)
-                        image_label.setStyleSheet("""
-                            QLabel {
-                                border: none;
-                                padding: 0;
-                                margin: 0;
-                                background: transparent;
-                            }
-                        """)
-                        scaled_pixmap = pixmap.scaled(150, 200, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                        image_label.setPixmap(scaled_pixmap)
-                        image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                        card_layout.addWidget(image_label)
-
-                        # 添加下载按钮
-                        download_link = QPushButton("下载图片")
-                        download_link.setFixedHeight(20)
-                        download_link.setCursor(Qt.CursorShape.PointingHandCursor)
-                        download_link.setStyleSheet("""
-                            QPushButton {
-                                color: #4a90e2;
-                                border: none;
-                                background: none;
-                                text-align: center;
-                                padding: 0;
-                                margin: 0;
-                                font-size: 12px;
-                            }
-                            QPushButton:hover {
-                                text-decoration: underline;
-                            }
-                        """)
-                        download_link.clicked.connect(lambda checked, u=url, i=col+1: self.download_image(u, f"图片_{i}.jpg"))
-                        card_layout.addWidget(download_link)
-
-                        # 添加到网格布局
-                        grid_layout.addWidget(image_card, row, col)
-                        col += 1
-                        if col >= 4:  # 每行最多显示4个图片
-                            col = 0
-                            row += 1
-
-                    except Exception as e:
-                        print(f"加载图片失败: {str(e)}")
+            # 先显示占位卡片，缩略图在后台线程中下载生成后逐张填充
+            if data.get('下载地址'):
+                grid_widget = self.start_media_preview(data['下载地址'])
             else:
                 # 显示无图片提示
-                no_image_label = QLabel("暂无可下载的媒体文件")
-                no_image_label.setStyleSheet("""
+                grid_widget = QLabel("暂无可下载的媒体文件")
+                grid_widget.setStyleSheet("""
                     color: #666666;
                     border: none;
                     padding: 0;
                     margin: 0;
                 """)
-                grid_layout.addWidget(no_image_label, 0, 0)
 
             images_layout.addWidget(grid_widget)
             preview_layout.addWidget(images_widget)
@@ -707,6 +845,8 @@ class ToolsPage(QWidget):
 
     def clear_result_area(self):
         """清空结果区域"""
+        self.cancel_media_preview()
+
         # 清空结果布局中的所有组件
         while self.result_layout.count():
             item = self.result_layout.takeAt(0)
@@ -784,112 +924,45 @@ class ToolsPage(QWidget):
         
         self.result_layout.addWidget(section_frame)
 
-    def create_media_preview_html(self, urls):
-        """创建媒体预览的HTML"""
-        if not urls:
-            return "<div style='color: #666666;'>暂无可下载的媒体文件</div>"
-
-        # 图片网格布局
-        preview_html = "<div style='display: grid; grid-template-columns: repeat(auto-fill, minmax(250px, 1fr)); gap: 10px; margin-bottom: 20px;'>"
-
-        # 创建线程池
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            # 提交所有图片加载任务
-            future_to_url = {executor.submit(self.load_image, url): url for url in urls}
-
-            # 处理完成的任务
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    result = future.result()
-                    if result['success']:
-                        preview_html += f"""
-                        <div style='
-                            background-color: white;
-                            border: 1px solid #e1e4e8;
-                            border-radius: 8px;
-                            overflow: hidden;
-                            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                        '>
-                            <div style='position: relative; padding-top: 75%; overflow: hidden;'>
-                                <img src="{result['data']}" style='
-                                    position: absolute;
-                                    top: 0;
-                                    left: 0;
-                                    width: 100%;
-                                    height: 100%;
-                                    object-fit: cover;
-                                ' loading="lazy">
-                            </div>
-                            <div style='padding: 8px; text-align: center;'>
-                                <a href="{url}" style='
-                                    color: #4a90e2;
-                                    text-decoration: none;
-                                    font-size: 14px;
-                                ' target="_blank">下载图片</a>
-                            </div>
-                        </div>
-                        """
-                    else:
-                        preview_html += f"""
-                        <div style='
-                            background-color: white;
-                            border: 1px solid #e1e4e8;
-                            border-radius: 8px;
-                            padding: 15px;
-                            text-align: center;
-                        '>
-                            <div style='color: #666666; margin-bottom: 8px;'>图片加载失败</div>
-                            <a href="{url}" style='color: #4a90e2; text-decoration: none;' target="_blank">下载图片</a>
-                        </div>
-                        """
-                except Exception as e:
-                    print(f"处理图片结果时出错: {str(e)}")
-                    preview_html += f"""
-                    <div style='
-                        background-color: white;
-                        border: 1px solid #e1e4e8;
-                        border-radius: 8px;
-                        padding: 15px;
-                        text-align: center;
-                    '>
-                        <div style='color: #666666; margin-bottom: 8px;'>处理图片时出错</div>
-                        <a href="{url}" style='color: #4a90e2; text-decoration: none;' target="_blank">下载图片</a>
-                    </div>
-                    """
-
-        preview_html += "</div>"
-        return preview_html
+    def start_media_preview(self, urls):
+        """创建图片网格并在后台加载缩略图"""
+        self.cancel_media_preview()
+
+        self.media_grid = MediaGridWidget(urls)
+        self.media_grid.download_requested.connect(self.download_image)
+
+        # 以页面为父对象：取消后线程在后台退出，不会因引用被替换而提前销毁
+        self.media_preview_thread = MediaPreviewThread(urls, parent=self)
+        self.media_preview_thread.thumbnail_ready.connect(self.handle_thumbnail_ready)
+        self.media_preview_thread.thumbnail_failed.connect(self.handle_thumbnail_failed)
+        self.media_preview_thread.finished.connect(self.media_preview_thread.deleteLater)
+        self.media_preview_thread.start()
+        return self.media_grid
+
+    def cancel_media_preview(self):
+        """取消上一次尚未完成的缩略图加载"""
+        if self.media_preview_thread is not None:
+            self.media_preview_thread.cancel()
+        self.media_preview_thread = None
+        self.media_grid = None
+
+    def handle_thumbnail_ready(self, index, qimage):
+        """单张缩略图完成"""
+        if self.sender() is not self.media_preview_thread:
+            return  # 上一次解析的图片，已过期
+        self.media_grid.set_thumbnail(index, qimage)
+
+    def handle_thumbnail_failed(self, index, error):
+        """单张图片加载失败"""
+        if self.sender() is not self.media_preview_thread:
+            return
+        self.media_grid.set_failed(index, error)
 
     def fill_example_url(self, url):
         """填充示例URL"""
         self.url_input.setText(url)
         TipWindow(self.parent, "已填充示例链接，请替换为实际链接").show()
 
-    def load_image(self, url):
-        """加载单个图片"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Referer': 'https://www.xiaohongshu.com/'
-            }
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            content_type = response.headers.get('content-type', 'image/jpeg')
-            image_data = base64.b64encode(response.content).decode('utf-8')
-            return {
-                'success': True,
-                'url': url,
-                'data': f"data:{content_type};base64,{image_data}"
-            }
-        except Exception as e:
-            print(f"加载图片失败: {str(e)}")
-            return {
-                'success': False,
-                'url': url,
-                'error': str(e)
-            }
-
     def download_image(self, url, filename):
         """下载单个图片"""
         # 让用户选择保存位置
@@ -920,26 +993,71 @@ class ToolsPage(QWidget):
         
         if not save_dir:  # 用户取消了选择
             return
-            
+
+        if self.is_batch_downloading():
+            TipWindow(self.parent, "⏳ 已有批量下载正在进行").show()
+            return
+
         # 创建并启动批量下载线程
         self.batch_download_thread = BatchDownloadThread(urls, save_dir)
         self.batch_download_thread.finished.connect(self.handle_batch_download_finished)
         self.batch_download_thread.error.connect(self.handle_download_error)
         self.batch_download_thread.progress.connect(self.handle_download_progress)
         self.batch_download_thread.start()
+        self.set_cancel_download_visible(True)
+
+    def is_batch_downloading(self):
+        """是否有批量下载正在进行"""
+        return self.batch_download_thread is not None and self.batch_download_thread.isRunning()
+
+    def cancel_batch_download(self, wait_ms=0):
+        """取消批量下载（已下载的部分保留，下次从断点继续）
+
+        Args:
+            wait_ms: 等待下载线程退出的最长时间（毫秒），关闭窗口时使用
+        """
+        if not self.is_batch_downloading():
+            return
+        self.batch_download_thread.cancel()
+        if wait_ms:
+            self.batch_download_thread.wait(wait_ms)
+        self.set_download_status("⏹ 已取消，再次下载将从断点继续")
+        self.set_cancel_download_visible(False)
 
     def handle_download_finished(self, message):
         """处理单个下载完成"""
         TipWindow(self.parent, message).show()
 
-    def handle_batch_download_finished(self):
+    def handle_batch_download_finished(self, message):
         """处理批量下载完成"""
-        TipWindow(self.parent, "✅ 所有图片下载完成").show()
+        self.set_download_status("")
+        self.set_cancel_download_visible(False)
+        TipWindow(self.parent, message).show()
 
     def handle_download_error(self, error_message):
         """处理下载错误"""
+        if self.sender() is self.batch_download_thread:
+            self.set_download_status("")
+            self.set_cancel_download_visible(False)
         TipWindow(self.parent, error_message).show()
 
     def handle_download_progress(self, message):
-        """处理下载进度"""
-        TipWindow(self.parent, message).show()
+        """处理下载进度（显示在图片内容标题栏，不逐条弹出提示）"""
+        self.set_download_status(message)
+
+    def set_download_status(self, message):
+        """更新批量下载状态文字（结果区域已被清空时忽略）"""
+        try:
+            if self.download_status_label is not None:
+                self.download_status_label.setText(message)
+        except RuntimeError:
+            # 标签已随上一次解析结果一起销毁
+            self.download_status_label = None
+
+    def set_cancel_download_visible(self, visible):
+        """显示/隐藏取消下载按钮（结果区域已被清空时忽略）"""
+        try:
+            if self.cancel_download_btn is not None:
+                self.cancel_download_btn.setVisible(visible)
+        except RuntimeError:
+            self.cancel_download_btn = None
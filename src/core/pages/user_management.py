@@ -39,6 +39,8 @@ except ImportError:
                 return []
             def get_user_by_id(self, user_id):
                 return None
+            def get_user_snapshot(self, user_id):
+                return None
             def create_user(self, data):
                 return True
             def update_user(self, user_id, data):
@@ -988,8 +990,8 @@ class UserManagementPage(QWidget):
             user_id = self.user_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
             
             if user_id:
-                # 从服务层获取完整的用户信息
-                user = user_service.get_user_by_id(user_id)
+                # 从账号缓存获取用户信息快照，频繁切换选择时不重复查询数据库
+                user = user_service.get_user_snapshot(user_id)
                 if user:
                     self.selected_user = user
                     
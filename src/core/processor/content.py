@@ -2,8 +2,9 @@ import json
 import traceback
 import time
 from PyQt6.QtCore import QThread, pyqtSignal
-import requests
-from requests.exceptions import RequestException, Timeout, ConnectionError
+import httpx
+
+from src.core.http_client import http_client
 
 # 导入备用生成器
 from .content_backup import BackupContentGenerator
@@ -122,7 +123,7 @@ class ContentGeneratorThread(QThread):
             # 发送API请求
             print("📡 发送API请求...")
             try:
-                response = requests.post(
+                response = http_client.post(
                     api_url,
                     json={
                         "workflow_id": workflow_id,
@@ -140,15 +141,15 @@ class ContentGeneratorThread(QThread):
                 print(f"📊 响应状态码: {response.status_code}")
                 print(f"📄 响应头信息: {dict(response.headers)}")
                 
-            except ConnectionError as e:
+            except httpx.ConnectError as e:
                 error_msg = f"网络连接失败: {str(e)}"
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
-            except Timeout as e:
+            except httpx.TimeoutException as e:
                 error_msg = f"API请求超时（30秒）: {str(e)}"
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
-            except RequestException as e:
+            except httpx.HTTPError as e:
                 error_msg = f"API请求异常: {str(e)}"
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
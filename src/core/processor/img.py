@@ -1,125 +1,269 @@
 import io
-import time
+import asyncio
 from PyQt6.QtCore import QThread, pyqtSignal
 
 import os
-import requests
 
 from PyQt6.QtGui import QPixmap, QImage
 
 
 from PIL import Image
 
+from src.core.config import config
+from src.core.http_client import http_client
+from src.core.media_cache import media_cache
+
+
+PREVIEW_SIZE = 360  # 预览图片的最大尺寸
+
+
+def pil_to_qimage(image):
+    """直接用PIL的像素缓冲区构造QImage（不经过PNG编码/解码）"""
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    data = image.tobytes('raw', image.mode)
+    if image.mode == 'RGB':
+        source_format, target_format = QImage.Format.Format_RGB888, QImage.Format.Format_RGB32
+    else:
+        source_format, target_format = QImage.Format.Format_RGBA8888, QImage.Format.Format_ARGB32_Premultiplied
+
+    # 每行字节数显式传入（RGB每行不一定按4字节对齐）；
+    # 转换为QPixmap原生格式的同时完成深拷贝，不再引用Python缓冲区
+    qimage = QImage(data, image.width, image.height, image.width * len(image.mode), source_format)
+    return qimage.convertToFormat(target_format)
+
+
+def render_preview(data, max_size=PREVIEW_SIZE):
+    """将图片数据缩放并居中到 max_size×max_size 的白色画布上，返回QImage"""
+    image = Image.open(io.BytesIO(data))
+    # JPEG在解码时直接按1/2、1/4、1/8缩小（不小于目标尺寸），大图只解码需要的分辨率
+    image.draft('RGB', (max_size, max_size))
+
+    # 计算缩放比例，保持宽高比
+    width, height = image.size
+    scale = min(max_size/width, max_size/height)
+    new_width = int(width * scale)
+    new_height = int(height * scale)
+
+    # 缩放图片
+    image = image.resize((new_width, new_height), Image.LANCZOS)
+
+    # 创建白色背景
+    background = Image.new('RGB', (max_size, max_size), 'white')
+    # 将图片粘贴到中心位置
+    offset = ((max_size - new_width) // 2,
+              (max_size - new_height) // 2)
+    background.paste(image, offset)
+
+    return pil_to_qimage(background)
+
+
+def render_thumbnail(data, width, height):
+    """将图片数据按比例缩放到 width×height 以内（不补边），返回QImage"""
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (width, height))
+    image.thumbnail((width, height), Image.LANCZOS)
+    return pil_to_qimage(image)
+
+
+def save_thumbnail(qimage, digest, variant):
+    """写入缩略图缓存（先写临时文件再原子替换）"""
+    path = media_cache.thumbnail_path(digest, variant)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{id(qimage)}.part"
+    try:
+        if qimage.save(temp_path, 'JPEG', 90):
+            os.replace(temp_path, path)
+            media_cache.register_thumbnail(digest, variant)
+    except OSError as e:
+        print(f"保存缩略图失败: {str(e)}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def cached_thumbnail(media, variant, render):
+    """读取缓存中的缩略图，没有时用 render(原图数据) 生成并写入缓存（可在工作线程中调用）
+
+    variant 区分同一张图片的不同缩略图规格（如预览的 360、工具箱卡片的 '150x200'）。
+    """
+    thumb_path = media_cache.get_thumbnail(media.sha256, variant)
+    qimage = QImage(thumb_path) if thumb_path else QImage()
+    if qimage.isNull():
+        qimage = render(media.read_bytes())
+        save_thumbnail(qimage, media.sha256, variant)
+    return qimage
+
 
 class ImageProcessorThread(QThread):
-    finished = pyqtSignal(list, list)  # 发送图片路径列表和图片信息列表
+    """图片处理线程
+
+    在线程内的事件循环中并发下载封面图和内容图（并发数 config.http.image_concurrency），
+    每张图片单独超时、失败后按指数退避重试，解码缩放放到线程池中执行。
+    每张图片处理完立即发出 image_ready，全部结束后按原始顺序发出 all_ready。
+    """
+    all_ready = pyqtSignal(list, list)  # 发送图片路径列表和图片信息列表
+    image_ready = pyqtSignal(int, str, dict)  # 单张图片完成：序号（封面为0）、图片路径、图片信息
+    image_failed = pyqtSignal(int, str)  # 单张图片失败：序号、错误信息
     error = pyqtSignal(str)
 
-    def __init__(self, cover_image_url, content_image_urls):
-        super().__init__()
+    def __init__(self, cover_image_url, content_image_urls, parent=None):
+        super().__init__(parent)
         self.cover_image_url = cover_image_url
         self.content_image_urls = content_image_urls
-        # 获取用户主目录
-        img_dir = os.path.join(os.path.expanduser('~'), '.xhs_system')
-        if not os.path.exists(img_dir):
-            os.makedirs(img_dir)
+        self.loop = None
+        self._main_task = None
 
-        # 配置文件路径
-        self.img_dir = os.path.join(img_dir, 'imgs')
+    def get_items(self):
+        """按显示顺序返回待处理的 (url, 标题)，封面图在最前"""
+        items = []
+        if self.cover_image_url:
+            items.append((self.cover_image_url, "封面图"))
+        for i, url in enumerate(self.content_image_urls):
+            items.append((url, f"内容图{i+1}"))
+        return items
 
     def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
         try:
-            images = []
-            image_list = []
-
-            # 并发处理所有图片
-            from concurrent.futures import ThreadPoolExecutor
-
-            def process_image_with_title(args):
-                url, title = args
-                return self.process_image(url, title)
-
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                # 创建有序的future列表
-                futures = []
-
-                # 添加封面图任务
-                if self.cover_image_url:
-                    future = executor.submit(process_image_with_title,
-                                             (self.cover_image_url, "封面图"))
-                    futures.append((-1, future))  # 用-1确保封面图排在最前
-
-                # 添加内容图任务
-                for i, url in enumerate(self.content_image_urls):
-                    future = executor.submit(process_image_with_title,
-                                             (url, f"内容图{i+1}"))
-                    futures.append((i, future))
-
-                # 按照原始顺序处理结果
-                for i, future in sorted(futures, key=lambda x: x[0]):
-                    img_path, pixmap_info = future.result()
-                    if img_path and pixmap_info:
-                        images.append(img_path)
-                        image_list.append(pixmap_info)
-
-            self.finished.emit(images, image_list)
+            self._main_task = self.loop.create_task(self.process_all())
+            images, image_list = self.loop.run_until_complete(self._main_task)
+            self.all_ready.emit(images, image_list)
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            self.loop.run_until_complete(http_client.aclose())
+            self.loop.close()
+
+    def cancel(self):
+        """取消尚未完成的下载（可在任意线程调用）"""
+        if self.loop and self._main_task and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._main_task.cancel)
+
+    async def process_all(self):
+        """并发处理所有图片，返回按原始顺序排列的成功结果"""
+        semaphore = asyncio.Semaphore(config.http.image_concurrency)
+        items = self.get_items()
+
+        async def process_one(index, url, title):
+            async with semaphore:
+                return await self.process_image(index, url, title)
+
+        results = await asyncio.gather(
+            *(process_one(index, url, title) for index, (url, title) in enumerate(items))
+        )
 
-    def process_image(self, url, title):
-        retries = 3
-        while retries > 0:
+        images = []
+        image_list = []
+        for img_path, pixmap_info in results:
+            if img_path and pixmap_info:
+                images.append(img_path)
+                image_list.append(pixmap_info)
+        return images, image_list
+
+    async def process_image(self, index, url, title):
+        """下载并处理单张图片，失败时按指数退避重试"""
+        retries = config.http.image_retries
+        timeout = config.http.image_timeout / 1000
+        backoff = config.http.image_retry_backoff / 1000
+
+        for attempt in range(retries):
             try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    # 保存图片
-                    img_path = os.path.join(self.img_dir, f'{title}.jpg')
-                    os.makedirs(os.path.dirname(img_path), exist_ok=True)
-
-                    # 保存原始图片
-                    with open(img_path, 'wb') as f:
-                        f.write(response.content)
-
-                    # 处理图片预览
-                    image = Image.open(io.BytesIO(response.content))
-
-                    # 计算缩放比例，保持宽高比
-                    width, height = image.size
-                    max_size = 360  # 调整预览图片的最大尺寸
-                    scale = min(max_size/width, max_size/height)
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-
-                    # 缩放图片
-                    image = image.resize((new_width, new_height), Image.LANCZOS)
-
-                    # 创建白色背景
-                    background = Image.new('RGB', (max_size, max_size), 'white')
-                    # 将图片粘贴到中心位置
-                    offset = ((max_size - new_width) // 2,
-                              (max_size - new_height) // 2)
-                    background.paste(image, offset)
-
-                    # 转换为QPixmap
-                    img_bytes = io.BytesIO()
-                    background.save(img_bytes, format='PNG')
-                    img_data = img_bytes.getvalue()
-
-                    qimage = QImage.fromData(img_data)
-                    pixmap = QPixmap.fromImage(qimage)
-
-                    if pixmap.isNull():
-                        raise Exception("无法创建有效的图片预览")
-
-                    return img_path, {'pixmap': pixmap, 'title': title}
-                else:
-                    raise Exception(f"下载图片失败: HTTP {response.status_code}")
+                media = await asyncio.wait_for(media_cache.afetch(url), timeout=timeout)
+                img_path, pixmap_info = await self.loop.run_in_executor(
+                    None, self.render, media, title
+                )
+                self.image_ready.emit(index, img_path, pixmap_info)
+                return img_path, pixmap_info
 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                retries -= 1
-                if retries > 0:
-                    print(f"处理图片失败,还剩{retries}次重试: {str(e)}")
-                    time.sleep(1)  # 重试前等待1秒
+                error = str(e) or e.__class__.__name__
+                if attempt + 1 < retries:
+                    delay = backoff * (2 ** attempt)
+                    print(f"处理图片失败,{delay:.1f}秒后重试(还剩{retries - attempt - 1}次): {error}")
+                    await asyncio.sleep(delay)
                 else:
-                    print(f"处理图片失败,重试次数已用完: {str(e)}")
-                    return None, None
+                    print(f"处理图片失败,重试次数已用完: {error}")
+                    self.image_failed.emit(index, error)
+        return None, None
+
+    def render(self, media, title):
+        """生成预览（在线程池中执行），缩略图已缓存时直接读取
+
+        返回的图片路径为缓存中按内容摘要命名的原图，多次生成互不覆盖；
+        发布前需调用 media_cache.touch_paths 刷新访问时间，防止被淘汰。
+        """
+        pixmap = QPixmap.fromImage(cached_thumbnail(media, PREVIEW_SIZE, render_preview))
+
+        if pixmap.isNull():
+            raise Exception("无法创建有效的图片预览")
+
+        return media.path, {'pixmap': pixmap, 'title': title}
+
+
+if __name__ == "__main__":
+    # 预览生成基准测试: python -m src.core.processor.img [JPEG目录] [张数]
+    # 未指定目录时生成一批 4000×3000 的测试JPEG
+    import sys
+    import glob
+    import time
+    from PyQt6.QtGui import QGuiApplication
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+
+    def legacy_preview(data, max_size=PREVIEW_SIZE):
+        """调整前：完整解码，缩放后编码为PNG再由QImage解码"""
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        scale = min(max_size/width, max_size/height)
+        new_width, new_height = int(width * scale), int(height * scale)
+        image = image.resize((new_width, new_height), Image.LANCZOS)
+        background = Image.new('RGB', (max_size, max_size), 'white')
+        background.paste(image, ((max_size - new_width) // 2, (max_size - new_height) // 2))
+        img_bytes = io.BytesIO()
+        background.save(img_bytes, format='PNG')
+        return QImage.fromData(img_bytes.getvalue())
+
+    def load_corpus(directory, count):
+        if directory:
+            paths = sorted(glob.glob(os.path.join(directory, '*.jp*g')))[:count]
+            corpus = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    corpus.append(f.read())
+            return corpus
+
+        corpus = []
+        for i in range(count):
+            # 渐变叠加噪声，接近照片的压缩率
+            image = Image.merge('RGB', (
+                Image.linear_gradient('L').resize((4000, 3000)),
+                Image.effect_noise((4000, 3000), 40 + i),
+                Image.linear_gradient('L').rotate(90).resize((4000, 3000)),
+            ))
+            img_bytes = io.BytesIO()
+            image.save(img_bytes, format='JPEG', quality=90)
+            corpus.append(img_bytes.getvalue())
+        return corpus
+
+    directory = sys.argv[1] if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]) else None
+    count = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 10
+    corpus = load_corpus(directory, count)
+    total_mb = sum(len(data) for data in corpus) / 1024 / 1024
+    print(f"测试图片 {len(corpus)} 张，共 {total_mb:.1f} MB")
+
+    for name, render in (("调整前 (完整解码 + PNG往返)", legacy_preview),
+                         ("调整后 (JPEG draft + 直接缓冲区)", render_preview)):
+        started = time.perf_counter()
+        for data in corpus:
+            pixmap = QPixmap.fromImage(render(data))
+            assert not pixmap.isNull()
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed:.2f}s, {len(corpus) / elapsed:.1f} 张/秒")
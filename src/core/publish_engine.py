@@ -0,0 +1,297 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+from .logger import logger
+from .config import config
+from .write_xiaohongshu import XiaohongshuPoster
+from .browser_pool import browser_pool
+from .services.proxy_service import proxy_service
+from .services.fingerprint_service import fingerprint_service
+from .services.account_cache import account_cache
+
+
+class ManualPublishPending(Exception):
+    """内容已填好，但未检测到用户点击发布（不应重试，也不能记为已发布）"""
+
+
+@dataclass
+class PublishJob:
+    """发布任务"""
+    user_id: Optional[int]  # None 表示使用默认上下文（单账号登录）
+    title: str
+    content: str
+    images: List[str] = field(default_factory=list)
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "pending"  # pending, running, published, awaiting_manual, failed
+    error_message: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'title': self.title,
+            'status': self.status,
+            'error_message': self.error_message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class PublishEngine:
+    """多账号并发发布引擎
+
+    - 全局并发上限：同时进行的发布任务不超过 max_concurrency
+    - 账号串行：同一账号的任务按提交顺序依次执行，不会并发操作同一个账号
+    - 代理限速：同一代理两次发布的开始时间至少间隔 proxy_interval 秒
+
+    每个账号使用浏览器池中独立的上下文（代理、指纹、cookies互相隔离），
+    所有任务必须在同一个事件循环中提交。已完成的任务只保留最近 max_history 个；
+    没有待执行任务的账号最多保留 max_idle_posters 个发布器，超出时按最久未使用关闭，
+    归还上下文后由浏览器池按空闲上限回收。
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, proxy_interval: Optional[float] = None,
+                 max_history: int = 200, max_idle_posters: Optional[int] = None):
+        self.max_concurrency = max_concurrency or config.xiaohongshu.max_concurrent_publishes
+        if proxy_interval is None:
+            proxy_interval = config.xiaohongshu.proxy_publish_interval / 1000
+        self.proxy_interval = proxy_interval
+        self.max_history = max_history
+        if max_idle_posters is None:
+            max_idle_posters = browser_pool.max_idle_contexts
+        self.max_idle_posters = max_idle_posters
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._account_locks: Dict[Optional[int], asyncio.Lock] = {}
+        self._proxy_locks: Dict[str, asyncio.Lock] = {}
+        self._proxy_last_started: Dict[str, float] = {}
+        self._posters: "OrderedDict[Optional[int], XiaohongshuPoster]" = OrderedDict()
+        self._account_pending: Dict[Optional[int], int] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.jobs: Dict[str, PublishJob] = {}
+        self._finished = deque()
+
+    def submit(self, user_id: Optional[int], title: str, content: str, images: List[str] = None) -> PublishJob:
+        """提交发布任务（立即返回，任务在后台执行）
+
+        Returns:
+            PublishJob: 任务对象，可通过 wait() 等待结果
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        job = PublishJob(user_id=user_id, title=title, content=content, images=images or [])
+        self.jobs[job.job_id] = job
+        self._account_pending[user_id] = self._account_pending.get(user_id, 0) + 1
+        self._prewarm(user_id)
+        self._tasks[job.job_id] = asyncio.ensure_future(self._run(job))
+        logger.info(f"提交发布任务: {job.job_id} (用户 {user_id})")
+        return job
+
+    async def publish(self, user_id: Optional[int], title: str, content: str, images: List[str] = None) -> PublishJob:
+        """提交并等待发布任务完成
+
+        等待方被取消时（如发布队列的租约已被其他工作者接管）同时取消发布任务：
+        wait() 用 shield 等待，不取消的话任务会在后台继续操作页面并完成发布。
+        """
+        job = self.submit(user_id, title, content, images)
+        try:
+            return await self.wait(job.job_id)
+        except asyncio.CancelledError:
+            self.cancel(job.job_id)
+            raise
+
+    async def publish_many(self, jobs: List[Dict[str, Any]]) -> List[PublishJob]:
+        """批量并发发布
+
+        Args:
+            jobs: 任务参数列表，每项包含 user_id、title、content、images
+        """
+        # 一次性加载所有账号的代理和指纹，避免逐个账号查询数据库
+        account_cache.preload(job['user_id'] for job in jobs if job.get('user_id') is not None)
+        submitted = [self.submit(**job) for job in jobs]
+        return list(await asyncio.gather(*(self.wait(job.job_id) for job in submitted)))
+
+    async def wait(self, job_id: str) -> PublishJob:
+        """等待任务完成"""
+        # 先取出任务对象，完成后即使已被移出历史记录也能返回结果
+        job = self.jobs[job_id]
+        task = self._tasks.get(job_id)
+        if task:
+            await asyncio.shield(task)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """取消尚未完成的任务"""
+        task = self._tasks.get(job_id)
+        if not task or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def _run(self, job: PublishJob) -> None:
+        """执行单个发布任务"""
+        account_lock = self._account_locks.setdefault(job.user_id, asyncio.Lock())
+        try:
+            # 先按账号排队，再等待代理间隔和全局名额，避免排队中的任务占用并发名额
+            async with account_lock:
+                context_options, proxy_key = self._get_account_options(job.user_id)
+                await self._acquire_slot(proxy_key)
+
+                try:
+                    job.status = "running"
+                    job.started_at = time.time()
+                    logger.info(f"开始发布: {job.job_id} (用户 {job.user_id})")
+
+                    poster = await self._get_poster(job.user_id, context_options)
+                    submitted = await poster.post_article(job.title, job.content, job.images)
+                finally:
+                    self._semaphore.release()
+
+            if submitted:
+                job.status = "published"
+                logger.info(f"发布完成: {job.job_id} (用户 {job.user_id})")
+            else:
+                # 内容已填好但未检测到点击发布，不能当作已发布
+                job.status = "awaiting_manual"
+                job.error_message = "未检测到发布操作，请在浏览器中检查并手动点击发布"
+                logger.warning(f"等待手动发布: {job.job_id} (用户 {job.user_id})")
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error_message = "任务已取消"
+        except Exception as e:
+            job.status = "failed"
+            job.error_message = str(e)
+            logger.error(f"发布失败: {job.job_id} (用户 {job.user_id}): {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.job_id, None)
+            self._remember_finished(job.job_id)
+            self._account_finished(job.user_id)
+        await self._evict_idle_posters()
+
+    def _remember_finished(self, job_id: str) -> None:
+        """记录已完成的任务，超过历史上限时丢弃最早完成的任务"""
+        self._finished.append(job_id)
+        while len(self._finished) > self.max_history:
+            self.jobs.pop(self._finished.popleft(), None)
+
+    def _account_finished(self, user_id: Optional[int]) -> None:
+        """账号的一个任务结束；没有待执行任务时释放账号锁"""
+        pending = self._account_pending.get(user_id, 0) - 1
+        if pending > 0:
+            self._account_pending[user_id] = pending
+            return
+        self._account_pending.pop(user_id, None)
+        lock = self._account_locks.get(user_id)
+        if lock and not lock.locked():
+            self._account_locks.pop(user_id, None)
+
+    async def _evict_idle_posters(self) -> None:
+        """关闭超出上限的空闲发布器（最久未使用的优先），让浏览器池回收其上下文"""
+        idle = [user_id for user_id in self._posters if user_id not in self._account_pending]
+        for user_id in idle[:max(len(idle) - self.max_idle_posters, 0)]:
+            poster = self._posters.pop(user_id)
+            logger.debug(f"关闭空闲发布器 (用户 {user_id})")
+            await poster.close(force=True)
+
+    def _get_account_options(self, user_id: Optional[int]):
+        """获取账号的上下文参数（代理、指纹）以及用于限速的代理标识（直连时为None）"""
+        options: Dict[str, Any] = {}
+        proxy_key = None
+        if user_id is None:
+            return options, proxy_key
+
+        proxy = proxy_service.get_default_proxy_snapshot(user_id)
+        if proxy:
+            options['proxy'] = proxy.get_proxy_dict()
+            proxy_key = f"{proxy.host}:{proxy.port}"
+
+        fingerprint = fingerprint_service.get_default_fingerprint_snapshot(user_id)
+        if fingerprint:
+            options.update(fingerprint.get_browser_context_options())
+
+        return options, proxy_key
+
+    def _prewarm(self, user_id: Optional[int]) -> None:
+        """任务排队期间在后台预热账号的上下文（恢复已保存的会话）"""
+        if user_id in self._posters:
+            return
+        try:
+            context_options, _ = self._get_account_options(user_id)
+            XiaohongshuPoster.prewarm(self._context_key(user_id), context_options)
+        except Exception as e:
+            logger.debug(f"预热账号上下文失败 (用户 {user_id}): {str(e)}")
+
+    @staticmethod
+    def _context_key(user_id: Optional[int]) -> str:
+        return "default" if user_id is None else f"user:{user_id}"
+
+    async def _acquire_slot(self, proxy_key: Optional[str]) -> None:
+        """等待代理的发布间隔并获取一个全局并发名额（调用方负责释放名额）"""
+        if proxy_key is None:
+            await self._semaphore.acquire()
+            return
+
+        lock = self._proxy_locks.setdefault(proxy_key, asyncio.Lock())
+        async with lock:
+            last_started = self._proxy_last_started.get(proxy_key)
+            if last_started is not None:
+                delay = last_started + self.proxy_interval - time.time()
+                if delay > 0:
+                    logger.info(f"代理 {proxy_key} 限速，等待 {delay:.1f} 秒")
+                    await asyncio.sleep(delay)
+
+            await self._semaphore.acquire()
+            # 以实际开始时间计算间隔
+            self._proxy_last_started[proxy_key] = time.time()
+
+    async def _get_poster(self, user_id: Optional[int], context_options: Dict[str, Any]) -> XiaohongshuPoster:
+        """获取账号的发布器（浏览器池中的独立上下文）"""
+        poster = self._posters.get(user_id)
+        if poster and (poster.context_options != context_options
+                       or poster.page is None or poster.page.is_closed()):
+            # 代理或指纹已变更，或页面已被关闭，重新创建上下文
+            await poster.close(force=True)
+            poster = None
+
+        if poster is None:
+            poster = XiaohongshuPoster(context_key=self._context_key(user_id), context_options=context_options)
+            await poster.initialize()
+            self._posters[user_id] = poster
+
+        self._posters.move_to_end(user_id)
+        return poster
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取引擎统计信息"""
+        stats = {'pending': 0, 'running': 0, 'published': 0, 'awaiting_manual': 0, 'failed': 0}
+        for job in self.jobs.values():
+            stats[job.status] = stats.get(job.status, 0) + 1
+        stats['accounts'] = len(self._posters)
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+    async def close(self) -> None:
+        """取消未完成的任务并归还所有账号的上下文"""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        for poster in self._posters.values():
+            await poster.close(force=True)
+        self._posters = OrderedDict()
+
+
+# 全局发布引擎实例
+publish_engine = PublishEngine()
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import uuid
+from typing import Optional, Callable, Awaitable, List, Dict, Any
+
+from .logger import logger
+from .config import config
+from .publish_engine import publish_engine, ManualPublishPending
+from .models.content import PublishQueueJob
+from .services.publish_queue_service import publish_queue_service
+
+
+class PublishQueue:
+    """持久化发布队列的工作者池
+
+    任务保存在SQLite中（publish_jobs 表），由若干工作协程领取执行：
+    - 至少执行一次：执行中的任务持有租约并定期续约，进程退出后租约过期会被重新领取；
+      续约失败（任务已被其他工作者接管）时放弃执行，避免重复发布
+    - 幂等：相同 idempotency_key 的提交返回同一个任务
+    - 失败重试：按指数退避重新排队，超过最大尝试次数后标记失败
+
+    实际发布交给发布引擎，引擎负责账号串行和全局并发上限。
+    """
+
+    def __init__(self, handler: Optional[Callable[[PublishQueueJob], Awaitable[None]]] = None,
+                 worker_count: Optional[int] = None, poll_interval: float = 5.0):
+        self.handler = handler or self._default_handler
+        self.worker_count = worker_count or config.xiaohongshu.publish_workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = max(config.xiaohongshu.publish_job_lease / 1000, self._min_lease_seconds())
+        self.backoff_seconds = config.xiaohongshu.publish_retry_backoff / 1000
+        self.instance_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(self, title: str, content: str, images: List[str] = None,
+                content_id: str = None, user_id: int = None,
+                idempotency_key: str = None) -> PublishQueueJob:
+        """提交发布任务"""
+        job = publish_queue_service.enqueue(
+            title=title,
+            content=content,
+            images=images,
+            content_id=content_id,
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            max_attempts=config.xiaohongshu.publish_max_attempts
+        )
+        logger.info(f"发布任务入队: {job.id} (状态: {job.status})")
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    async def enqueue_async(self, title: str, content: str, images: List[str] = None,
+                            content_id: str = None, user_id: int = None,
+                            idempotency_key: str = None) -> PublishQueueJob:
+        """提交发布任务（供Web接口在事件循环中调用，数据库写入不阻塞事件循环）"""
+        job = await publish_queue_service.enqueue_async(
+            title=title,
+            content=content,
+            images=images,
+            content_id=content_id,
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            max_attempts=config.xiaohongshu.publish_max_attempts
+        )
+        logger.info(f"发布任务入队: {job.id} (状态: {job.status})")
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[PublishQueueJob]:
+        """获取任务"""
+        return publish_queue_service.get_job(job_id)
+
+    async def get_job_async(self, job_id: str) -> Optional[PublishQueueJob]:
+        """获取任务（供Web接口在事件循环中调用）"""
+        return await publish_queue_service.get_job_async(job_id)
+
+    async def start(self) -> None:
+        """启动工作协程"""
+        if self._workers:
+            return
+
+        self._wakeup = asyncio.Event()
+        for index in range(self.worker_count):
+            worker_id = f"{self.instance_id}-{index}"
+            self._workers.append(asyncio.ensure_future(self._worker(worker_id)))
+        logger.info(f"发布队列已启动，工作协程数: {self.worker_count}")
+
+    async def stop(self) -> None:
+        """停止工作协程（执行中的任务租约到期后会被重新领取）"""
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("发布队列已停止")
+
+    async def _worker(self, worker_id: str) -> None:
+        """工作协程：领取任务并执行，空闲时等待新任务或轮询到期的重试任务
+
+        队列的数据库操作都在线程池中执行，SQLite写锁竞争时不会阻塞事件循环中的其他请求和续约。
+        """
+        while True:
+            try:
+                job = await publish_queue_service.claim_next_async(worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"领取发布任务失败: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"[{worker_id}] 执行发布任务: {job.id} (第 {job.attempts} 次)")
+            handler_task = asyncio.ensure_future(self.handler(job))
+            heartbeat = asyncio.ensure_future(self._keep_lease(job.id, worker_id))
+            try:
+                await asyncio.wait({handler_task, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                handler_task.cancel()
+                heartbeat.cancel()
+                raise
+            heartbeat.cancel()
+
+            if not handler_task.done():
+                # 租约已被其他工作者接管，放弃本次执行
+                handler_task.cancel()
+                await asyncio.gather(handler_task, return_exceptions=True)
+                logger.warning(f"[{worker_id}] 发布任务租约已失效，放弃执行: {job.id}")
+                continue
+
+            try:
+                handler_task.result()
+                await publish_queue_service.complete_async(job.id, worker_id)
+                logger.info(f"发布任务成功: {job.id}")
+            except asyncio.CancelledError:
+                raise
+            except ManualPublishPending as e:
+                await publish_queue_service.mark_awaiting_manual_async(job.id, worker_id, str(e))
+                logger.warning(f"发布任务等待手动发布: {job.id}")
+            except Exception as e:
+                await publish_queue_service.fail_async(job.id, worker_id, str(e), self.backoff_seconds)
+                logger.error(f"发布任务失败: {job.id}, {str(e)}")
+
+    async def _keep_lease(self, job_id: str, worker_id: str) -> None:
+        """按租约的1/3周期续约，续约失败或租约已过期时返回"""
+        interval = self.lease_seconds / 3
+        loop = asyncio.get_running_loop()
+        renewed_at = loop.time()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await publish_queue_service.renew_async(job_id, worker_id, self.lease_seconds):
+                    return
+                renewed_at = loop.time()
+            except Exception as e:
+                logger.warning(f"发布任务续约失败: {job_id}, {str(e)}")
+                if loop.time() - renewed_at >= self.lease_seconds:
+                    return
+
+    @staticmethod
+    def _min_lease_seconds() -> float:
+        """一次发布各步骤等待上限之和，租约不应短于此值"""
+        xhs = config.xiaohongshu
+        return (xhs.page_ready_timeout + xhs.editor_ready_timeout + xhs.upload_timeout
+                + xhs.manual_publish_timeout) / 1000
+
+    async def _default_handler(self, job: PublishQueueJob) -> None:
+        """默认处理：交给发布引擎执行"""
+        result = await publish_engine.publish(job.user_id, job.title, job.content, job.get_images())
+        if result.status == "awaiting_manual":
+            raise ManualPublishPending(result.error_message)
+        if result.status != "published":
+            raise Exception(result.error_message or "发布失败")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        stats = publish_queue_service.get_queue_stats()
+        stats['workers'] = len(self._workers)
+        return stats
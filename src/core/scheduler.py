@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import inspect
+from datetime import datetime, timedelta
+from typing import Optional, Callable, List, Tuple, Dict, Any
+
+from .logger import logger
+from .config import config
+from .publish_engine import publish_engine
+from .services.scheduled_task_service import scheduled_task_service
+
+
+class TaskScheduler:
+    """定时发布调度器
+
+    按 next_run_time 从数据库（is_active/next_run_time 索引）分批加载最近的任务放入最小堆，
+    睡眠到堆顶任务的到期时间再执行，不逐秒轮询：
+    - 任务增删改时服务会通知调度器，重新加载堆
+    - 只在内存中保留最近的 batch_size 个任务，堆耗尽后再加载下一批，任务数再多也不会全部载入
+    - 停机期间错过的运行在补发窗口内补发一次，然后直接推进到下一次运行时间
+
+    到期任务交给 dispatcher(payload) 执行，默认提交到发布引擎；
+    所有方法必须在同一个事件循环中调用（notify 除外，可在任意线程调用）。
+    """
+
+    # 睡眠上限（秒）：系统休眠时单调时钟会停止，定期醒来按墙上时间重新检查
+    MAX_SLEEP = 300
+
+    def __init__(self, dispatcher: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 batch_size: Optional[int] = None):
+        self.dispatcher = dispatcher or self._default_dispatcher
+        self.batch_size = batch_size or config.xiaohongshu.schedule_batch_size
+        self.catchup_window = timedelta(milliseconds=config.xiaohongshu.schedule_catchup_window)
+        self._heap: List[Tuple[datetime, int]] = []
+        # 已加载批次的最晚时间；批次未满（已全部加载）时为None
+        self._horizon: Optional[datetime] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._reload = True
+        self._task: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.skipped = 0
+
+    async def start(self) -> None:
+        """启动调度协程"""
+        if self._task:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._reload = True
+        scheduled_task_service.add_listener(self.notify)
+        self._task = asyncio.ensure_future(self._run())
+        logger.info("定时发布调度器已启动")
+
+    async def stop(self) -> None:
+        """停止调度协程"""
+        scheduled_task_service.remove_listener(self.notify)
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.info("定时发布调度器已停止")
+
+    def notify(self) -> None:
+        """任务有变更，重新加载（可在任意线程调用）"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._request_reload)
+
+    def _request_reload(self) -> None:
+        self._reload = True
+        self._wakeup.set()
+
+    def _load(self) -> None:
+        """加载最近的一批任务"""
+        upcoming = scheduled_task_service.get_upcoming(self.batch_size)
+        self._heap = list(upcoming)
+        heapq.heapify(self._heap)
+        self._horizon = upcoming[-1][0] if len(upcoming) >= self.batch_size else None
+        self._reload = False
+        logger.debug(f"调度器加载了 {len(upcoming)} 个任务")
+
+    async def _run(self) -> None:
+        """调度循环：执行到期任务，然后睡眠到下一个到期时间或被唤醒"""
+        while True:
+            try:
+                if self._reload:
+                    self._wakeup.clear()
+                    self._load()
+
+                now = datetime.now()
+                while self._heap and self._heap[0][0] <= now:
+                    run_time, task_id = heapq.heappop(self._heap)
+                    await self._fire(task_id, run_time, now)
+
+                # 当前批次已执行完而数据库中还有更晚的任务，加载下一批
+                if not self._heap and self._horizon is not None:
+                    self._reload = True
+                    continue
+
+                timeout = self.MAX_SLEEP
+                if self._heap:
+                    timeout = min(timeout, max((self._heap[0][0] - datetime.now()).total_seconds(), 0))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"调度定时任务失败: {str(e)}")
+                self._reload = True
+                timeout = self.MAX_SLEEP
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, task_id: int, run_time: datetime, now: datetime) -> None:
+        """领取并执行一次到期的运行"""
+        payload = scheduled_task_service.claim_run(task_id, run_time, now, self.catchup_window)
+        if payload is None:
+            # 任务已被修改、删除或被其他调度器领取
+            return
+
+        next_run_time = payload['next_run_time']
+        if next_run_time is not None and (self._horizon is None or next_run_time <= self._horizon):
+            heapq.heappush(self._heap, (next_run_time, task_id))
+
+        if not payload['run']:
+            self.skipped += 1
+            logger.warning(f"定时任务 {task_id} 跳过 {payload['run_time']} 的运行: {payload['skip_reason']}")
+            return
+
+        logger.info(f"执行定时任务: {task_id} ({payload['name']})，下次运行: {next_run_time}")
+        try:
+            result = self.dispatcher(payload)
+            if inspect.isawaitable(result):
+                await result
+            self.dispatched += 1
+        except Exception as e:
+            logger.error(f"提交定时任务 {task_id} 失败: {str(e)}")
+
+    @staticmethod
+    def _default_dispatcher(payload: Dict[str, Any]) -> None:
+        """默认处理：提交到发布引擎（不等待发布完成）"""
+        publish_engine.submit(payload['user_id'], payload['title'], payload['content'])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度器统计信息"""
+        return {
+            'loaded': len(self._heap),
+            'next_run_time': self._heap[0][0].isoformat() if self._heap else None,
+            'dispatched': self.dispatched,
+            'skipped': self.skipped,
+            'running': self._task is not None
+        }
@@ -1,9 +1,18 @@
 from .user_service import UserService
 from .proxy_service import ProxyService
 from .fingerprint_service import FingerprintService
+from .publish_queue_service import PublishQueueService
+from .scheduled_task_service import ScheduledTaskService
+from .account_cache import AccountCache, UserSnapshot, ProxySnapshot, FingerprintSnapshot
 
 __all__ = [
     'UserService',
     'ProxyService',
-    'FingerprintService'
+    'FingerprintService',
+    'PublishQueueService',
+    'ScheduledTaskService',
+    'AccountCache',
+    'UserSnapshot',
+    'ProxySnapshot',
+    'FingerprintSnapshot'
 ] 
\ No newline at end of file
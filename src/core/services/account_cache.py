@@ -0,0 +1,201 @@
+"""
+账号配置缓存
+按用户ID缓存用户信息、默认代理和默认浏览器指纹，读穿透、按版本失效
+"""
+
+import threading
+from dataclasses import dataclass, fields
+from typing import Optional, Dict, Any, Tuple, Callable, Iterable
+from sqlalchemy import and_
+
+from ..models.user import User, ProxyConfig, BrowserFingerprint
+from ...config.database import db_manager
+
+
+def _snapshot_of(cls, row):
+    """从ORM对象创建快照（只复制快照中声明的字段）"""
+    if row is None:
+        return None
+    return cls(**{f.name: getattr(row, f.name) for f in fields(cls)})
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """用户信息快照（不可变，脱离数据库会话也可安全使用）"""
+    id: int
+    username: str
+    phone: str
+    display_name: Optional[str]
+    is_active: bool
+    is_current: bool
+    is_logged_in: bool
+
+    from_model = classmethod(_snapshot_of)
+
+
+@dataclass(frozen=True)
+class ProxySnapshot:
+    """代理配置快照"""
+    id: int
+    user_id: int
+    name: str
+    proxy_type: str
+    host: str
+    port: int
+    username: Optional[str]
+    password: Optional[str]
+    is_active: bool
+    is_default: bool
+
+    from_model = classmethod(_snapshot_of)
+    get_proxy_url = ProxyConfig.get_proxy_url
+    get_proxy_dict = ProxyConfig.get_proxy_dict
+
+
+@dataclass(frozen=True)
+class FingerprintSnapshot:
+    """浏览器指纹快照"""
+    id: int
+    user_id: int
+    name: str
+    user_agent: Optional[str]
+    viewport_width: Optional[int]
+    viewport_height: Optional[int]
+    screen_width: Optional[int]
+    screen_height: Optional[int]
+    platform: Optional[str]
+    timezone: Optional[str]
+    locale: Optional[str]
+    webgl_vendor: Optional[str]
+    webgl_renderer: Optional[str]
+    canvas_fingerprint: Optional[str]
+    webrtc_public_ip: Optional[str]
+    webrtc_local_ip: Optional[str]
+    fonts: Optional[str]
+    plugins: Optional[str]
+    is_active: bool
+    is_default: bool
+
+    from_model = classmethod(_snapshot_of)
+    get_browser_context_options = BrowserFingerprint.get_browser_context_options
+
+
+class AccountCache:
+    """账号配置缓存
+
+    每个用户有一个版本号，set_default_*/update_*/delete_* 等写操作提交后递增版本，
+    旧版本的缓存项随之失效。读取时若加载期间版本发生变化，加载结果不会写入缓存，
+    避免并发写入后缓存旧数据。缓存中保存不可变快照而不是脱离会话的ORM对象。
+    """
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        self._entries: Dict[Tuple[str, int], Tuple[int, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind: str, user_id: int, loader: Callable[[Any, int], Any]):
+        with self._lock:
+            version = self._versions.get(user_id, 0)
+            entry = self._entries.get((kind, user_id))
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        session = self.db_manager.get_session_direct()
+        try:
+            value = loader(session, user_id)
+        finally:
+            session.close()
+
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._entries[(kind, user_id)] = (version, value)
+        return value
+
+    def get_user(self, user_id: int) -> Optional[UserSnapshot]:
+        """获取用户信息"""
+        return self._get('user', user_id, lambda session, uid: UserSnapshot.from_model(
+            session.query(User).filter(User.id == uid).first()
+        ))
+
+    def get_default_proxy(self, user_id: int) -> Optional[ProxySnapshot]:
+        """获取用户的默认代理配置"""
+        return self._get('proxy', user_id, lambda session, uid: ProxySnapshot.from_model(
+            session.query(ProxyConfig).filter(and_(
+                ProxyConfig.user_id == uid,
+                ProxyConfig.is_default == True,
+                ProxyConfig.is_active == True
+            )).first()
+        ))
+
+    def get_default_fingerprint(self, user_id: int) -> Optional[FingerprintSnapshot]:
+        """获取用户的默认浏览器指纹配置"""
+        return self._get('fingerprint', user_id, lambda session, uid: FingerprintSnapshot.from_model(
+            session.query(BrowserFingerprint).filter(and_(
+                BrowserFingerprint.user_id == uid,
+                BrowserFingerprint.is_default == True,
+                BrowserFingerprint.is_active == True
+            )).first()
+        ))
+
+    def preload(self, user_ids: Iterable[int]) -> None:
+        """批量预加载多个账号（每类配置一次查询），之后逐个读取不再访问数据库"""
+        with self._lock:
+            versions = {uid: self._versions.get(uid, 0) for uid in set(user_ids)}
+        if not versions:
+            return
+
+        session = self.db_manager.get_session_direct()
+        try:
+            ids = list(versions)
+            users = {u.id: u for u in session.query(User).filter(User.id.in_(ids)).all()}
+            proxies = {p.user_id: p for p in session.query(ProxyConfig).filter(and_(
+                ProxyConfig.user_id.in_(ids),
+                ProxyConfig.is_default == True,
+                ProxyConfig.is_active == True
+            )).all()}
+            fingerprints = {f.user_id: f for f in session.query(BrowserFingerprint).filter(and_(
+                BrowserFingerprint.user_id.in_(ids),
+                BrowserFingerprint.is_default == True,
+                BrowserFingerprint.is_active == True
+            )).all()}
+
+            loaded = {}
+            for uid in ids:
+                loaded[('user', uid)] = UserSnapshot.from_model(users.get(uid))
+                loaded[('proxy', uid)] = ProxySnapshot.from_model(proxies.get(uid))
+                loaded[('fingerprint', uid)] = FingerprintSnapshot.from_model(fingerprints.get(uid))
+        finally:
+            session.close()
+
+        with self._lock:
+            for (kind, uid), value in loaded.items():
+                if self._versions.get(uid, 0) == versions[uid]:
+                    self._entries[(kind, uid)] = (versions[uid], value)
+
+    def invalidate(self, user_id: int) -> None:
+        """使用户的缓存失效（写操作提交后调用）"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            for kind in ('user', 'proxy', 'fingerprint'):
+                self._entries.pop((kind, user_id), None)
+
+    def invalidate_all(self) -> None:
+        """使所有用户的缓存失效"""
+        with self._lock:
+            for user_id in {uid for _, uid in self._entries} | set(self._versions):
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# 全局账号配置缓存实例
+account_cache = AccountCache()
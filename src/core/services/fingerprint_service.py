@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, insert
 from src.config.database import db_manager
 from src.core.models.user import BrowserFingerprint
+from .account_cache import account_cache, FingerprintSnapshot
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import random
@@ -42,6 +43,7 @@ class FingerprintService:
             session.add(fingerprint)
             session.commit()
             session.refresh(fingerprint)
+            account_cache.invalidate(user_id)
             
             return fingerprint
             
@@ -84,6 +86,10 @@ class FingerprintService:
         finally:
             session.close()
     
+    def get_default_fingerprint_snapshot(self, user_id: int) -> Optional[FingerprintSnapshot]:
+        """获取用户默认浏览器指纹配置的快照（走账号缓存）"""
+        return account_cache.get_default_fingerprint(user_id)
+    
     def set_default_fingerprint(self, user_id: int, fingerprint_id: int) -> BrowserFingerprint:
         """设置默认浏览器指纹配置"""
         session = self.db_manager.get_session_direct()
@@ -107,6 +113,7 @@ class FingerprintService:
             
             session.commit()
             session.refresh(target_fingerprint)
+            account_cache.invalidate(user_id)
             
             return target_fingerprint
             
@@ -140,6 +147,7 @@ class FingerprintService:
             fingerprint.updated_at = datetime.now()
             session.commit()
             session.refresh(fingerprint)
+            account_cache.invalidate(fingerprint.user_id)
             
             return fingerprint
             
@@ -171,6 +179,7 @@ class FingerprintService:
                     remaining_fingerprint.is_default = True
             
             session.commit()
+            account_cache.invalidate(user_id)
             return True
             
         except Exception as e:
@@ -246,9 +255,10 @@ class FingerprintService:
         # 更新到数据库
         session = self.db_manager.get_session_direct()
         try:
-            session.merge(fingerprint)
+            fingerprint = session.merge(fingerprint)
             session.commit()
             session.refresh(fingerprint)
+            account_cache.invalidate(user_id)
             return fingerprint
         finally:
             session.close()
@@ -302,6 +312,61 @@ class FingerprintService:
         
         return created_fingerprints
     
+    def bulk_create_fingerprints(self, user_id: int, fingerprints: List[Dict[str, Any]]) -> List[int]:
+        """批量创建浏览器指纹配置（一次查询去重、一次 executemany 插入、一次提交）
+        
+        Args:
+            user_id: 用户ID
+            fingerprints: 指纹配置列表，每项至少包含 name，其余字段同 create_fingerprint
+        
+        Returns:
+            List[int]: 新建配置的ID（重名的配置被跳过）
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            existing_names = {
+                row.name for row in session.query(BrowserFingerprint.name).filter(
+                    BrowserFingerprint.user_id == user_id
+                )
+            }
+            # 没有任何指纹配置时，第一个设为默认
+            needs_default = not existing_names
+            
+            columns = set(BrowserFingerprint.__table__.columns.keys())
+            rows = []
+            now = datetime.now()
+            for data in fingerprints:
+                name = data.get('name')
+                if not name or name in existing_names:
+                    continue
+                existing_names.add(name)
+                row = {key: value for key, value in data.items() if key in columns and key != 'id'}
+                row.update({
+                    'user_id': user_id,
+                    'is_default': needs_default and not rows,
+                    'is_active': data.get('is_active', True),
+                    'created_at': now,
+                    'updated_at': now
+                })
+                rows.append(row)
+            
+            if not rows:
+                return []
+            
+            ids = session.scalars(
+                insert(BrowserFingerprint).returning(BrowserFingerprint.id), rows
+            ).all()
+            session.commit()
+            account_cache.invalidate(user_id)
+            
+            return list(ids)
+            
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
     def get_fingerprint_stats(self, user_id: int) -> Dict[str, Any]:
         """获取用户浏览器指纹配置统计信息"""
         session = self.db_manager.get_session_direct()
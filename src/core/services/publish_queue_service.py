@@ -0,0 +1,266 @@
+"""
+发布队列服务
+基于SQLite的持久化发布任务队列：幂等提交、租约领取、失败重试
+"""
+
+import asyncio
+import functools
+import json
+import random
+import uuid
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..models.content import PublishQueueJob, PublishHistory
+from ...config.database import db_manager
+
+
+class PublishQueueService:
+    """发布队列服务类
+
+    任务状态流转: pending -> running -> succeeded / failed / awaiting_manual（内容已填好，等待手动点击发布）
+    running 任务持有租约，执行期间由工作者定期续约；租约过期（进程崩溃等）后会被重新领取，保证至少执行一次。
+    在事件循环中调用时使用 *_async 方法，数据库读写（含等待SQLite写锁）在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self):
+        self.db_manager = db_manager
+        PublishQueueJob.__table__.create(bind=self.db_manager.engine, checkfirst=True)
+
+    def enqueue(self, title: str, content: str, images: List[str] = None,
+                content_id: str = None, user_id: int = None,
+                idempotency_key: str = None, max_attempts: int = 3) -> PublishQueueJob:
+        """提交发布任务，相同幂等键只会创建一个任务"""
+        session = self.db_manager.get_session_direct()
+        try:
+            if idempotency_key:
+                existing = session.query(PublishQueueJob).filter(
+                    PublishQueueJob.idempotency_key == idempotency_key
+                ).first()
+                if existing:
+                    return existing
+
+            job = PublishQueueJob(
+                id=uuid.uuid4().hex,
+                idempotency_key=idempotency_key,
+                user_id=user_id,
+                content_id=content_id,
+                title=title,
+                content=content,
+                images=json.dumps(images or [], ensure_ascii=False),
+                status='pending',
+                attempts=0,
+                max_attempts=max_attempts,
+                next_attempt_at=datetime.utcnow()
+            )
+
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+
+            return job
+        except IntegrityError:
+            # 并发提交了相同的幂等键
+            session.rollback()
+            return session.query(PublishQueueJob).filter(
+                PublishQueueJob.idempotency_key == idempotency_key
+            ).first()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def enqueue_async(self, **kwargs) -> PublishQueueJob:
+        """提交发布任务（异步）"""
+        return await self._run_in_executor(self.enqueue, **kwargs)
+
+    async def claim_next_async(self, worker_id: str, lease_seconds: float) -> Optional[PublishQueueJob]:
+        """领取任务（异步）"""
+        return await self._run_in_executor(self.claim_next, worker_id, lease_seconds)
+
+    async def renew_async(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """续约（异步）"""
+        return await self._run_in_executor(self.renew, job_id, worker_id, lease_seconds)
+
+    async def complete_async(self, job_id: str, worker_id: str) -> bool:
+        """标记任务成功（异步）"""
+        return await self._run_in_executor(self.complete, job_id, worker_id)
+
+    async def fail_async(self, job_id: str, worker_id: str, error: str, backoff_seconds: float) -> bool:
+        """标记任务失败（异步）"""
+        return await self._run_in_executor(self.fail, job_id, worker_id, error, backoff_seconds)
+
+    async def mark_awaiting_manual_async(self, job_id: str, worker_id: str, message: str) -> bool:
+        """标记任务等待手动发布（异步）"""
+        return await self._run_in_executor(self.mark_awaiting_manual, job_id, worker_id, message)
+
+    def get_job(self, job_id: str) -> Optional[PublishQueueJob]:
+        """根据ID获取任务"""
+        session = self.db_manager.get_session_direct()
+        try:
+            return session.query(PublishQueueJob).filter(PublishQueueJob.id == job_id).first()
+        finally:
+            session.close()
+
+    async def get_job_async(self, job_id: str) -> Optional[PublishQueueJob]:
+        """根据ID获取任务（异步引擎可用时不占用事件循环线程）"""
+        if not self.db_manager.async_available:
+            return self.get_job(job_id)
+
+        async with self.db_manager.get_async_session() as session:
+            return await session.get(PublishQueueJob, job_id)
+
+    def claim_next(self, worker_id: str, lease_seconds: float) -> Optional[PublishQueueJob]:
+        """领取一个可执行的任务（到期的pending任务或租约已过期的running任务）"""
+        session = self.db_manager.get_session_direct()
+        try:
+            now = datetime.utcnow()
+
+            # 租约过期且已用完尝试次数的任务直接标记为失败
+            session.query(PublishQueueJob).filter(
+                and_(PublishQueueJob.status == 'running',
+                     PublishQueueJob.locked_until < now,
+                     PublishQueueJob.attempts >= PublishQueueJob.max_attempts)
+            ).update({
+                PublishQueueJob.status: 'failed',
+                PublishQueueJob.last_error: '执行超时，已达到最大尝试次数',
+                PublishQueueJob.locked_by: None,
+                PublishQueueJob.finished_at: now
+            }, synchronize_session=False)
+            session.commit()
+
+            claimable = or_(
+                and_(PublishQueueJob.status == 'pending', PublishQueueJob.next_attempt_at <= now),
+                and_(PublishQueueJob.status == 'running', PublishQueueJob.locked_until < now)
+            )
+
+            for _ in range(3):
+                candidate = session.query(PublishQueueJob.id).filter(claimable).order_by(
+                    PublishQueueJob.next_attempt_at, PublishQueueJob.created_at
+                ).first()
+                if not candidate:
+                    return None
+
+                # 条件更新保证同一任务只会被一个工作者领取
+                claimed = session.query(PublishQueueJob).filter(
+                    and_(PublishQueueJob.id == candidate.id, claimable)
+                ).update({
+                    PublishQueueJob.status: 'running',
+                    PublishQueueJob.attempts: PublishQueueJob.attempts + 1,
+                    PublishQueueJob.locked_by: worker_id,
+                    PublishQueueJob.locked_until: now + timedelta(seconds=lease_seconds)
+                }, synchronize_session=False)
+                session.commit()
+
+                if claimed:
+                    return session.query(PublishQueueJob).filter(PublishQueueJob.id == candidate.id).first()
+
+            return None
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """续约执行中的任务，租约已被其他工作者接管时返回False"""
+        session = self.db_manager.get_session_direct()
+        try:
+            renewed = session.query(PublishQueueJob).filter(
+                and_(PublishQueueJob.id == job_id,
+                     PublishQueueJob.status == 'running',
+                     PublishQueueJob.locked_by == worker_id)
+            ).update({
+                PublishQueueJob.locked_until: datetime.utcnow() + timedelta(seconds=lease_seconds)
+            }, synchronize_session=False)
+            session.commit()
+            return bool(renewed)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """标记任务成功"""
+        return self._finish(job_id, worker_id, 'succeeded')
+
+    def fail(self, job_id: str, worker_id: str, error: str, backoff_seconds: float) -> bool:
+        """标记任务失败，未用完尝试次数时按指数退避重新排队"""
+        return self._finish(job_id, worker_id, 'failed', error, backoff_seconds)
+
+    def mark_awaiting_manual(self, job_id: str, worker_id: str, message: str) -> bool:
+        """标记任务等待手动发布（不重试，发布历史记为待定）"""
+        return self._finish(job_id, worker_id, 'awaiting_manual', message)
+
+    def _finish(self, job_id: str, worker_id: str, status: str,
+                error: str = None, backoff_seconds: float = 0) -> bool:
+        session = self.db_manager.get_session_direct()
+        try:
+            job = session.query(PublishQueueJob).filter(
+                and_(PublishQueueJob.id == job_id, PublishQueueJob.locked_by == worker_id)
+            ).first()
+            if not job:
+                # 租约已被其他工作者接管
+                return False
+
+            now = datetime.utcnow()
+            job.locked_by = None
+            job.locked_until = None
+            job.last_error = error
+
+            if status == 'failed' and job.attempts < job.max_attempts:
+                delay = backoff_seconds * (2 ** (job.attempts - 1)) * random.uniform(0.8, 1.2)
+                job.status = 'pending'
+                job.next_attempt_at = now + timedelta(seconds=delay)
+            else:
+                job.status = status
+                job.finished_at = now
+                self._record_history(session, job)
+
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def _record_history(self, session, job: PublishQueueJob) -> None:
+        """任务结束时写入发布历史"""
+        if job.user_id is None:
+            return
+
+        session.add(PublishHistory(
+            user_id=job.user_id,
+            title=job.title,
+            content=job.content,
+            platform='xiaohongshu',
+            status={'succeeded': 'success', 'awaiting_manual': 'pending'}.get(job.status, 'failed'),
+            error_message=job.last_error,
+            publish_time=job.finished_at
+        ))
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        session = self.db_manager.get_session_direct()
+        try:
+            stats = {'pending': 0, 'running': 0, 'succeeded': 0, 'awaiting_manual': 0, 'failed': 0}
+            for status in stats:
+                stats[status] = session.query(PublishQueueJob).filter(
+                    PublishQueueJob.status == status
+                ).count()
+            return stats
+        finally:
+            session.close()
+
+
+# 全局发布队列服务实例
+publish_queue_service = PublishQueueService()
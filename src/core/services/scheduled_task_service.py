@@ -0,0 +1,314 @@
+"""
+定时任务服务
+管理 scheduled_tasks 表：创建/修改任务、按下次运行时间读取、计算下次运行时间、领取到期任务
+"""
+
+import calendar
+from typing import List, Optional, Dict, Any, Callable, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import and_
+
+from ..models.content import ScheduledTask, ContentTemplate
+from ...config.database import db_manager
+
+
+SCHEDULE_PERIODS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+SCHEDULE_TYPES = ('once', 'daily', 'weekly', 'monthly')
+
+
+def _add_months(anchor: datetime, months: int) -> datetime:
+    """按月偏移，日期超过当月天数时取当月最后一天（1月31日 -> 2月28日 -> 3月31日）"""
+    month_index = anchor.month - 1 + months
+    year, month = anchor.year + month_index // 12, month_index % 12 + 1
+    day = min(anchor.day, calendar.monthrange(year, month)[1])
+    return anchor.replace(year=year, month=month, day=day)
+
+
+def occurrence(anchor: datetime, schedule_type: str, index: int) -> datetime:
+    """第 index 次运行时间（index=0 即 schedule_time 本身）"""
+    if schedule_type == 'monthly':
+        return _add_months(anchor, index)
+    return anchor + SCHEDULE_PERIODS[schedule_type] * index
+
+
+def last_occurrence(anchor: datetime, schedule_type: str, now: datetime) -> Optional[datetime]:
+    """不晚于 now 的最近一次运行时间，now 早于首次运行时返回None"""
+    if now < anchor:
+        return None
+    if schedule_type == 'once':
+        return anchor
+    if schedule_type == 'monthly':
+        index = (now.year - anchor.year) * 12 + now.month - anchor.month
+        if occurrence(anchor, schedule_type, index) > now:
+            index -= 1
+    else:
+        index = (now - anchor) // SCHEDULE_PERIODS[schedule_type]
+    return occurrence(anchor, schedule_type, index)
+
+
+def next_occurrence(anchor: datetime, schedule_type: str, after: datetime) -> Optional[datetime]:
+    """晚于 after 的下一次运行时间，一次性任务已过期时返回None
+
+    直接按周期数计算，停机再久也不需要逐个周期推进。
+    """
+    if after < anchor:
+        return anchor
+    if schedule_type == 'once':
+        return None
+    if schedule_type == 'monthly':
+        index = (after.year - anchor.year) * 12 + after.month - anchor.month
+        if occurrence(anchor, schedule_type, index) <= after:
+            index += 1
+    else:
+        index = (after - anchor) // SCHEDULE_PERIODS[schedule_type] + 1
+    return occurrence(anchor, schedule_type, index)
+
+
+class ScheduledTaskService:
+    """定时任务服务类
+
+    时间均为本地时间（与用户设置的 schedule_time 一致）。
+    任务的发布内容来自关联的内容模板，没有模板的任务不会发布。
+    任务增删改后通知已注册的监听者（调度器据此重新加载，不需要轮询数据库）。
+    表和索引由数据库初始化（create_all）与迁移 0002 创建。
+    """
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self._listeners: List[Callable[[], None]] = []
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """注册任务变更回调"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]) -> None:
+        """移除任务变更回调"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self) -> None:
+        for callback in list(self._listeners):
+            callback()
+
+    def create_task(self, user_id: int, name: str, schedule_time: datetime,
+                    schedule_type: str = 'once', template_id: int = None,
+                    platform: str = 'xiaohongshu') -> ScheduledTask:
+        """创建定时任务（必须关联内容模板）"""
+        if schedule_type not in SCHEDULE_TYPES:
+            raise ValueError(f"不支持的调度类型: {schedule_type}")
+
+        session = self.db_manager.get_session_direct()
+        try:
+            if template_id is None or not session.query(ContentTemplate.id).filter(
+                    ContentTemplate.id == template_id).first():
+                raise ValueError("定时任务必须关联已存在的内容模板")
+
+            task = ScheduledTask(
+                user_id=user_id,
+                template_id=template_id,
+                name=name,
+                platform=platform,
+                schedule_type=schedule_type,
+                schedule_time=schedule_time,
+                is_active=True,
+                next_run_time=schedule_time,
+                run_count=0
+            )
+            session.add(task)
+            session.commit()
+            session.refresh(task)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        self._notify()
+        return task
+
+    def get_task(self, task_id: int) -> Optional[ScheduledTask]:
+        """根据ID获取任务"""
+        session = self.db_manager.get_session_direct()
+        try:
+            return session.query(ScheduledTask).filter(ScheduledTask.id == task_id).first()
+        finally:
+            session.close()
+
+    def get_user_tasks(self, user_id: int) -> List[ScheduledTask]:
+        """获取用户的所有定时任务"""
+        session = self.db_manager.get_session_direct()
+        try:
+            return session.query(ScheduledTask).filter(
+                ScheduledTask.user_id == user_id
+            ).order_by(ScheduledTask.next_run_time).all()
+        finally:
+            session.close()
+
+    def update_task(self, task_id: int, **kwargs) -> Optional[ScheduledTask]:
+        """更新任务，修改了调度时间或类型时重新计算下次运行时间"""
+        session = self.db_manager.get_session_direct()
+        try:
+            task = session.query(ScheduledTask).filter(ScheduledTask.id == task_id).first()
+            if not task:
+                return None
+
+            if kwargs.get('schedule_type', task.schedule_type) not in SCHEDULE_TYPES:
+                raise ValueError(f"不支持的调度类型: {kwargs['schedule_type']}")
+            if 'template_id' in kwargs and (kwargs['template_id'] is None or not session.query(
+                    ContentTemplate.id).filter(ContentTemplate.id == kwargs['template_id']).first()):
+                raise ValueError("定时任务必须关联已存在的内容模板")
+
+            for key, value in kwargs.items():
+                if hasattr(task, key):
+                    setattr(task, key, value)
+
+            if 'schedule_time' in kwargs or 'schedule_type' in kwargs:
+                task.next_run_time = next_occurrence(
+                    task.schedule_time, task.schedule_type, datetime.now() - timedelta(seconds=1)
+                )
+                if task.next_run_time is None:
+                    task.is_active = False
+
+            session.commit()
+            session.refresh(task)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        self._notify()
+        return task
+
+    def set_task_active(self, task_id: int, is_active: bool) -> bool:
+        """启用或停用任务"""
+        return self.update_task(task_id, is_active=is_active) is not None
+
+    def delete_task(self, task_id: int) -> bool:
+        """删除任务"""
+        session = self.db_manager.get_session_direct()
+        try:
+            deleted = session.query(ScheduledTask).filter(ScheduledTask.id == task_id).delete()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+        if deleted:
+            self._notify()
+        return deleted > 0
+
+    def get_upcoming(self, limit: int) -> List[Tuple[datetime, int]]:
+        """按下次运行时间顺序读取最近的启用任务（走 is_active/next_run_time 索引）
+
+        Returns:
+            List[Tuple[datetime, int]]: (下次运行时间, 任务ID)
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            rows = session.query(ScheduledTask.next_run_time, ScheduledTask.id).filter(and_(
+                ScheduledTask.is_active == True,
+                ScheduledTask.next_run_time.isnot(None)
+            )).order_by(ScheduledTask.next_run_time, ScheduledTask.id).limit(limit).all()
+            return [(row.next_run_time, row.id) for row in rows]
+        finally:
+            session.close()
+
+    def claim_run(self, task_id: int, run_time: datetime, now: datetime,
+                  catchup_window: timedelta) -> Optional[Dict[str, Any]]:
+        """领取一次到期的运行，并把任务推进到下一次运行时间
+
+        停机期间错过的多次运行只补发最近的一次，且只在 catchup_window 内补发；
+        关联的内容模板不存在时跳过本次运行（不会发布空内容）；
+        条件更新保证同一次运行只会被一个调度器领取。
+
+        Args:
+            task_id: 任务ID
+            run_time: 调度器记录的到期时间（任务已被修改时与数据库不一致，领取失败）
+            now: 当前时间
+            catchup_window: 补发窗口
+
+        Returns:
+            Dict: 领取结果，包含 run（是否需要执行）、skip_reason（跳过原因）、
+                  next_run_time 以及发布参数；任务已不存在、已停用或已被领取时返回None
+        """
+        session = self.db_manager.get_session_direct()
+        try:
+            task = session.query(ScheduledTask).filter(and_(
+                ScheduledTask.id == task_id,
+                ScheduledTask.is_active == True,
+                ScheduledTask.next_run_time == run_time
+            )).first()
+            if not task:
+                return None
+
+            template = session.query(ContentTemplate).filter(
+                ContentTemplate.id == task.template_id
+            ).first() if task.template_id else None
+
+            latest = last_occurrence(task.schedule_time, task.schedule_type, now) or run_time
+            latest = max(latest, run_time)
+            skip_reason = None
+            if template is None:
+                skip_reason = "未关联内容模板或模板已删除"
+            elif now - latest > catchup_window:
+                skip_reason = "已超过补发窗口"
+            should_run = skip_reason is None
+            next_run_time = next_occurrence(task.schedule_time, task.schedule_type, now)
+
+            values = {
+                ScheduledTask.next_run_time: next_run_time,
+                ScheduledTask.is_active: next_run_time is not None,
+                ScheduledTask.updated_at: datetime.utcnow()
+            }
+            if should_run:
+                values[ScheduledTask.last_run_time] = now
+                values[ScheduledTask.run_count] = ScheduledTask.run_count + 1
+
+            claimed = session.query(ScheduledTask).filter(and_(
+                ScheduledTask.id == task_id,
+                ScheduledTask.next_run_time == run_time
+            )).update(values, synchronize_session=False)
+            if not claimed:
+                session.rollback()
+                return None
+
+            result = {
+                'task_id': task.id,
+                'user_id': task.user_id,
+                'name': task.name,
+                'platform': task.platform,
+                'run': should_run,
+                'skip_reason': skip_reason,
+                'run_time': latest,
+                'next_run_time': next_run_time,
+                'title': template.title or task.name if template else task.name,
+                'content': template.content or '' if template else ''
+            }
+
+            session.commit()
+            return result
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取定时任务统计"""
+        session = self.db_manager.get_session_direct()
+        try:
+            total = session.query(ScheduledTask).count()
+            active = session.query(ScheduledTask).filter(ScheduledTask.is_active == True).count()
+            return {'total': total, 'active': active}
+        finally:
+            session.close()
+
+
+# 全局定时任务服务实例
+scheduled_task_service = ScheduledTaskService()
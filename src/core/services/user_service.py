@@ -9,6 +9,7 @@ from sqlalchemy import and_, or_
 
 from ..models.user import User
 from ...config.database import db_manager
+from .account_cache import account_cache, UserSnapshot
 
 
 class UserService:
@@ -60,6 +61,10 @@ class UserService:
         finally:
             session.close()
     
+    def get_user_snapshot(self, user_id: int) -> Optional[UserSnapshot]:
+        """获取用户信息快照（走账号缓存，不访问数据库）"""
+        return account_cache.get_user(user_id)
+    
     def get_user_by_username(self, username: str) -> Optional[User]:
         """根据用户名获取用户"""
         session = self.db_manager.get_session_direct()
@@ -118,6 +123,8 @@ class UserService:
             
             session.commit()
             session.refresh(target_user)
+            # 所有用户的 is_current 都可能变化
+            account_cache.invalidate_all()
             
             return target_user
         except Exception as e:
@@ -162,6 +169,7 @@ class UserService:
             user.updated_at = datetime.utcnow()
             session.commit()
             session.refresh(user)
+            account_cache.invalidate(user_id)
             
             return user
         except Exception as e:
@@ -185,6 +193,7 @@ class UserService:
             user.updated_at = datetime.utcnow()
             session.commit()
             session.refresh(user)
+            account_cache.invalidate(user_id)
             
             return user
         except Exception as e:
@@ -214,6 +223,7 @@ class UserService:
                 user.updated_at = datetime.utcnow()
             
             session.commit()
+            account_cache.invalidate(user_id)
             return True
         except Exception as e:
             session.rollback()
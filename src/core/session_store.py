@@ -0,0 +1,206 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from .logger import logger
+from .config import config
+
+
+# 小红书登录相关的cookie
+AUTH_COOKIE_NAMES = ('web_session', 'galaxy_creator_session_id', 'customer-sso-sid')
+
+# 在页面脚本执行前恢复 sessionStorage（Playwright 的 storage_state 不包含 sessionStorage）
+RESTORE_SESSION_STORAGE_JS = """
+(function(data){
+    const items = data[window.location.origin];
+    if (!items) return;
+    for (const [key, value] of Object.entries(items)) {
+        if (window.sessionStorage.getItem(key) === null) {
+            window.sessionStorage.setItem(key, value);
+        }
+    }
+})(%s);
+"""
+
+
+def valid_auth_cookies(cookies: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """筛选未过期的小红书登录cookie（expires 为 -1 表示会话cookie，视为有效）
+
+    a1、webId 等匿名访问也会下发的cookie不算登录凭据。
+    """
+    now = time.time() if now is None else now
+    return [
+        c for c in cookies
+        if 'xiaohongshu.com' in c.get('domain', '') and c.get('name') in AUTH_COOKIE_NAMES
+        and not 0 < c.get('expires', -1) <= now
+    ]
+
+
+class SessionStore:
+    """会话快照存储 - 按上下文key（"default"、"user:1"等）保存Playwright存储状态
+
+    快照包含 cookies、localStorage（storage_state）以及小红书页面的 sessionStorage，
+    写入时先写临时文件再原子替换。快照记录过期时间（登录cookie的最早过期时间，
+    不超过 session_snapshot_ttl），无需访问网络即可判断会话是否仍然有效。
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else Path(config.app.data_dir) / "sessions"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return self.root / f"{safe_key}.json"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取快照，不存在或损坏时返回None"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            return snapshot if snapshot.get('version') == self.VERSION else None
+        except Exception as e:
+            logger.warning(f"读取会话快照失败: {key}, {str(e)}")
+            return None
+
+    def get_storage_state(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取可直接传给 new_context(storage_state=...) 的存储状态"""
+        snapshot = self.load(key)
+        return snapshot['storage_state'] if snapshot else None
+
+    def is_valid(self, key: str) -> bool:
+        """离线判断会话是否仍然有效（快照存在、含未过期的登录cookie且未超过过期时间）"""
+        snapshot = self.load(key)
+        if not snapshot or not snapshot.get('logged_in'):
+            return False
+        # 按cookie重新判断，兼容旧快照中仅凭匿名cookie记录的 logged_in
+        if not valid_auth_cookies(snapshot.get('storage_state', {}).get('cookies', [])):
+            return False
+        return time.time() < snapshot.get('expires_at', 0)
+
+    def expires_at(self, key: str) -> Optional[float]:
+        """会话的过期时间"""
+        snapshot = self.load(key)
+        return snapshot.get('expires_at') if snapshot else None
+
+    async def save(self, key: str, context) -> Optional[Dict[str, Any]]:
+        """保存上下文的会话快照
+
+        Args:
+            key: 上下文标识
+            context: Playwright BrowserContext
+
+        Returns:
+            Dict: 保存的快照，失败时返回None
+        """
+        try:
+            storage_state = await context.storage_state()
+            session_storage = await self._collect_session_storage(context.pages)
+        except Exception as e:
+            logger.warning(f"获取会话状态失败: {key}, {str(e)}")
+            return None
+
+        snapshot = self._build_snapshot(storage_state, session_storage)
+        self._write(key, snapshot)
+        logger.debug(f"已保存会话快照: {key}")
+        return snapshot
+
+    def import_cookies(self, key: str, cookies: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """将旧版cookies文件的内容导入为快照"""
+        for cookie in cookies:
+            cookie.setdefault('domain', '.xiaohongshu.com')
+            cookie.setdefault('path', '/')
+        snapshot = self._build_snapshot({'cookies': cookies, 'origins': []}, {})
+        self._write(key, snapshot)
+        logger.info(f"已导入 {len(cookies)} 个cookies到会话快照: {key}")
+        return snapshot
+
+    def import_cookies_file(self, key: str, cookies_file) -> bool:
+        """快照不存在时导入旧版cookies文件
+
+        Returns:
+            bool: 是否导入
+        """
+        if self._path(key).exists() or not cookies_file or not os.path.exists(cookies_file):
+            return False
+        try:
+            with open(cookies_file, 'r', encoding='utf-8') as f:
+                self.import_cookies(key, json.load(f))
+            return True
+        except Exception as e:
+            logger.warning(f"导入cookies文件失败: {cookies_file}, {str(e)}")
+            return False
+
+    def delete(self, key: str) -> None:
+        """删除快照（登出时调用）"""
+        path = self._path(key)
+        if path.exists():
+            path.unlink()
+
+    async def apply_session_storage(self, context, key: str) -> None:
+        """为新建的上下文注入 sessionStorage 恢复脚本"""
+        snapshot = self.load(key)
+        if snapshot and snapshot.get('session_storage'):
+            script = RESTORE_SESSION_STORAGE_JS % json.dumps(snapshot['session_storage'], ensure_ascii=False)
+            await context.add_init_script(script)
+
+    async def _collect_session_storage(self, pages) -> Dict[str, Dict[str, str]]:
+        """收集小红书页面的 sessionStorage"""
+        session_storage = {}
+        for page in pages:
+            if page.is_closed() or "xiaohongshu.com" not in page.url:
+                continue
+            try:
+                origin, items = await page.evaluate(
+                    "() => [window.location.origin, Object.assign({}, window.sessionStorage)]"
+                )
+                session_storage.setdefault(origin, {}).update(items)
+            except Exception as e:
+                logger.debug(f"读取 sessionStorage 失败: {str(e)}")
+        return session_storage
+
+    def _build_snapshot(self, storage_state: Dict[str, Any],
+                        session_storage: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+        """计算快照的有效期：仅当存在未过期的登录cookie时视为已登录，
+        有效期取登录cookie的最早过期时间，且不超过 session_snapshot_ttl"""
+        now = time.time()
+        auth_cookies = valid_auth_cookies(storage_state.get('cookies', []), now)
+
+        # 会话cookie（expires 为 -1）不限制有效期
+        auth_expires = [c['expires'] for c in auth_cookies if c.get('expires', -1) > 0]
+        expires_at = now + config.xiaohongshu.session_snapshot_ttl / 1000
+        if auth_expires:
+            expires_at = min(expires_at, min(auth_expires))
+
+        return {
+            'version': self.VERSION,
+            'saved_at': now,
+            'expires_at': expires_at,
+            'logged_in': bool(auth_cookies),
+            'storage_state': storage_state,
+            'session_storage': session_storage
+        }
+
+    def _write(self, key: str, snapshot: Dict[str, Any]) -> None:
+        """原子写入：先写临时文件再替换"""
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+# 全局会话快照存储实例
+session_store = SessionStore()
@@ -1,5 +1,4 @@
 # 小红书的自动发稿
-from playwright.async_api import async_playwright
 import time
 import json
 import os
@@ -9,9 +8,82 @@ import asyncio
 from PyQt6.QtWidgets import QInputDialog, QLineEdit
 from PyQt6.QtCore import QObject, pyqtSignal, QMetaObject, Qt, QThread, pyqtSlot
 from PyQt6.QtWidgets import QApplication
+
+from .config import config
+from .browser_pool import browser_pool
+from .session_store import session_store
+from .image_preprocess import image_preprocessor
+
 log_path = os.path.expanduser('~/Desktop/xhsai_error.log')
 logging.basicConfig(filename=log_path, level=logging.DEBUG)
 
+# 上传完成后用于判断预览是否出现的元素
+UPLOAD_PREVIEW_SELECTORS = [
+    '.img-card', '.image-preview', '.uploaded-image',
+    '.upload-success', '[class*="preview"]', 'img[src*="blob:"]',
+    '.banner-img', '.thumbnail', '.upload-display-item',
+    '.note-image-item',  # 小红书笔记图片项
+    '.preview-item',  # 通用预览项
+    '.gecko-modal-content img'  # 可能是某种弹窗内的预览
+]
+
+
+class UploadRequestTracker:
+    """跟踪页面上的上传请求，用于判断上传网络请求是否已经结束"""
+
+    def __init__(self, page):
+        self.page = page
+        self.pending = set()
+        self.last_activity = 0.0
+        self._changed = asyncio.Event()
+
+    def _on_request(self, request):
+        if request.method in ("POST", "PUT") and request.resource_type in ("xhr", "fetch"):
+            self.pending.add(request)
+            self._touch()
+
+    def _on_request_done(self, request):
+        if request in self.pending:
+            self.pending.discard(request)
+            self._touch()
+
+    def _touch(self):
+        self.last_activity = asyncio.get_running_loop().time()
+        self._changed.set()
+
+    def start(self):
+        self.last_activity = asyncio.get_running_loop().time()
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_request_done)
+        self.page.on("requestfailed", self._on_request_done)
+
+    def stop(self):
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("requestfinished", self._on_request_done)
+        self.page.remove_listener("requestfailed", self._on_request_done)
+
+    async def wait_settled(self, timeout_ms, quiet_ms):
+        """等待没有进行中的上传请求且静默 quiet_ms 毫秒，超时返回False"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_ms / 1000
+        quiet = quiet_ms / 1000
+        while True:
+            now = loop.time()
+            idle_for = now - self.last_activity
+            if not self.pending and idle_for >= quiet:
+                return True
+            if now >= deadline:
+                return False
+            self._changed.clear()
+            wait_for = deadline - now
+            if not self.pending:
+                wait_for = min(wait_for, quiet - idle_for)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait_for)
+            except asyncio.TimeoutError:
+                pass
+
+
 class VerificationCodeHandler(QObject):
     code_received = pyqtSignal(str)
     
@@ -47,7 +119,10 @@ class VerificationCodeHandler(QObject):
             self.code = ""
 
 class XiaohongshuPoster:
-    def __init__(self):
+    def __init__(self, context_key="default", context_options=None):
+        # 浏览器池中的上下文标识，不同账号使用不同的key即可互相隔离
+        self.context_key = context_key
+        self.context_options = context_options or {}
         self.playwright = None
         self.browser = None
         self.context = None
@@ -63,65 +138,29 @@ class XiaohongshuPoster:
             
         try:
             print("开始初始化Playwright...")
-            self.playwright = await async_playwright().start()
-
-            # 获取可执行文件所在目录
-            launch_args = {
-                'headless': False,
-                'args': [
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-extensions',
-                    '--disable-infobars',
-                    '--start-maximized',
-                    '--ignore-certificate-errors',
-                    '--ignore-ssl-errors'
-                ]
-            }
 
-            chromium_path = None
-
-            if getattr(sys, 'frozen', False):
-                # 如果是打包后的可执行文件
-                executable_dir = os.path.dirname(sys.executable)
-                logging.debug(f"executable_dir: {executable_dir}")
-                if sys.platform == 'darwin':  # macOS系统
-                    if 'XhsAi' in executable_dir:
-                        # 如果在 DMG 中运行
-                        browser_path = os.path.join(
-                            executable_dir, "ms-playwright")
-                    else:
-                        # 如果已经安装到应用程序文件夹
-                        browser_path = os.path.join(
-                            executable_dir, "Contents", "MacOS", "ms-playwright")
-                    logging.debug(f"浏览器路径: {browser_path}")
-                    chromium_path = os.path.join(
-                        browser_path, "chromium-1161/chrome-mac/Chromium.app/Contents/MacOS/Chromium")
-                else:
-                    # Windows系统
-                    executable_dir = sys._MEIPASS
-                    print(f"临时解压目录: {executable_dir}")
-                    browser_path = os.path.join(executable_dir, "ms-playwright")
-                    print(f"浏览器路径: {browser_path}")
-                    chromium_path = os.path.join(
-                        browser_path, "chrome-win", "chrome.exe")
-                    logging.debug(f"Chromium 路径: {chromium_path}")
-            logging.debug(f"Chromium 路径: {chromium_path}")
-            if chromium_path:
-                # 确保浏览器文件存在且有执行权限
-                if os.path.exists(chromium_path):
-                    os.chmod(chromium_path, 0o755)
-                    launch_args['executable_path'] = chromium_path
-                else:
-                    raise Exception(f"浏览器文件不存在: {chromium_path}")
-
-            # 获取默认的 Chromium 可执行文件路径
-            self.browser = await self.playwright.chromium.launch(**launch_args)
-            # 创建新的上下文时设置权限
-            self.context = await self.browser.new_context(
-                permissions=['geolocation']  # 自动允许位置信息访问
+            # 获取用户主目录
+            home_dir = os.path.expanduser('~')
+            app_dir = os.path.join(home_dir, '.xhs_system')
+            if not os.path.exists(app_dir):
+                os.makedirs(app_dir)
+
+            # 设置token和cookies文件路径（非默认上下文按账号分别保存）
+            suffix = "" if self.context_key == "default" else "_" + self.context_key.replace(":", "_")
+            self.token_file = os.path.join(app_dir, f"xiaohongshu_token{suffix}.json")
+            self.cookies_file = os.path.join(app_dir, f"xiaohongshu_cookies{suffix}.json")
+            self.token = self._load_token()
+
+            # 旧版cookies文件导入为会话快照，浏览器池创建上下文时自动恢复
+            session_store.import_cookies_file(self.context_key, self.cookies_file)
+
+            # 从进程内共享的浏览器池获取上下文，避免每次都启动新的Chromium进程
+            self.context = await browser_pool.acquire_context(
+                self.context_key,
+                **self.get_context_options(self.context_options)
             )
+            self.browser = self.context.browser
+            self.playwright = browser_pool.playwright
             self.page = await self.context.new_page()
             
             # 注入stealth.min.js
@@ -203,18 +242,6 @@ class XiaohongshuPoster:
             
             print("浏览器启动成功！")
             logging.debug("浏览器启动成功！")
-            
-            # 获取用户主目录
-            home_dir = os.path.expanduser('~')
-            app_dir = os.path.join(home_dir, '.xhs_system')
-            if not os.path.exists(app_dir):
-                os.makedirs(app_dir)
-
-            # 设置token和cookies文件路径
-            self.token_file = os.path.join(app_dir, "xiaohongshu_token.json")
-            self.cookies_file = os.path.join(app_dir, "xiaohongshu_cookies.json")
-            self.token = self._load_token()
-            await self._load_cookies()
 
         except Exception as e:
             print(f"初始化过程中出现错误: {str(e)}")
@@ -222,6 +249,19 @@ class XiaohongshuPoster:
             await self.close(force=True)  # 确保资源被正确释放
             raise
 
+    @staticmethod
+    def get_context_options(context_options=None):
+        """浏览器上下文参数（预热与初始化必须一致，才能复用同一个上下文）"""
+        return {
+            'permissions': ['geolocation'],  # 自动允许位置信息访问
+            **(context_options or {})
+        }
+
+    @classmethod
+    def prewarm(cls, context_key="default", context_options=None):
+        """在后台预热账号的浏览器上下文（恢复已保存的会话），发布时直接复用"""
+        browser_pool.schedule_prewarm(context_key, **cls.get_context_options(context_options))
+
     def _load_token(self):
         """从文件加载token"""
         if os.path.exists(self.token_file):
@@ -245,30 +285,9 @@ class XiaohongshuPoster:
         with open(self.token_file, 'w') as f:
             json.dump(token_data, f)
 
-    async def _load_cookies(self):
-        """从文件加载cookies"""
-        if os.path.exists(self.cookies_file):
-            try:
-                with open(self.cookies_file, 'r') as f:
-                    cookies = json.load(f)
-                    # 确保cookies包含必要的字段
-                    for cookie in cookies:
-                        if 'domain' not in cookie:
-                            cookie['domain'] = '.xiaohongshu.com'
-                        if 'path' not in cookie:
-                            cookie['path'] = '/'
-                    await self.context.add_cookies(cookies)
-            except Exception as e:
-                logging.debug(f"加载cookies失败: {str(e)}")
-
-    async def _save_cookies(self):
-        """保存cookies到文件"""
-        try:
-            cookies = await self.context.cookies()
-            with open(self.cookies_file, 'w') as f:
-                json.dump(cookies, f)
-        except Exception as e:
-            logging.debug(f"保存cookies失败: {str(e)}")
+    async def _save_session(self):
+        """保存会话快照（cookies、localStorage、sessionStorage）"""
+        await session_store.save(self.context_key, self.context)
 
     async def login(self, phone, country_code="+86"):
         """登录小红书"""
@@ -277,28 +296,14 @@ class XiaohongshuPoster:
         if self.token:
             return
 
-        # 尝试加载cookies进行登录
-        await self.page.goto("https://creator.xiaohongshu.com/login", wait_until="networkidle")
-        # 先清除所有cookies
-        await self.context.clear_cookies()
-        
-        # 重新加载cookies
-        await self._load_cookies()
-        # 刷新页面并等待加载完成
-        await self.page.reload(wait_until="networkidle")
-
-        # 检查是否已经登录
-        current_url = self.page.url
-        if "login" not in current_url:
-            print("使用cookies登录成功")
-            self.token = self._load_token()
-            await self._save_cookies()
+        # 会话快照在有效期内时直接使用（上下文创建时已恢复），无需导航验证
+        if session_store.is_valid(self.context_key):
+            print("使用已保存的会话登录成功")
             return
-        else:
-            # 清理无效的cookies
-            await self.context.clear_cookies()
-            
-        # 如果cookies登录失败，则进行手动登录
+
+        # 没有有效的会话，清理过期的cookies后进行手动登录
+        await self.context.clear_cookies()
+
         await self.page.goto("https://creator.xiaohongshu.com/login")
         await asyncio.sleep(1)
 
@@ -328,8 +333,8 @@ class XiaohongshuPoster:
 
         # 等待登录成功
         await asyncio.sleep(3)
-        # 保存cookies
-        await self._save_cookies()
+        # 保存会话快照
+        await self._save_session()
 
     async def post_article(self, title, content, images=None):
         """发布文章
@@ -337,22 +342,22 @@ class XiaohongshuPoster:
             title: 文章标题
             content: 文章内容
             images: 图片路径列表
+
+        Returns:
+            bool: 是否检测到用户已点击发布（False 表示内容已填好，仍在等待手动发布）
         """
         await self.ensure_browser()  # 确保浏览器已初始化
         
+        # 图片预处理（缩放、去EXIF、调整宽高比）在进程池中进行，与页面导航同时执行
+        prepared_images = None
+        if images and config.xiaohongshu.preprocess_images:
+            prepared_images = asyncio.ensure_future(image_preprocessor.prepare(images))
+        
         try:
             # 首先导航到创作者中心
             print("导航到创作者中心...")
-            await self.page.goto("https://creator.xiaohongshu.com", wait_until="networkidle")
-            await asyncio.sleep(3)
-            
-            # 检查是否需要登录
-            current_url = self.page.url
-            if "login" in current_url:
-                print("需要重新登录...")
-                raise Exception("用户未登录，请先登录")
-            
-            print("点击发布笔记按钮...")
+            await self.page.goto(config.xiaohongshu.base_url, wait_until="domcontentloaded")
+
             # 根据实际HTML结构点击发布按钮
             publish_selectors = [
                 ".publish-video .btn",  # 根据日志显示这个选择器工作正常
@@ -360,31 +365,34 @@ class XiaohongshuPoster:
                 ".btn:text('发布笔记')",
                 "//div[contains(@class, 'btn')][contains(text(), '发布笔记')]"
             ]
-            
-            publish_clicked = False
-            for selector in publish_selectors:
-                try:
-                    print(f"尝试发布按钮选择器: {selector}")
-                    await self.page.wait_for_selector(selector, timeout=5000)
-                    await self.page.click(selector)
-                    print(f"成功点击发布按钮: {selector}")
-                    publish_clicked = True
-                    break
-                except Exception as e:
-                    print(f"发布按钮选择器 {selector} 失败: {e}")
-                    continue
-            
-            if not publish_clicked:
+
+            # 等待发布按钮出现或跳转到登录页，以先到者为准
+            await self._wait_for_page_ready(publish_selectors)
+
+            # 检查是否需要登录
+            current_url = self.page.url
+            if "login" in current_url:
+                print("需要重新登录...")
+                raise Exception("用户未登录，请先登录")
+
+            print("点击发布笔记按钮...")
+            selector = await self._find_selector("publish_btn", publish_selectors)
+            try:
+                if not selector:
+                    raise Exception("所有发布按钮选择器均未出现")
+                await self.page.click(selector)
+                print(f"成功点击发布按钮: {selector}")
+            except Exception as e:
+                print(f"点击发布按钮失败: {e}")
+                config.selector_cache.forget("publish_btn")
                 await self.page.screenshot(path="debug_publish_button.png")
                 raise Exception("无法找到发布按钮")
-            
-            await asyncio.sleep(3)
 
             # 切换到上传图文选项卡
             print("切换到上传图文选项卡...")
             try:
                 # 等待选项卡加载
-                await self.page.wait_for_selector(".creator-tab", timeout=10000)
+                await self.page.wait_for_selector(".creator-tab", timeout=config.xiaohongshu.page_ready_timeout)
                 
                 # 使用JavaScript直接获取第二个选项卡并点击
                 await self.page.evaluate("""
@@ -398,158 +406,26 @@ class XiaohongshuPoster:
                     }
                 """)
                 print("使用JavaScript方法点击第二个选项卡")
-                
-                await asyncio.sleep(2)
             except Exception as e:
                 print(f"切换选项卡失败: {e}")
                 await self.page.screenshot(path="debug_tabs.png")
 
-            # 等待页面切换完成
-            await asyncio.sleep(3)
-            # time.sleep(15) # 长时间同步阻塞，应避免，Playwright有自己的等待机制
-            
             # 上传图片（如果有）
-            print("--- 开始图片上传流程 ---")
             if images:
+                if prepared_images is not None:
+                    images = await prepared_images
                 print("--- 开始图片上传流程 ---")
+                upload_tracker = UploadRequestTracker(self.page)
                 try:
-                    # 等待上传区域关键元素（如上传按钮）出现
-                    print("等待上传按钮 '.upload-button' 出现...")
-                    await self.page.wait_for_selector(".upload-button", timeout=20000) 
-                    await asyncio.sleep(1.5) # 短暂稳定延时
-
-                    upload_success = False
-                    
-                    # --- 首选方法: 点击明确的 "上传图片" 按钮 ---
-                    if not upload_success:
-                        print("尝试首选方法: 点击 '.upload-button'")
-                        try:
-                            button_selector = ".upload-button"
-                            await self.page.wait_for_selector(button_selector, state="visible", timeout=10000)
-                            print(f"按钮 '{button_selector}' 可见，准备点击.")
-                            
-                            async with self.page.expect_file_chooser(timeout=15000) as fc_info:
-                                await self.page.click(button_selector, timeout=7000)
-                                print(f"已点击 '{button_selector}'. 等待文件选择器...")
-                            
-                            file_chooser = await fc_info.value
-                            print(f"文件选择器已出现: {file_chooser}")
-                            await file_chooser.set_files(images)
-                            print(f"已通过文件选择器设置文件: {images}")
-                            upload_success = True
-                            print(" 首选方法成功: 点击 '.upload-button' 并设置文件")
-                        except Exception as e:
-                            print(f" 首选方法 (点击 '.upload-button') 失败: {e}")
-                            if self.page: await self.page.screenshot(path="debug_upload_button_click_failed.png")
-
-                    # --- 方法0.5 (新增): 点击拖拽区域的文字提示区 ---
-                    if not upload_success:
-                        print("尝试方法0.5: 点击拖拽提示区域 ( '.wrapper' 或 '.drag-over')")
-                        try:
-                            clickable_area_selectors = [".wrapper", ".drag-over"]
-                            clicked_area_successfully = False
-                            for area_selector in clickable_area_selectors:
-                                try:
-                                    print(f"尝试点击区域: '{area_selector}'")
-                                    await self.page.wait_for_selector(area_selector, state="visible", timeout=5000)
-                                    print(f"区域 '{area_selector}' 可见，准备点击.")
-                                    async with self.page.expect_file_chooser(timeout=10000) as fc_info:
-                                        await self.page.click(area_selector, timeout=5000)
-                                        print(f"已点击区域 '{area_selector}'. 等待文件选择器...")
-                                    file_chooser = await fc_info.value
-                                    print(f"文件选择器已出现 (点击区域 '{area_selector}'): {file_chooser}")
-                                    await file_chooser.set_files(images)
-                                    print(f"已通过文件选择器 (点击区域 '{area_selector}') 设置文件: {images}")
-                                    upload_success = True
-                                    clicked_area_successfully = True
-                                    print(f" 方法0.5成功: 点击区域 '{area_selector}' 并设置文件")
-                                    break 
-                                except Exception as inner_e:
-                                    print(f"尝试点击区域 '{area_selector}' 失败: {inner_e}")
-                            
-                            if not clicked_area_successfully: 
-                                print(f" 方法0.5 (点击拖拽提示区域) 所有内部尝试均失败")
-                                if self.page: await self.page.screenshot(path="debug_upload_all_area_clicks_failed.png")
-                                
-                        except Exception as e: 
-                            print(f"❌方法0.5 (点击拖拽提示区域) 步骤发生意外错误: {e}")
-                            if self.page: await self.page.screenshot(path="debug_upload_method0_5_overall_failure.png")
-
-                    # --- 方法1 (备选): 直接操作 .upload-input (使用 set_input_files) ---
-                    if not upload_success:
-                        print("尝试方法1: 直接操作 '.upload-input' 使用 set_input_files")
-                        try:
-                            input_selector = ".upload-input"
-                            # 对于 set_input_files，元素不一定需要可见，但必须存在于DOM中
-                            await self.page.wait_for_selector(input_selector, state="attached", timeout=5000)
-                            print(f"找到 '{input_selector}'. 尝试通过 set_input_files 设置文件...")
-                            await self.page.set_input_files(input_selector, files=images, timeout=10000)
-                            print(f"已通过 set_input_files 为 '{input_selector}' 设置文件: {images}")
-                            upload_success = True # 假设 set_input_files 成功即代表文件已选择
-                            print(" 方法1成功: 直接通过 set_input_files 操作 '.upload-input'")
-                        except Exception as e:
-                            print(f" 方法1 (set_input_files on '.upload-input') 失败: {e}")
-                            if self.page: await self.page.screenshot(path="debug_upload_input_set_files_failed.png")
-                    
-                    # --- 方法3 (备选): JavaScript直接触发隐藏的input点击 ---
-                    if not upload_success:
-                        print("尝试方法3: JavaScript点击隐藏的 '.upload-input'")
-                        try:
-                            input_selector = ".upload-input"
-                            await self.page.wait_for_selector(input_selector, state="attached", timeout=5000)
-                            print(f"找到 '{input_selector}'. 尝试通过JS点击...")
-                            async with self.page.expect_file_chooser(timeout=10000) as fc_info:
-                                await self.page.evaluate(f"document.querySelector('{input_selector}').click();")
-                                print(f"已通过JS点击 '{input_selector}'. 等待文件选择器...")
-                            file_chooser = await fc_info.value
-                            print(f"文件选择器已出现 (JS点击): {file_chooser}")
-                            await file_chooser.set_files(images)
-                            print(f"已通过文件选择器 (JS点击后) 设置文件: {images}")
-                            upload_success = True
-                            print(" 方法3成功: JavaScript点击 '.upload-input' 并设置文件")
-                        except Exception as e:
-                            print(f"方法3 (JavaScript点击 '.upload-input') 失败: {e}")
-                            if self.page: await self.page.screenshot(path="debug_upload_js_input_click_failed.png")
+                    upload_tracker.start()
+                    upload_success = await self._upload_images(images)
 
                     # --- 上传后检查 --- 
                     if upload_success:
                         print("图片已通过某种方法设置/点击，进入上传后检查流程，等待处理和预览...")
-                        await asyncio.sleep(7)  # 增加等待时间，等待图片在前端处理和预览
-
-                        upload_check_js = '''
-                            () => {
-                                const indicators = [
-                                    '.img-card', '.image-preview', '.uploaded-image', 
-                                    '.upload-success', '[class*="preview"]', 'img[src*="blob:"]',
-                                    '.banner-img', '.thumbnail', '.upload-display-item',
-                                    '.note-image-item', /*小红书笔记图片项*/
-                                    '.preview-item', /*通用预览项*/
-                                    '.gecko-modal-content img' /* 可能是某种弹窗内的预览 */
-                                ];
-                                let foundVisible = false;
-                                console.log("JS: Checking for upload indicators...");
-                                for (let selector of indicators) {
-                                    const elements = document.querySelectorAll(selector);
-                                    if (elements.length > 0) {
-                                        for (let el of elements) {
-                                            const rect = el.getBoundingClientRect();
-                                            const style = getComputedStyle(el);
-                                            if (rect.width > 0 && rect.height > 0 && style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0') {
-                                                console.log("JS: Found visible indicator:", selector, el);
-                                                foundVisible = true;
-                                                break;
-                                            }
-                                        }
-                                    }
-                                    if (foundVisible) break;
-                                }
-                                console.log("JS: Upload indicator check result (foundVisible):", foundVisible);
-                                return foundVisible;
-                            }
-                        '''
-                        print("执行JS检查图片预览...")
-                        upload_check_successful = await self.page.evaluate(upload_check_js)
-                        
+                        upload_check_successful = await self._wait_for_upload_complete(
+                            upload_tracker, len(images)
+                        )
                         if upload_check_successful:
                             print(" 图片上传并处理成功 (检测到可见的预览元素)")
                         else:
@@ -564,18 +440,12 @@ class XiaohongshuPoster:
                     import traceback
                     traceback.print_exc() 
                     if self.page: await self.page.screenshot(path="debug_image_upload_critical_error_outer.png")
-            
+                finally:
+                    upload_tracker.stop()
+
             # 输入标题和内容
             print("--- 开始输入标题和内容 ---")
-            await asyncio.sleep(5)  # 给更多时间让编辑界面加载
-            # time.sleep(1000) # 已移除
-            # # 尝试查找并点击编辑区域以激活它
-            # try:
-            #     await self.page.click(".editor-wrapper", timeout=5000)
-            #     print("成功点击编辑区域")
-            # except:
-            #     print("尝试点击编辑区域失败")
-            
+
             # 输入标题
             print("输入标题...")
             try:
@@ -591,19 +461,20 @@ class XiaohongshuPoster:
                     ".edit-wrapper input"
                 ]
                 
+                # 优先尝试上次命中的选择器，未命中时并发等待其余选择器
                 title_filled = False
-                for selector in title_selectors:
+                selector = await self._find_selector(
+                    "title_input", title_selectors, timeout=config.xiaohongshu.editor_ready_timeout
+                )
+                if selector:
                     try:
-                        print(f"尝试标题选择器: {selector}")
-                        await self.page.wait_for_selector(selector, timeout=5000)
                         await self.page.fill(selector, title)
                         print(f"标题输入成功，使用选择器: {selector}")
                         title_filled = True
-                        break
                     except Exception as e:
                         print(f"标题选择器 {selector} 失败: {e}")
-                        continue
-                
+                        config.selector_cache.forget("title_input")
+
                 if not title_filled:
                     # 尝试使用键盘快捷键输入
                     try:
@@ -630,18 +501,18 @@ class XiaohongshuPoster:
                 ]
                 
                 content_filled = False
-                for selector in content_selectors:
+                selector = await self._find_selector(
+                    "content_input", content_selectors, timeout=config.xiaohongshu.editor_ready_timeout
+                )
+                if selector:
                     try:
-                        print(f"尝试内容选择器: {selector}")
-                        await self.page.wait_for_selector(selector, timeout=5000)
                         await self.page.fill(selector, content)
                         print(f"内容输入成功，使用选择器: {selector}")
                         content_filled = True
-                        break
                     except Exception as e:
                         print(f"内容选择器 {selector} 失败: {e}")
-                        continue
-                
+                        config.selector_cache.forget("content_input")
+
                 if not content_filled:
                     # 尝试使用键盘快捷键输入
                     try:
@@ -658,7 +529,10 @@ class XiaohongshuPoster:
 
             # 等待用户手动发布
             print("请手动检查内容并点击发布按钮完成发布...")
-            await asyncio.sleep(60) # 延长等待时间，给用户充分时间检查
+            submitted = await self._wait_for_manual_publish()
+            if not submitted:
+                print("未检测到发布操作，内容仍在浏览器中等待手动发布")
+            return submitted
             
         except Exception as e:
             print(f"发布文章时出错: {str(e)}")
@@ -670,6 +544,276 @@ class XiaohongshuPoster:
             except:
                 pass # Ignore screenshot errors
             raise
+        finally:
+            # 提前结束（未登录、出错或没有走到上传步骤）时取消尚未完成的图片预处理
+            if prepared_images is not None and not prepared_images.done():
+                prepared_images.cancel()
+
+    async def _first_successful(self, waiters):
+        """并发执行多个等待协程，返回第一个成功完成的键，全部失败时返回None
+
+        Args:
+            waiters: {键: 等待协程}，同时完成时按字典顺序取第一个
+        """
+        tasks = {key: asyncio.ensure_future(coro) for key, coro in waiters.items()}
+        try:
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for key, task in tasks.items():
+                    if task in done and not task.exception():
+                        return key
+            return None
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            # 回收被取消任务的异常，避免 "exception was never retrieved"
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _wait_for_page_ready(self, selectors, timeout=None):
+        """等待任一选择器可见或页面跳转到登录页，超时不抛异常
+
+        Returns:
+            bool: 在超时前是否就绪
+        """
+        if timeout is None:
+            timeout = config.xiaohongshu.page_ready_timeout
+        waiters = {
+            selector: self.page.wait_for_selector(selector, state="visible", timeout=timeout)
+            for selector in selectors
+        }
+        waiters["login_redirect"] = self.page.wait_for_url(lambda url: "login" in url, timeout=timeout)
+        return await self._first_successful(waiters) is not None
+
+    async def _find_selector(self, step, selectors, timeout=None, state="visible"):
+        """查找步骤可用的选择器：先试上次命中的，未命中时并发等待全部候选
+
+        Returns:
+            str: 命中的选择器，全部超时返回None
+        """
+        if timeout is None:
+            timeout = config.xiaohongshu.page_ready_timeout
+        cache = config.selector_cache
+        cached = cache.get(step)
+        if cached in selectors:
+            try:
+                await self.page.wait_for_selector(
+                    cached, state=state, timeout=config.xiaohongshu.selector_probe_timeout
+                )
+                cache.record_hit(step)
+                return cached
+            except Exception as e:
+                print(f"缓存的选择器 {cached} 未命中: {e}")
+        cache.record_miss(step)
+
+        selector = await self._first_successful({
+            selector: self.page.wait_for_selector(selector, state=state, timeout=timeout)
+            for selector in selectors
+        })
+        if selector:
+            cache.remember(step, selector)
+        return selector
+
+    async def _upload_images(self, images):
+        """上传图片：先试上次成功的上传方式，否则并发探测各方式依赖的元素，先出现者先试
+
+        Returns:
+            bool: 是否成功设置文件
+        """
+        # 上传方式 -> (探测选择器, 探测状态, 处理函数)
+        strategies = {
+            "upload_button": (".upload-button", "visible", self._upload_via_button),
+            "drag_area_wrapper": (".wrapper", "visible", lambda files: self._upload_via_area(files, ".wrapper")),
+            "drag_area_drag_over": (".drag-over", "visible", lambda files: self._upload_via_area(files, ".drag-over")),
+            "input_set_files": (".upload-input", "attached", self._upload_via_input),
+            "input_js_click": (".upload-input", "attached", self._upload_via_input_js_click),
+        }
+        cache = config.selector_cache
+        step = "upload_method"
+
+        cached = cache.get(step)
+        if cached in strategies:
+            print(f"优先尝试上次成功的上传方式: {cached}")
+            if await strategies[cached][2](images):
+                cache.record_hit(step)
+                return True
+        cache.record_miss(step)
+
+        remaining = [name for name in strategies if name != cached]
+        while remaining:
+            name = await self._first_successful({
+                name: self.page.wait_for_selector(
+                    strategies[name][0], state=strategies[name][1],
+                    timeout=config.xiaohongshu.page_ready_timeout
+                )
+                for name in remaining
+            })
+            if name is None:
+                break
+            remaining.remove(name)
+            if await strategies[name][2](images):
+                cache.remember(step, name)
+                return True
+
+        if cached in strategies:
+            cache.forget(step)
+        return False
+
+    async def _upload_via_button(self, images):
+        """首选方法: 点击明确的 "上传图片" 按钮"""
+        print("尝试首选方法: 点击 '.upload-button'")
+        try:
+            button_selector = ".upload-button"
+            await self.page.wait_for_selector(button_selector, state="visible", timeout=10000)
+            print(f"按钮 '{button_selector}' 可见，准备点击.")
+
+            async with self.page.expect_file_chooser(timeout=15000) as fc_info:
+                await self.page.click(button_selector, timeout=7000)
+                print(f"已点击 '{button_selector}'. 等待文件选择器...")
+
+            file_chooser = await fc_info.value
+            print(f"文件选择器已出现: {file_chooser}")
+            await file_chooser.set_files(images)
+            print(f"已通过文件选择器设置文件: {images}")
+            print(" 首选方法成功: 点击 '.upload-button' 并设置文件")
+            return True
+        except Exception as e:
+            print(f" 首选方法 (点击 '.upload-button') 失败: {e}")
+            if self.page: await self.page.screenshot(path="debug_upload_button_click_failed.png")
+            return False
+
+    async def _upload_via_area(self, images, area_selector):
+        """方法0.5: 点击拖拽区域的文字提示区"""
+        print(f"尝试方法0.5: 点击拖拽提示区域 '{area_selector}'")
+        try:
+            await self.page.wait_for_selector(area_selector, state="visible", timeout=5000)
+            print(f"区域 '{area_selector}' 可见，准备点击.")
+            async with self.page.expect_file_chooser(timeout=10000) as fc_info:
+                await self.page.click(area_selector, timeout=5000)
+                print(f"已点击区域 '{area_selector}'. 等待文件选择器...")
+            file_chooser = await fc_info.value
+            print(f"文件选择器已出现 (点击区域 '{area_selector}'): {file_chooser}")
+            await file_chooser.set_files(images)
+            print(f"已通过文件选择器 (点击区域 '{area_selector}') 设置文件: {images}")
+            print(f" 方法0.5成功: 点击区域 '{area_selector}' 并设置文件")
+            return True
+        except Exception as e:
+            print(f"尝试点击区域 '{area_selector}' 失败: {e}")
+            if self.page: await self.page.screenshot(path="debug_upload_area_click_failed.png")
+            return False
+
+    async def _upload_via_input(self, images):
+        """方法1: 直接操作 .upload-input (使用 set_input_files)"""
+        print("尝试方法1: 直接操作 '.upload-input' 使用 set_input_files")
+        try:
+            input_selector = ".upload-input"
+            # 对于 set_input_files，元素不一定需要可见，但必须存在于DOM中
+            await self.page.wait_for_selector(input_selector, state="attached", timeout=5000)
+            print(f"找到 '{input_selector}'. 尝试通过 set_input_files 设置文件...")
+            await self.page.set_input_files(input_selector, files=images, timeout=10000)
+            print(f"已通过 set_input_files 为 '{input_selector}' 设置文件: {images}")
+            print(" 方法1成功: 直接通过 set_input_files 操作 '.upload-input'")
+            return True  # 假设 set_input_files 成功即代表文件已选择
+        except Exception as e:
+            print(f" 方法1 (set_input_files on '.upload-input') 失败: {e}")
+            if self.page: await self.page.screenshot(path="debug_upload_input_set_files_failed.png")
+            return False
+
+    async def _upload_via_input_js_click(self, images):
+        """方法3: JavaScript直接触发隐藏的input点击"""
+        print("尝试方法3: JavaScript点击隐藏的 '.upload-input'")
+        try:
+            input_selector = ".upload-input"
+            await self.page.wait_for_selector(input_selector, state="attached", timeout=5000)
+            print(f"找到 '{input_selector}'. 尝试通过JS点击...")
+            async with self.page.expect_file_chooser(timeout=10000) as fc_info:
+                await self.page.evaluate(f"document.querySelector('{input_selector}').click();")
+                print(f"已通过JS点击 '{input_selector}'. 等待文件选择器...")
+            file_chooser = await fc_info.value
+            print(f"文件选择器已出现 (JS点击): {file_chooser}")
+            await file_chooser.set_files(images)
+            print(f"已通过文件选择器 (JS点击后) 设置文件: {images}")
+            print(" 方法3成功: JavaScript点击 '.upload-input' 并设置文件")
+            return True
+        except Exception as e:
+            print(f"方法3 (JavaScript点击 '.upload-input') 失败: {e}")
+            if self.page: await self.page.screenshot(path="debug_upload_js_input_click_failed.png")
+            return False
+
+    async def _wait_for_upload_complete(self, tracker, image_count):
+        """等待预览元素数量达到图片数量且上传请求全部结束
+
+        Returns:
+            bool: 是否检测到可见的预览元素
+        """
+        timeout = config.xiaohongshu.upload_timeout
+        count_previews_js = '''
+            (selectors) => {
+                let best = 0;
+                for (const selector of selectors) {
+                    let visible = 0;
+                    for (const el of document.querySelectorAll(selector)) {
+                        const rect = el.getBoundingClientRect();
+                        const style = getComputedStyle(el);
+                        if (rect.width > 0 && rect.height > 0 && style.display !== 'none'
+                                && style.visibility !== 'hidden' && style.opacity !== '0') {
+                            visible++;
+                        }
+                    }
+                    best = Math.max(best, visible);
+                }
+                return best;
+            }
+        '''
+        try:
+            await self.page.wait_for_function(
+                f"(selectors) => ({count_previews_js})(selectors) >= {image_count}",
+                arg=UPLOAD_PREVIEW_SELECTORS,
+                timeout=timeout
+            )
+        except Exception as e:
+            print(f"等待图片预览数量达到 {image_count} 超时: {e}")
+
+        settled = await tracker.wait_settled(timeout, config.xiaohongshu.upload_settle_ms)
+        if not settled:
+            print(f"仍有 {len(tracker.pending)} 个上传请求未完成")
+
+        print("执行JS检查图片预览...")
+        return await self.page.evaluate(
+            f"(selectors) => ({count_previews_js})(selectors) > 0",
+            UPLOAD_PREVIEW_SELECTORS
+        )
+
+    async def _wait_for_manual_publish(self) -> bool:
+        """等待用户在浏览器中点击发布，有等待上限
+
+        Returns:
+            bool: 页面已离开发布页（已提交）时为True；等待超时、页面被关闭或未配置等待时为False
+        """
+        timeout = config.xiaohongshu.manual_publish_timeout
+        if timeout <= 0:
+            return False
+        publish_url = self.page.url
+        close_future = asyncio.get_running_loop().create_future()
+
+        def on_close(_page):
+            if not close_future.done():
+                close_future.set_result(True)
+
+        self.page.on("close", on_close)
+        url_task = asyncio.ensure_future(
+            self.page.wait_for_url(lambda url: url != publish_url, timeout=timeout)
+        )
+        try:
+            await asyncio.wait({url_task, close_future}, timeout=timeout / 1000,
+                               return_when=asyncio.FIRST_COMPLETED)
+            # 页面被关闭时无法确认是否已发布，按未提交处理
+            return url_task.done() and not url_task.cancelled() and url_task.exception() is None
+        finally:
+            self.page.remove_listener("close", on_close)
+            url_task.cancel()
+            await asyncio.gather(url_task, return_exceptions=True)
 
     async def close(self, force=False):
         """关闭浏览器
@@ -678,12 +822,11 @@ class XiaohongshuPoster:
         """
         try:
             if force:
+                if self.page and not self.page.is_closed():
+                    await self.page.close()
                 if self.context:
-                    await self.context.close()
-                if self.browser:
-                    await self.browser.close()
-                if self.playwright:
-                    await self.playwright.stop()
+                    # 归还上下文，浏览器进程由浏览器池统一管理
+                    await browser_pool.release_context(self.context_key, context=self.context)
                 self.playwright = None
                 self.browser = None
                 self.context = None
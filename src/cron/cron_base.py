@@ -1,46 +1,70 @@
-import schedule
+import asyncio
 import threading
-import time
+
+from src.core.logger import logger
+from src.core.scheduler import TaskScheduler
+
 
 class ScheduleTaskManager:
-    """定时任务管理器"""
-    
+    """定时任务管理器
+
+    在独立线程的事件循环中运行定时发布调度器（睡眠到下一个任务的到期时间，不逐秒轮询），
+    到期的任务通过浏览器线程的 publish 命令交给发布引擎执行。
+    """
+
     def __init__(self, main_window):
         """初始化定时任务管理器
         :param main_window: 主窗口实例
         """
+        self.main_window = main_window
         self.schedule_thread = None
+        self.loop = None
+        self.scheduler = TaskScheduler(dispatcher=self.dispatch)
         self.running = True
         self.init_tasks()
-        
+
     def init_tasks(self):
         """初始化定时任务"""
-        # 设置每天固定时间清理日志
-        # schedule.every().day.at("09:00").do(self.main_window.clear_log)
-        # schedule.every().day.at("12:00").do(self.main_window.clear_log)
-        # schedule.every().day.at("17:00").do(self.main_window.clear_log)
-        
         # 启动定时任务线程
         self.start_schedule_thread()
-        
+
+    def dispatch(self, payload):
+        """提交到期的定时发布（浏览器线程的 submit 可在任意线程调用）"""
+        self.main_window.browser_thread.submit(
+            'publish',
+            user_id=payload['user_id'],
+            title=payload['title'],
+            content=payload['content'],
+            images=[]
+        )
+
     def run_schedule(self):
         """运行定时任务"""
-        while self.running:
-            schedule.run_pending()
-            time.sleep(1)
-            
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.scheduler.start())
+            self.loop.run_forever()
+            self.loop.run_until_complete(self.scheduler.stop())
+        except Exception as e:
+            logger.error(f"定时任务线程异常: {str(e)}")
+        finally:
+            self.loop.close()
+
     def start_schedule_thread(self):
         """启动定时任务线程"""
         self.running = True
         self.schedule_thread = threading.Thread(
-            target=self.run_schedule, 
+            target=self.run_schedule,
             daemon=True
         )
         self.schedule_thread.start()
-        
+
     def stop(self):
         """停止定时任务"""
         self.running = False
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
         if self.schedule_thread:
             self.schedule_thread.join()
             self.schedule_thread = None
@@ -1,23 +1,100 @@
 import os
-import requests
 import json
 import time
 import random
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from playwright.sync_api import sync_playwright
+from urllib.parse import quote, urlsplit
+
+from src.core.config import config
+from src.core.browser_pool import browser_pool
+
+
+# 采集器在浏览器池中使用的上下文（与发布账号的上下文相互隔离）
+SCRAPER_CONTEXT_KEY = "scraper"
+
+# 一次性读取笔记详情页上需要的字段，避免逐个元素往返
+NOTE_DETAIL_SCRIPT = """() => {
+    const text = (selector) => {
+        const element = document.querySelector(selector);
+        return element ? element.textContent.trim() : null;
+    };
+    return {
+        title: text('.note-title'),
+        content: text('.note-content'),
+        images: Array.from(document.querySelectorAll('.note-img img'))
+            .map((img) => img.getAttribute('src')).filter(Boolean),
+        author: text('.user-nickname'),
+        likes: text('.like-count'),
+        comments: text('.comment-count'),
+        tags: Array.from(document.querySelectorAll('.tag-item')).map((tag) => tag.textContent.trim())
+    };
+}"""
+
+
+# 页面自身请求的数据接口：搜索结果分页、笔记详情
+SEARCH_API = "/api/sns/web/v1/search/notes"
+FEED_API = "/api/sns/web/v1/feed"
+
+# 笔记详情页服务端渲染时内嵌的数据（直接打开详情页时通常不再请求 FEED_API）
+INITIAL_STATE_SCRIPT = """(noteId) => {
+    try {
+        const state = window.__INITIAL_STATE__;
+        const detailMap = state && state.note && state.note.noteDetailMap;
+        const entry = detailMap && detailMap[noteId];
+        return entry && entry.note ? JSON.parse(JSON.stringify(entry.note)) : null;
+    } catch (e) {
+        return null;
+    }
+}"""
+
+
+class HostThrottle:
+    """按主机限制请求：并发数上限 + 相邻请求开始时间的最小间隔（带随机抖动）"""
+
+    def __init__(self, concurrency: int, interval: float):
+        self.concurrency = concurrency
+        self.interval = interval
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            # 先预约开始时间再等待，并发的请求依次排开而不是同时醒来
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            start = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start + self.interval * random.uniform(1, 1.5)
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
 
 class XiaohongshuScraper:
-    """小红书内容采集器"""
-    
-    def __init__(self, save_path: str = "./output"):
+    """小红书内容采集器
+
+    所有请求共用浏览器池中的一个无头上下文，在有限数量的页面上并发执行；
+    对同一主机的访问按 config.scraper 的并发数和最小间隔限速，不再逐条随机休眠。
+    默认（extraction_mode="network"）监听页面自身的JSON接口响应提取数据，
+    接口数据不可用时回退到读取页面元素；采集上下文不加载图片、字体和音视频。
+    使用完毕后调用 close()（或使用 async with）。
+    """
+
+    def __init__(self, save_path: str = "./output", pool=None):
         """
         初始化爬虫
-        
+
         Args:
             save_path: 保存数据的路径
+            pool: 浏览器池，默认使用全局浏览器池
         """
         self.save_path = save_path
+        self.pool = pool or browser_pool
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
@@ -25,257 +102,494 @@ class XiaohongshuScraper:
             "Origin": "https://www.xiaohongshu.com",
             "Referer": "https://www.xiaohongshu.com/",
         }
-        
+        self.context = None
+        self._idle_pages = []
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+        self._throttle: Optional[HostThrottle] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
         # 确保输出目录存在
         if not os.path.exists(self.save_path):
             os.makedirs(self.save_path)
-    
-    def search_by_keyword(self, keyword: str, limit: int = 20) -> List[Dict[str, Any]]:
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self) -> None:
+        """从浏览器池获取采集用的上下文（幂等）"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.context is not None:
+                return
+            scraper_config = config.scraper
+            self.context = await self.pool.acquire_context(
+                SCRAPER_CONTEXT_KEY,
+                headless=scraper_config.headless,
+                viewport={"width": 1280, "height": 800},
+                user_agent=self.headers["User-Agent"]
+            )
+            self.context.set_default_timeout(scraper_config.navigation_timeout)
+            self._page_semaphore = asyncio.Semaphore(scraper_config.page_concurrency)
+            self._throttle = HostThrottle(
+                scraper_config.per_host_concurrency,
+                scraper_config.min_request_interval / 1000
+            )
+
+            blocked = set(scraper_config.block_resource_types or [])
+            if blocked:
+                async def block_resources(route):
+                    if route.request.resource_type in blocked:
+                        await route.abort()
+                    else:
+                        await route.fallback()
+
+                await self.context.route("**/*", block_resources)
+
+    async def close(self) -> None:
+        """关闭页面并释放上下文"""
+        if self.context is None:
+            return
+        for page in self._idle_pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._idle_pages = []
+        context, self.context = self.context, None
+        await self.pool.release_context(SCRAPER_CONTEXT_KEY, discard=True, context=context)
+
+    @asynccontextmanager
+    async def _page(self):
+        """从页面池取出一个页面，用完放回（出错的页面直接关闭）"""
+        await self.start()
+        async with self._page_semaphore:
+            page = self._idle_pages.pop() if self._idle_pages else await self.context.new_page()
+            try:
+                yield page
+            except BaseException:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                raise
+            else:
+                self._idle_pages.append(page)
+
+    async def _goto(self, page, url: str) -> None:
+        """按主机限速后打开页面"""
+        async with self._throttle.slot(url):
+            await page.goto(url, wait_until="domcontentloaded")
+
+    async def search_by_keyword(self, keyword: str, limit: int = 20,
+                                mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         根据关键词搜索小红书内容，使用Playwright实现
-        
+
         Args:
             keyword: 搜索关键词
             limit: 最大获取数量
-            
+            mode: 提取方式（network/dom），默认取 config.scraper.extraction_mode
+
         Returns:
             包含搜索结果的列表
         """
         print(f"正在使用Playwright搜索关键词：{keyword}")
-        
+
+        mode = mode or config.scraper.extraction_mode
+        search_url = f"https://www.xiaohongshu.com/search_result?keyword={quote(keyword)}"
         notes = []
-        
+
         try:
-            with sync_playwright() as p:
-                # 启动浏览器
-                browser = p.chromium.launch(headless=False)  # headless=True为无头模式
-                context = browser.new_context(
-                    viewport={"width": 1280, "height": 800},
-                    user_agent=self.headers["User-Agent"]
-                )
-                page = context.new_page()
-                
-                # 访问小红书搜索页面
-                search_url = f"https://www.xiaohongshu.com/search_result?keyword={keyword}"
-                page.goto(search_url, wait_until="networkidle")
-                
-                # 等待内容加载
-                page.wait_for_selector(".search-result-container", timeout=30000)
-                
-                # 下拉页面获取更多内容
-                collected_count = 0
-                while collected_count < limit:
-                    # 滚动页面
-                    page.evaluate("window.scrollBy(0, 800)")
-                    page.wait_for_timeout(1000)  # 等待内容加载
-                    
-                    # 获取笔记元素
-                    note_elements = page.query_selector_all(".note-item")
-                    
-                    # 提取当前可见的笔记数据
-                    for element in note_elements[collected_count:]:
-                        if collected_count >= limit:
-                            break
-                            
-                        try:
-                            # 提取笔记ID
-                            note_link = element.query_selector("a")
-                            if note_link:
-                                href = note_link.get_attribute("href") or ""
-                                note_id = href.split("/")[-1] if href else f"note_{collected_count}_{int(time.time())}"
-                            else:
-                                note_id = f"note_{collected_count}_{int(time.time())}"
-                            
-                            # 提取笔记标题
-                            title_element = element.query_selector(".note-title")
-                            title = title_element.text_content() if title_element else f"{keyword}相关笔记_{collected_count}"
-                            
-                            # 提取笔记描述
-                            desc_element = element.query_selector(".note-desc")
-                            desc = desc_element.text_content() if desc_element else f"这是关于{keyword}的笔记内容描述"
-                            
-                            # 提取作者信息
-                            author_element = element.query_selector(".user-name")
-                            author = author_element.text_content() if author_element else f"用户_{random.randint(1000, 9999)}"
-                            
-                            # 构建笔记数据
-                            note_data = {
-                                "id": note_id,
-                                "title": title,
-                                "desc": desc,
-                                "likes": random.randint(100, 10000),  # 实际应从页面提取
-                                "comments": random.randint(10, 1000),  # 实际应从页面提取
-                                "author": author,
-                                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            }
-                            
-                            notes.append(note_data)
-                            collected_count += 1
-                        except Exception as note_error:
-                            print(f"提取笔记数据时出错: {str(note_error)}")
-                    
-                    # 如果没有新增笔记，可能已到底部
-                    if collected_count == len(notes):
-                        break
-                
-                # 关闭浏览器
-                browser.close()
-                
+            async with self._page() as page:
+                if mode == "network":
+                    notes = await self._search_network(page, search_url, keyword, limit)
+                if not notes:
+                    if mode == "network":
+                        print("未获取到搜索接口数据，改为从页面元素提取")
+                    notes = await self._search_dom(page, search_url, keyword, limit)
+
         except Exception as e:
             print(f"使用Playwright搜索关键词 '{keyword}' 时出错: {str(e)}")
-            
+
         # 保存结果
         if notes:
             self._save_results(keyword, notes)
-        
+
+        return notes
+
+    async def _search_network(self, page, search_url: str, keyword: str, limit: int) -> List[Dict[str, Any]]:
+        """监听搜索接口的响应获取结果，数据不足时滚动页面触发下一页
+
+        结束条件：数量达到 limit、接口返回 has_more=false、连续几页没有新笔记，
+        或滚动后 feed_idle_timeout 内没有新的一页。
+        """
+        notes: Dict[str, Dict[str, Any]] = {}
+        state = {'has_more': True, 'stalled_pages': 0}
+        page_arrived = asyncio.Event()
+        pending = set()
+
+        async def handle(response):
+            try:
+                payload = await response.json()
+            except Exception:
+                return
+            data = payload.get('data') or {}
+            added = 0
+            for item in data.get('items') or []:
+                note = self._parse_search_item(item, keyword, len(notes))
+                if note and note['id'] not in notes:
+                    notes[note['id']] = note
+                    added += 1
+            state['has_more'] = bool(data.get('has_more'))
+            state['stalled_pages'] = 0 if added else state['stalled_pages'] + 1
+            page_arrived.set()
+
+        def on_response(response):
+            if SEARCH_API in response.url and response.ok:
+                task = asyncio.ensure_future(handle(response))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        page.on("response", on_response)
+        try:
+            await self._goto(page, search_url)
+            idle_timeout = config.scraper.feed_idle_timeout / 1000
+            while len(notes) < limit and state['has_more'] and state['stalled_pages'] < 3:
+                try:
+                    await asyncio.wait_for(page_arrived.wait(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                page_arrived.clear()
+                if len(notes) < limit and state['has_more']:
+                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        finally:
+            page.remove_listener("response", on_response)
+            for task in list(pending):
+                task.cancel()
+
+        return list(notes.values())[:limit]
+
+    async def _search_dom(self, page, search_url: str, keyword: str, limit: int) -> List[Dict[str, Any]]:
+        """滚动页面并从笔记卡片元素中提取结果"""
+        notes = []
+        if page.url != search_url:
+            await self._goto(page, search_url)
+
+        # 等待内容加载
+        await page.wait_for_selector(".search-result-container")
+
+        # 下拉页面获取更多内容
+        while len(notes) < limit:
+            collected_count = len(notes)
+
+            # 滚动页面
+            await page.evaluate("window.scrollBy(0, 800)")
+            await page.wait_for_timeout(1000)  # 等待内容加载
+
+            # 获取笔记元素
+            note_elements = await page.query_selector_all(".note-item")
+
+            # 提取当前可见的笔记数据
+            for element in note_elements[collected_count:]:
+                if len(notes) >= limit:
+                    break
+
+                try:
+                    notes.append(await self._extract_search_item(element, keyword, len(notes)))
+                except Exception as note_error:
+                    print(f"提取笔记数据时出错: {str(note_error)}")
+
+            # 如果没有新增笔记，可能已到底部
+            if len(notes) == collected_count:
+                break
+
         return notes
-    
-    def search_by_topic(self, topic: str, limit: int = 20) -> List[Dict[str, Any]]:
+
+    async def _extract_search_item(self, element, keyword: str, index: int) -> Dict[str, Any]:
+        """从搜索结果的笔记卡片中提取数据"""
+        # 提取笔记ID
+        note_link = await element.query_selector("a")
+        href = (await note_link.get_attribute("href") or "") if note_link else ""
+        note_id = href.split("/")[-1] if href else f"note_{index}_{int(time.time())}"
+
+        # 提取笔记标题
+        title_element = await element.query_selector(".note-title")
+        title = await title_element.text_content() if title_element else f"{keyword}相关笔记_{index}"
+
+        # 提取笔记描述
+        desc_element = await element.query_selector(".note-desc")
+        desc = await desc_element.text_content() if desc_element else f"这是关于{keyword}的笔记内容描述"
+
+        # 提取作者信息
+        author_element = await element.query_selector(".user-name")
+        author = await author_element.text_content() if author_element else f"用户_{random.randint(1000, 9999)}"
+
+        # 构建笔记数据
+        return {
+            "id": note_id,
+            "title": title,
+            "desc": desc,
+            "likes": random.randint(100, 10000),  # 实际应从页面提取
+            "comments": random.randint(10, 1000),  # 实际应从页面提取
+            "author": author,
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    async def search_by_topic(self, topic: str, limit: int = 20,
+                              mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         根据话题搜索小红书内容
-        
+
         Args:
             topic: 话题名称
             limit: 最大获取数量
-            
+            mode: 提取方式（network/dom），默认取 config.scraper.extraction_mode
+
         Returns:
             包含搜索结果的列表
         """
         print(f"正在搜索话题：{topic}")
-        return self.search_by_keyword(f"#{topic}", limit)
-    
-    def get_note_detail(self, note_id: str) -> Optional[Dict[str, Any]]:
+        return await self.search_by_keyword(f"#{topic}", limit, mode)
+
+    async def get_note_detail(self, note_id: str, xsec_token: Optional[str] = None,
+                              mode: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         获取笔记详细内容，使用Playwright实现
-        
+
         Args:
             note_id: 笔记ID
-            
+            xsec_token: 搜索结果中附带的访问令牌（有则拼到详情页链接上）
+            mode: 提取方式（network/dom），默认取 config.scraper.extraction_mode
+
         Returns:
             笔记详细信息的字典
         """
         print(f"正在获取笔记详情：{note_id}")
-        
+
+        mode = mode or config.scraper.extraction_mode
+        note_url = f"https://www.xiaohongshu.com/explore/{note_id}"
+        if xsec_token:
+            note_url += f"?xsec_token={quote(xsec_token)}&xsec_source=pc_search"
+
         try:
-            with sync_playwright() as p:
-                # 启动浏览器
-                browser = p.chromium.launch(headless=False)
-                context = browser.new_context(
-                    viewport={"width": 1280, "height": 800},
-                    user_agent=self.headers["User-Agent"]
-                )
-                page = context.new_page()
-                
-                # 访问笔记页面
-                note_url = f"https://www.xiaohongshu.com/explore/{note_id}"
-                page.goto(note_url, wait_until="networkidle")
-                page.wait_for_selector(".note-container", timeout=30000)
-                
-                # 提取笔记标题
-                title_element = page.query_selector(".note-title")
-                title = title_element.text_content() if title_element else f"笔记_{note_id}"
-                
-                # 提取笔记内容
-                content_element = page.query_selector(".note-content")
-                content = content_element.text_content() if content_element else f"这是笔记{note_id}的详细内容..."
-                
-                # 提取图片URL
-                image_elements = page.query_selector_all(".note-img img")
-                images = []
-                for img in image_elements:
-                    src = img.get_attribute("src")
-                    if src:
-                        images.append(src)
-                
-                # 提取作者信息
-                author_element = page.query_selector(".user-nickname")
-                author_name = author_element.text_content() if author_element else f"用户_{random.randint(1000, 9999)}"
-                
-                # 提取点赞和评论数
-                likes_element = page.query_selector(".like-count")
-                likes = int(likes_element.text_content()) if likes_element else random.randint(100, 10000)
-                
-                comments_element = page.query_selector(".comment-count")
-                comments = int(comments_element.text_content()) if comments_element else random.randint(10, 1000)
-                
-                # 提取标签
-                tag_elements = page.query_selector_all(".tag-item")
-                tags = [tag.text_content() for tag in tag_elements] if tag_elements else [f"标签_{i}" for i in range(3)]
-                
-                # 构建详情数据
-                detail = {
-                    "id": note_id,
-                    "title": title,
-                    "content": content,
-                    "images": images if images else [f"image_{i}_{note_id}.jpg" for i in range(3)],
-                    "likes": likes,
-                    "comments": comments,
-                    "author": {
-                        "id": f"user_{random.randint(1000, 9999)}",
-                        "name": author_name,
-                        "followers": random.randint(100, 100000)
-                    },
-                    "publish_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "tags": tags
-                }
-                
-                # 关闭浏览器
-                browser.close()
-                
-                # 保存笔记详情
-                self._save_note_detail(note_id, detail)
-                
-                return detail
-                
+            async with self._page() as page:
+                card = None
+                if mode == "network":
+                    card = await self._note_card_network(page, note_id, note_url)
+
+                if card:
+                    detail = self._parse_note_card(note_id, card)
+                else:
+                    if mode == "network":
+                        print(f"未获取到笔记 {note_id} 的接口数据，改为从页面元素提取")
+                    else:
+                        await self._goto(page, note_url)
+                    await page.wait_for_selector(".note-container")
+                    detail = self._build_dom_detail(note_id, await page.evaluate(NOTE_DETAIL_SCRIPT))
+
+            # 保存笔记详情
+            self._save_note_detail(note_id, detail)
+
+            return detail
+
         except Exception as e:
             print(f"使用Playwright获取笔记 {note_id} 详情时出错: {str(e)}")
             return None
-    
+
+    async def _note_card_network(self, page, note_id: str, note_url: str) -> Optional[Dict[str, Any]]:
+        """打开详情页并获取笔记数据：优先读取页面内嵌的初始数据，其次等待详情接口的响应"""
+        loop = asyncio.get_running_loop()
+        feed_response = loop.create_future()
+
+        def on_response(response):
+            if FEED_API in response.url and response.ok and not feed_response.done():
+                feed_response.set_result(response)
+
+        page.on("response", on_response)
+        try:
+            await self._goto(page, note_url)
+            card = await page.evaluate(INITIAL_STATE_SCRIPT, note_id)
+            if card:
+                return card
+
+            try:
+                response = await asyncio.wait_for(
+                    feed_response, timeout=config.scraper.feed_idle_timeout / 1000
+                )
+                payload = await response.json()
+            except (asyncio.TimeoutError, ValueError):
+                return None
+            items = (payload.get('data') or {}).get('items') or []
+            return next((item.get('note_card') for item in items if item.get('id') == note_id), None)
+        finally:
+            page.remove_listener("response", on_response)
+            if not feed_response.done():
+                feed_response.cancel()
+
+    def _build_dom_detail(self, note_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """用页面元素中读取的字段构建详情数据"""
+        likes = self._parse_count(fields.get("likes"))
+        comments = self._parse_count(fields.get("comments"))
+        images = fields.get("images") or []
+        tags = fields.get("tags") or []
+
+        return {
+            "id": note_id,
+            "title": fields.get("title") or f"笔记_{note_id}",
+            "content": fields.get("content") or f"这是笔记{note_id}的详细内容...",
+            "images": images if images else [f"image_{i}_{note_id}.jpg" for i in range(3)],
+            "likes": likes if likes is not None else random.randint(100, 10000),
+            "comments": comments if comments is not None else random.randint(10, 1000),
+            "author": {
+                "id": f"user_{random.randint(1000, 9999)}",
+                "name": fields.get("author") or f"用户_{random.randint(1000, 9999)}",
+                "followers": random.randint(100, 100000)
+            },
+            "publish_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "tags": tags if tags else [f"标签_{i}" for i in range(3)]
+        }
+
+    @staticmethod
+    def _pick(data: Optional[Dict[str, Any]], *keys: str) -> Any:
+        """按顺序取第一个存在的字段（接口数据为下划线命名，页面内嵌数据为驼峰命名）"""
+        for key in keys:
+            if data and data.get(key) is not None:
+                return data[key]
+        return None
+
+    def _parse_search_item(self, item: Dict[str, Any], keyword: str, index: int) -> Optional[Dict[str, Any]]:
+        """解析搜索接口返回的一条结果（非笔记的推荐词等条目返回None）"""
+        card = item.get('note_card')
+        if not item.get('id') or not card:
+            return None
+        user = card.get('user') or {}
+        interact = card.get('interact_info') or {}
+        return {
+            "id": item['id'],
+            "title": card.get('display_title') or f"{keyword}相关笔记_{index}",
+            "desc": card.get('desc') or "",
+            "likes": self._parse_count(interact.get('liked_count')),
+            "comments": self._parse_count(interact.get('comment_count')),
+            "author": user.get('nickname') or user.get('nick_name') or "",
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "type": card.get('type'),
+            "xsec_token": item.get('xsec_token')
+        }
+
+    def _parse_note_card(self, note_id: str, card: Dict[str, Any]) -> Dict[str, Any]:
+        """解析笔记详情数据（详情接口的 note_card 或页面内嵌的 note）"""
+        user = card.get('user') or {}
+        interact = self._pick(card, 'interact_info', 'interactInfo') or {}
+        images = []
+        for image in self._pick(card, 'image_list', 'imageList') or []:
+            url = self._pick(image, 'url_default', 'urlDefault', 'url')
+            if not url:
+                url = next((info.get('url') for info in self._pick(image, 'info_list', 'infoList') or []
+                            if info.get('url')), None)
+            if url:
+                images.append(url)
+
+        publish_time = card.get('time')
+        if isinstance(publish_time, (int, float)):
+            publish_time = datetime.fromtimestamp(publish_time / 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+        return {
+            "id": note_id,
+            "title": card.get('title') or f"笔记_{note_id}",
+            "content": card.get('desc') or "",
+            "images": images,
+            "likes": self._parse_count(self._pick(interact, 'liked_count', 'likedCount')),
+            "comments": self._parse_count(self._pick(interact, 'comment_count', 'commentCount')),
+            "collects": self._parse_count(self._pick(interact, 'collected_count', 'collectedCount')),
+            "author": {
+                "id": self._pick(user, 'user_id', 'userId'),
+                "name": self._pick(user, 'nickname', 'nick_name', 'nickName'),
+                "followers": None
+            },
+            "publish_time": publish_time,
+            "tags": [tag.get('name') for tag in self._pick(card, 'tag_list', 'tagList') or [] if tag.get('name')]
+        }
+
+    async def get_note_details(self, note_ids: List[str],
+                               xsec_tokens: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """并发获取多篇笔记详情（并发数受页面池和主机限速约束），按输入顺序返回成功的结果"""
+        xsec_tokens = xsec_tokens or {}
+        details = await asyncio.gather(
+            *(self.get_note_detail(note_id, xsec_tokens.get(note_id)) for note_id in note_ids)
+        )
+        return [detail for detail in details if detail]
+
+    @staticmethod
+    def _parse_count(text: Any) -> Optional[int]:
+        """解析页面上的计数（如 "1234"、"1.2万"），无法解析时返回None"""
+        if isinstance(text, (int, float)):
+            return int(text)
+        if not text:
+            return None
+        text = text.strip().lower()
+        multiplier = 1
+        if text.endswith(("万", "w")):
+            text, multiplier = text[:-1], 10000
+        try:
+            return int(float(text) * multiplier)
+        except ValueError:
+            return None
+
     def _save_results(self, keyword: str, results: List[Dict[str, Any]]) -> None:
         """保存搜索结果到文件"""
         filename = os.path.join(self.save_path, f"{keyword}_{int(time.time())}.json")
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
         print(f"搜索结果已保存到: {filename}")
-    
+
     def _save_note_detail(self, note_id: str, detail: Dict[str, Any]) -> None:
         """保存笔记详情到文件"""
         filename = os.path.join(self.save_path, f"note_{note_id}.json")
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(detail, f, ensure_ascii=False, indent=2)
         print(f"笔记详情已保存到: {filename}")
-    
-    def collect_by_theme(self, theme: str, search_type: str = "keyword", limit: int = 20) -> List[Dict[str, Any]]:
+
+    async def collect_by_theme(self, theme: str, search_type: str = "keyword", limit: int = 20,
+                               detail_limit: int = 5) -> List[Dict[str, Any]]:
         """
         根据主题采集小红书内容
-        
+
         Args:
             theme: 主题关键词或话题
             search_type: 搜索类型，'keyword'或'topic'
             limit: 最大获取数量
-            
+            detail_limit: 最多获取详情的笔记数量
+
         Returns:
             包含采集结果的列表
         """
         if search_type == "keyword":
-            notes = self.search_by_keyword(theme, limit)
+            notes = await self.search_by_keyword(theme, limit)
         elif search_type == "topic":
-            notes = self.search_by_topic(theme, limit)
+            notes = await self.search_by_topic(theme, limit)
         else:
             raise ValueError("search_type 必须是 'keyword' 或 'topic'")
-        
-        # 获取详细内容
-        details = []
-        for note in notes[:min(5, len(notes))]:  # 限制获取详情的数量
-            note_id = note["id"]
-            detail = self.get_note_detail(note_id)
-            if detail:
-                details.append(detail)
-            # 随机延迟，避免请求过于频繁
-            time.sleep(random.uniform(1, 3))
-            
-        return details
+
+        # 并发获取详细内容（由主机限速控制访问频率）
+        notes = notes[:detail_limit]
+        return await self.get_note_details(
+            [note["id"] for note in notes],
+            {note["id"]: note["xsec_token"] for note in notes if note.get("xsec_token")}
+        )
+
+
+async def main():
+    try:
+        async with XiaohongshuScraper() as scraper:
+            print(await scraper.collect_by_theme("美食", "keyword", 10))
+    finally:
+        await browser_pool.close()
+
 
 if __name__ == "__main__":
-    scraper = XiaohongshuScraper()
-    print(scraper.collect_by_theme("美食", "keyword", 10))
+    asyncio.run(main())
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,20 +8,27 @@ import asyncio
 import os
 import json
 import uuid
+import hashlib
 from pathlib import Path
 import aiofiles
 
-# 导入我们重构后的核心模块
+# 导入我们重构后的核心模块（与GUI一致使用 src.core 包，数据库服务依赖包内相对导入）
 import sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from core.browser_manager import BrowserManager
-from core.write_xiaohongshu import XiaohongshuPoster
-from core.auth_manager import AuthManager
-from core.content_manager import ContentManager, ContentItem
-from core.session_manager import SessionManager
-from core.logger import logger
-from core.config import config
+from src.core.browser_manager import BrowserManager
+from src.core.auth_manager import AuthManager
+from src.core.content_manager import ContentManager, ContentItem
+from src.core.session_manager import SessionManager
+from src.core.publish_queue import PublishQueue
+from src.core.scheduler import TaskScheduler
+from src.core.publish_engine import publish_engine, ManualPublishPending
+from src.core.logger import logger
+from src.core.config import config
+from src.core.browser_pool import browser_pool
+from src.core.http_client import http_client
+from src.core.image_preprocess import image_preprocessor
+from src.config.database import db_manager
 
 app = FastAPI(
     title="小红书AI发布器",
@@ -43,7 +50,8 @@ browser_manager: Optional[BrowserManager] = None
 auth_manager: Optional[AuthManager] = None
 content_manager: Optional[ContentManager] = None
 session_manager: Optional[SessionManager] = None
-publisher: Optional[XiaohongshuPoster] = None
+publish_queue: Optional[PublishQueue] = None
+task_scheduler: Optional[TaskScheduler] = None
 
 # Pydantic模型
 class LoginRequest(BaseModel):
@@ -58,6 +66,8 @@ class ContentCreateRequest(BaseModel):
 
 class PublishRequest(BaseModel):
     content_id: str
+    user_id: Optional[int] = None  # 为空时使用默认账号
+    idempotency_key: Optional[str] = None
 
 class SessionResponse(BaseModel):
     session_id: str
@@ -125,11 +135,12 @@ async def get_status():
             'user_info': None
         }
         
-        # 检查登录状态
+        # 登录状态读取缓存，不访问浏览器页面；缓存过期时在后台刷新
         if auth_manager and browser_manager:
-            status['logged_in'] = await auth_manager.is_logged_in()
+            status['logged_in'] = bool(auth_manager.get_cached_login_state())
             if status['logged_in']:
-                status['user_info'] = await auth_manager.get_user_info()
+                status['user_info'] = auth_manager.login_state.user_info
+            status['login_state'] = auth_manager.login_state.to_dict()
         
         return {
             'success': True,
@@ -200,6 +211,47 @@ async def logout():
         logger.error(f"登出失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"登出失败: {str(e)}")
 
+async def save_upload_stream(file: UploadFile) -> Dict[str, Any]:
+    """流式保存上传文件：分块写入临时文件并同时计算哈希，超过大小上限立即中止，
+    完成后原子移入图片存储，内存占用与文件大小无关"""
+    image_store = content_manager.image_store
+    temp_path = image_store.create_temp_file()
+    hasher = hashlib.sha256()
+    size = 0
+    
+    try:
+        async with aiofiles.open(temp_path, 'wb') as out:
+            while True:
+                chunk = await file.read(config.web.upload_chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > config.web.max_upload_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"文件过大: {file.filename}（上限 {config.web.max_upload_size // (1024 * 1024)}MB）"
+                    )
+                hasher.update(chunk)
+                await out.write(chunk)
+        
+        # 移入存储涉及数据库写入，放到线程池中避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        file_path = await loop.run_in_executor(
+            None, image_store.put_file, temp_path, hasher.hexdigest(), size, file.filename
+        )
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        await file.close()
+    
+    return {
+        'filename': file.filename,
+        'path': file_path,
+        'size': size
+    }
+
 @app.post("/api/upload")
 async def upload_files(files: List[UploadFile] = File(...)):
     """上传文件"""
@@ -214,17 +266,7 @@ async def upload_files(files: List[UploadFile] = File(...)):
                 continue
             
             if file and allowed_file(file.filename):
-                # 读取文件数据
-                file_data = await file.read()
-                
-                # 保存文件
-                file_path = content_manager.save_image(file_data, file.filename)
-                
-                uploaded_files.append({
-                    'filename': file.filename,
-                    'path': file_path,
-                    'size': len(file_data)
-                })
+                uploaded_files.append(await save_upload_stream(file))
         
         return {
             'success': True,
@@ -232,6 +274,8 @@ async def upload_files(files: List[UploadFile] = File(...)):
             'data': uploaded_files
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"文件上传失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
@@ -295,29 +339,49 @@ async def get_content(content_id: str):
         logger.error(f"获取内容失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"获取内容失败: {str(e)}")
 
+# 内容列表每页数量上限
+MAX_CONTENT_PAGE_SIZE = 500
+
 @app.get("/api/content")
-async def list_contents(status: Optional[str] = None, limit: Optional[int] = None):
-    """列出内容"""
+async def list_contents(status: Optional[str] = None, limit: Optional[int] = None,
+                        cursor: Optional[str] = None):
+    """列出内容
+    
+    不传 limit 和 cursor 时与旧版一致，返回全部内容；传入任一参数时按键集分页
+    （每页最多 MAX_CONTENT_PAGE_SIZE 条），next_cursor 不为空时用它请求下一页。
+    """
     try:
         if not content_manager:
             raise HTTPException(status_code=500, detail="内容管理器未初始化")
         
-        contents = content_manager.list_contents(status, limit)
+        if limit is None and cursor is None:
+            contents = content_manager.list_contents(status)
+            next_cursor = None
+        else:
+            limit = max(1, min(limit or MAX_CONTENT_PAGE_SIZE, MAX_CONTENT_PAGE_SIZE))
+            try:
+                contents, next_cursor = content_manager.list_contents_page(status, limit, cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
         return {
             'success': True,
-            'data': [content.to_dict() for content in contents]
+            'data': [content.to_dict() for content in contents],
+            'next_cursor': next_cursor,
+            'total': content_manager.count_contents(status)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"列出内容失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"列出内容失败: {str(e)}")
 
 @app.post("/api/publish")
-async def publish_content(request: PublishRequest, background_tasks: BackgroundTasks):
-    """发布内容"""
+async def publish_content(request: PublishRequest, idempotency_key: Optional[str] = Header(None)):
+    """发布内容（写入持久化发布队列，由工作协程执行）"""
     try:
-        if not content_manager or not auth_manager or not publisher:
+        if not content_manager or not auth_manager or not publish_queue:
             raise HTTPException(status_code=500, detail="管理器未初始化")
         
         content_item = content_manager.get_content(request.content_id)
@@ -329,46 +393,82 @@ async def publish_content(request: PublishRequest, background_tasks: BackgroundT
         if not is_valid:
             raise HTTPException(status_code=400, detail=f"内容验证失败: {', '.join(errors)}")
         
-        # 检查登录状态
-        is_logged_in = await auth_manager.is_logged_in()
-        if not is_logged_in:
-            raise HTTPException(status_code=401, detail="请先登录")
-        
-        # 在后台执行发布任务
-        async def publish_task():
-            try:
-                # 更新内容状态为发布中
-                content_manager.update_content_status(request.content_id, "publishing")
-                
-                # 执行发布
-                success = await publisher.post_article(
-                    title=content_item.title,
-                    content=content_item.content,
-                    images=content_item.images
-                )
-                
-                if success:
-                    content_manager.update_content_status(request.content_id, "published")
-                    logger.info(f"内容发布成功: {request.content_id}")
-                else:
-                    content_manager.update_content_status(request.content_id, "failed", "发布失败")
-                    logger.error(f"内容发布失败: {request.content_id}")
-                    
-            except Exception as e:
-                content_manager.update_content_status(request.content_id, "failed", str(e))
-                logger.error(f"内容发布异常: {request.content_id}, {str(e)}", exc_info=True)
-        
-        background_tasks.add_task(publish_task)
+        # 检查登录状态（默认账号）
+        if request.user_id is None:
+            is_logged_in = await auth_manager.is_logged_in()
+            if not is_logged_in:
+                raise HTTPException(status_code=401, detail="请先登录")
+        
+        # 幂等键：请求体优先，其次 Idempotency-Key 请求头
+        job = await publish_queue.enqueue_async(
+            title=content_item.title,
+            content=content_item.content,
+            images=content_item.images,
+            content_id=request.content_id,
+            user_id=request.user_id,
+            idempotency_key=request.idempotency_key or idempotency_key
+        )
         
         return {
             'success': True,
-            'message': '发布任务已启动，请稍后查看发布状态'
+            'message': '发布任务已加入队列，请稍后查看发布状态',
+            'data': job.to_dict()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"发布内容失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"发布失败: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """获取发布任务状态"""
+    if not publish_queue:
+        raise HTTPException(status_code=500, detail="发布队列未初始化")
+    
+    job = await publish_queue.get_job_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    return {
+        'success': True,
+        'data': job.to_dict()
+    }
+
+async def run_publish_job(job):
+    """发布队列的任务处理：执行发布并同步内容状态"""
+    if job.content_id:
+        content_manager.update_content_status(job.content_id, "publishing")
+    
+    try:
+        result = await publish_engine.publish(job.user_id, job.title, job.content, job.get_images())
+        if result.status == "awaiting_manual":
+            raise ManualPublishPending(result.error_message)
+        if result.status != "published":
+            raise Exception(result.error_message or "发布失败")
+    except ManualPublishPending as e:
+        if job.content_id:
+            content_manager.update_content_status(job.content_id, "awaiting_manual", str(e))
+        raise
+    except Exception as e:
+        if job.content_id:
+            content_manager.update_content_status(job.content_id, "failed", str(e))
+        raise
+    
+    if job.content_id:
+        content_manager.update_content_status(job.content_id, "published")
+    logger.info(f"内容发布成功: {job.content_id}")
+
+async def enqueue_scheduled_task(payload):
+    """定时任务到期：写入发布队列（以任务ID和运行时间作为幂等键，重复触发只入队一次）"""
+    await publish_queue.enqueue_async(
+        title=payload['title'],
+        content=payload['content'],
+        user_id=payload['user_id'],
+        idempotency_key=f"schedule:{payload['task_id']}:{payload['run_time'].isoformat()}"
+    )
+
 @app.get("/api/sessions")
 async def list_sessions(status: Optional[str] = None, limit: Optional[int] = None):
     """列出会话"""
@@ -411,7 +511,7 @@ async def delete_session(session_id: str):
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化管理器"""
-    global browser_manager, auth_manager, content_manager, session_manager, publisher
+    global browser_manager, auth_manager, content_manager, session_manager, publish_queue, task_scheduler
     
     try:
         logger.info("正在初始化管理器...")
@@ -428,9 +528,13 @@ async def startup_event():
         # 初始化认证管理器
         await auth_manager.initialize(browser_manager)
         
-        # 初始化发布器
-        publisher = XiaohongshuPoster()
-        await publisher.initialize()
+        # 启动发布队列（进程重启前未完成的任务会继续执行）
+        publish_queue = PublishQueue(handler=run_publish_job)
+        await publish_queue.start()
+        
+        # 启动定时发布调度器，到期任务写入发布队列
+        task_scheduler = TaskScheduler(dispatcher=enqueue_scheduled_task)
+        await task_scheduler.start()
         
         logger.info("所有管理器初始化完成")
         
@@ -441,19 +545,33 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理资源"""
-    global browser_manager, auth_manager, content_manager, session_manager, publisher
+    global browser_manager, auth_manager, content_manager, session_manager, publish_queue, task_scheduler
     
     try:
         logger.info("正在清理资源...")
         
-        if publisher:
-            await publisher.cleanup()
+        if task_scheduler:
+            await task_scheduler.stop()
+        
+        if publish_queue:
+            await publish_queue.stop()
+        
+        await publish_engine.close()
         
         if auth_manager:
             await auth_manager.cleanup()
         
         if browser_manager:
-            await browser_manager.cleanup()
+            await browser_manager.close()
+        
+        # 关闭共享的浏览器进程
+        await browser_pool.close()
+        
+        await db_manager.dispose_async()
+        
+        await http_client.aclose()
+        http_client.close()
+        image_preprocessor.close()
         
         logger.info("资源清理完成")
         
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+# 测试使用独立的用户目录：配置文件、数据库和缓存都写到临时目录，不影响本机数据
+# （src 中的模块在导入时读取用户目录，必须在导入任何 src 模块之前设置）
+_home = tempfile.mkdtemp(prefix="xhs_test_home_")
+os.makedirs(os.path.join(_home, "Desktop"), exist_ok=True)
+os.environ["HOME"] = _home
+os.environ["USERPROFILE"] = _home
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 需要真实账号和手机验证码的手动脚本，不参与自动测试
+collect_ignore = ["test_xiaohognshu.py"]
+
+
+def pytest_configure(config):
+    from src.config.database import db_manager
+    from src.core.models import Base
+    Base.metadata.create_all(db_manager.engine)
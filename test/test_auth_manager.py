@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from src.core.auth_manager import AuthManager
+
+
+class FakePage:
+    def __init__(self, url):
+        self.url = url
+
+    def on(self, event, handler):
+        pass
+
+
+class FakeContext:
+    def __init__(self, cookies):
+        self._cookies = cookies
+
+    async def cookies(self):
+        return self._cookies
+
+    async def add_cookies(self, cookies):
+        pass
+
+
+class FakeBrowserManager:
+    context_key = "test-auth"
+
+    def __init__(self, cookies, url="about:blank"):
+        self.context = FakeContext(cookies)
+        self.page = FakePage(url)
+
+
+def cookie(name, expires=-1):
+    return {'name': name, 'value': 'x', 'domain': '.xiaohongshu.com', 'path': '/', 'expires': expires}
+
+
+def probe(cookies, url="about:blank"):
+    async def run():
+        auth = AuthManager()
+        await auth.initialize(FakeBrowserManager(cookies, url))
+        # 初始化时已填充缓存，首次读取即有结果
+        cached = auth.get_cached_login_state()
+        await auth.cleanup()
+        return cached, auth.login_state
+    return asyncio.run(run())
+
+
+def test_anonymous_cookies_are_logged_out():
+    logged_in, state = probe([cookie('a1'), cookie('webId')])
+    assert logged_in is False
+
+
+def test_auth_cookie_is_logged_in_and_caps_cache():
+    expires = time.time() + 60
+    logged_in, state = probe([cookie('a1'), cookie('web_session', expires)])
+    assert logged_in is True
+    assert state.expires_at <= expires
+
+
+def test_login_page_overrides_auth_cookie():
+    logged_in, state = probe([cookie('web_session')], "https://creator.xiaohongshu.com/login")
+    assert logged_in is False
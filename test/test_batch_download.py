@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.core.batch_download import BatchDownloader, DownloadItem
+from src.core.http_client import http_client
+
+BODY = bytes(range(256)) * 64
+ETAG = '"v2"'
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """支持 Range/If-Range 的最小文件服务器，记录每次请求的 Range 头"""
+    requests = []
+
+    def do_GET(self):
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        RangeHandler.requests.append(range_header)
+        if range_header and if_range in (None, ETAG):
+            start = int(range_header.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(BODY) - 1}/{len(BODY)}')
+            body = BODY[start:]
+        else:
+            self.send_response(200)
+            body = BODY
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/image.jpg"
+    server.shutdown()
+
+
+def download(item):
+    async def run():
+        try:
+            return await BatchDownloader(retries=1).download([item])
+        finally:
+            await http_client.aclose()
+    RangeHandler.requests = []
+    return asyncio.run(run())[0]
+
+
+def write_part(path, data, url, validator):
+    with open(path + '.part', 'wb') as f:
+        f.write(data)
+    with open(path + '.part.json', 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'validator': validator}, f)
+
+
+def test_resumes_part_of_same_url(tmp_path, server_url):
+    path = str(tmp_path / "a.jpg")
+    write_part(path, BODY[:1000], server_url, ETAG)
+
+    result = download(DownloadItem(server_url, path))
+    assert result.status == 'resumed'
+    assert RangeHandler.requests == ['bytes=1000-']
+    assert open(path, 'rb').read() == BODY
+    assert not (tmp_path / "a.jpg.part.json").exists()
+
+
+def test_discards_part_of_other_url(tmp_path, server_url):
+    path = str(tmp_path / "b.jpg")
+    write_part(path, b'x' * 1000, server_url + "?other", ETAG)
+
+    result = download(DownloadItem(server_url, path))
+    assert result.status == 'downloaded'
+    assert RangeHandler.requests == [None]
+    assert open(path, 'rb').read() == BODY
+
+
+def test_restarts_when_file_changed_on_server(tmp_path, server_url):
+    path = str(tmp_path / "c.jpg")
+    write_part(path, b'x' * 1000, server_url, '"v1"')
+
+    # If-Range 不匹配，服务器返回完整文件
+    result = download(DownloadItem(server_url, path))
+    assert result.status == 'downloaded'
+    assert RangeHandler.requests == ['bytes=1000-']
+    assert open(path, 'rb').read() == BODY
@@ -0,0 +1,79 @@
+import asyncio
+
+from src.core.browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+        self.pages = []
+
+    def on(self, event, handler):
+        pass
+
+    async def add_init_script(self, script):
+        pass
+
+    async def storage_state(self):
+        return {'cookies': [], 'origins': []}
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def is_connected(self):
+        return True
+
+    async def new_context(self, storage_state=None, **options):
+        return FakeContext(options)
+
+
+def make_pool():
+    pool = BrowserPool()
+    browser = FakeBrowser()
+
+    async def get_browser(headless):
+        return browser
+
+    pool._get_browser = get_browser
+    pool.playwright = object()
+    return pool
+
+
+def test_options_change_keeps_context_in_use_until_released():
+    async def run():
+        pool = make_pool()
+        old = await pool.acquire_context("user:1", headless=True, proxy={'server': 'http://a:1'})
+
+        # 持有者仍在使用旧上下文时切换代理
+        new = await pool.acquire_context("user:1", headless=True, proxy={'server': 'http://b:2'})
+        assert new is not old
+        assert not old.closed
+        assert pool.get_stats()['retired_contexts'] == 1
+
+        # 旧持有者释放后旧上下文才关闭，新上下文不受影响
+        await pool.release_context("user:1", context=old)
+        assert old.closed
+        assert not new.closed
+        assert pool.get_stats()['retired_contexts'] == 0
+        assert pool.has_context("user:1")
+
+        await pool.release_context("user:1", context=new)
+        assert not new.closed  # 保留为空闲上下文
+
+    asyncio.run(run())
+
+
+def test_options_change_closes_idle_context_immediately():
+    async def run():
+        pool = make_pool()
+        old = await pool.acquire_context("user:1", headless=True, proxy={'server': 'http://a:1'})
+        await pool.release_context("user:1", context=old)
+
+        await pool.acquire_context("user:1", headless=True, proxy={'server': 'http://b:2'})
+        assert old.closed
+        assert pool.get_stats()['retired_contexts'] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,45 @@
+import pytest
+
+from src.core.content_store import ContentStore
+
+
+def insert(store, content_id, created_at, status):
+    store.insert({
+        'id': content_id, 'title': content_id, 'content': '', 'images': [], 'tags': [],
+        'created_at': created_at, 'status': status, 'published_at': None, 'error_message': None
+    })
+
+
+def test_keyset_pages_cover_everything_once_with_ties():
+    store = ContentStore()
+    status = 'keyset_test'
+    # 同一时间戳的多条内容按 id 排序，翻页时不重复也不遗漏
+    rows = [('k1', 100.0), ('k2', 100.0), ('k3', 100.0), ('k4', 200.0), ('k5', 50.0)]
+    for content_id, created_at in rows:
+        insert(store, content_id, created_at, status)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.list_page(status, limit=2, cursor=cursor)
+        assert len(page) <= 2
+        seen.extend(item['id'] for item in page)
+        if cursor is None:
+            break
+
+    assert seen == ['k4', 'k3', 'k2', 'k1', 'k5']
+
+
+def test_last_page_has_no_cursor():
+    store = ContentStore()
+    status = 'keyset_exact'
+    for index in range(2):
+        insert(store, f'e{index}', 10.0 + index, status)
+
+    page, cursor = store.list_page(status, limit=2)
+    assert [item['id'] for item in page] == ['e1', 'e0']
+    assert cursor is None
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        ContentStore().list_page(cursor='not-a-cursor')
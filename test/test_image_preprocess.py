@@ -0,0 +1,33 @@
+import os
+import time
+
+from src.core.image_preprocess import ImagePreprocessor
+
+
+def write(path, size, age):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_trim_cache_evicts_least_recently_used(tmp_path):
+    preprocessor = ImagePreprocessor(cache_dir=tmp_path, max_bytes=250)
+    preprocessor.min_age = 60
+    write(tmp_path / "oldest.jpg", 100, 3 * 3600)
+    write(tmp_path / "older.jpg", 100, 2 * 3600)
+    write(tmp_path / "recent.jpg", 100, 10)
+
+    assert preprocessor.trim_cache() == 1
+    assert sorted(os.listdir(tmp_path)) == ["older.jpg", "recent.jpg"]
+
+
+def test_trim_cache_keeps_recently_used_files(tmp_path):
+    preprocessor = ImagePreprocessor(cache_dir=tmp_path, max_bytes=50)
+    preprocessor.min_age = 60
+    write(tmp_path / "old.jpg", 100, 3600)
+    write(tmp_path / "in_use.jpg", 100, 10)
+
+    # 最近用过的文件可能正在上传，即使仍超过上限也不淘汰
+    assert preprocessor.trim_cache() == 1
+    assert os.listdir(tmp_path) == ["in_use.jpg"]
@@ -0,0 +1,81 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from src.config.database import db_manager
+from src.core.image_store import ImageStore
+from src.core.models.content import ImageBlob
+
+
+def age_blob(path, seconds):
+    """把图片的登记时间提前，模拟已超过宽限期"""
+    digest = os.path.splitext(os.path.basename(path))[0]
+    session = db_manager.get_session_direct()
+    try:
+        session.query(ImageBlob).filter(ImageBlob.sha256 == digest).update(
+            {ImageBlob.created_at: datetime.utcnow() - timedelta(seconds=seconds)},
+            synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_unreferenced_blobs_are_collected_after_grace(tmp_path):
+    store = ImageStore(tmp_path)
+    kept = store.put_bytes(b'kept-image', 'a.jpg')
+    orphan = store.put_bytes(b'orphan-image', 'b.jpg')
+    fresh = store.put_bytes(b'fresh-image', 'c.jpg')
+    store.incref(kept)
+    age_blob(kept, 7200)
+    age_blob(orphan, 7200)
+
+    assert store.collect_garbage(grace_seconds=3600) == 1
+    assert os.path.exists(kept)
+    assert not os.path.exists(orphan)
+    # 刚上传、尚未关联内容的图片在宽限期内保留
+    assert os.path.exists(fresh)
+
+
+def test_same_content_is_stored_once_and_freed_with_last_reference(tmp_path):
+    store = ImageStore(tmp_path)
+    first = store.put_bytes(b'shared-image', 'a.jpg')
+    second = store.put_bytes(b'shared-image', 'b.png')
+    assert first == second
+
+    store.incref(first)
+    store.incref(second)
+    store.decref(first)
+    age_blob(first, 7200)
+    assert store.collect_garbage(grace_seconds=3600) == 0
+
+    store.decref(second)
+    assert store.collect_garbage(grace_seconds=3600) == 1
+    assert not os.path.exists(first)
+
+
+def test_disk_sweep_uses_wall_clock_grace(tmp_path):
+    store = ImageStore(tmp_path)
+    stale = tmp_path / "ab" / "cd" / ("ab" + "0" * 62 + ".jpg")
+    recent = tmp_path / "ab" / "cd" / ("ab" + "1" * 62 + ".jpg")
+    stale.parent.mkdir(parents=True)
+    for path, age in ((stale, 7200), (recent, 60)):
+        path.write_bytes(b'x')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    # 未登记的文件按修改时间判断宽限期，与本地时区无关
+    assert store.collect_garbage(grace_seconds=3600, sweep_disk=True) == 1
+    assert not stale.exists()
+    assert recent.exists()
+
+
+def test_maybe_collect_garbage_respects_interval(tmp_path):
+    store = ImageStore(tmp_path)
+    store.collect_garbage()
+    orphan = store.put_bytes(b'interval-image', 'a.jpg')
+    age_blob(orphan, 7200)
+
+    assert store.maybe_collect_garbage(interval=3600) == 0
+    assert os.path.exists(orphan)
+    store._last_gc = 0
+    assert store.maybe_collect_garbage(interval=3600) == 1
@@ -0,0 +1,69 @@
+import os
+import time
+
+from src.config.database import db_manager
+from src.core.media_cache import MediaCache
+from src.core.models.content import MediaCacheEntry
+
+
+def add_entry(cache, url, digest, size, age):
+    path = cache._object_path(digest, '.jpg')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'\0' * size)
+    session = db_manager.get_session_direct()
+    try:
+        session.merge(MediaCacheEntry(
+            url_key=cache._url_key(url), url=url, sha256=digest, path=str(path),
+            size=size, last_access=time.time() - age
+        ))
+        session.commit()
+    finally:
+        session.close()
+    return str(path)
+
+
+def make_cache(tmp_path, max_bytes):
+    session = db_manager.get_session_direct()
+    try:
+        session.query(MediaCacheEntry).delete()
+        session.commit()
+    finally:
+        session.close()
+    return MediaCache(root=tmp_path, max_bytes=max_bytes)
+
+
+def test_shared_content_is_counted_once(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=250)
+    digest = 'a' * 64
+    # 两个URL指向同一内容，只占 100 字节
+    shared = add_entry(cache, "http://x/1.jpg", digest, 100, 3 * 86400)
+    add_entry(cache, "http://x/2.jpg", digest, 100, 3 * 86400)
+    add_entry(cache, "http://x/3.jpg", 'b' * 64, 100, 3 * 86400)
+
+    assert cache.get_stats()['bytes'] == 200
+    assert cache.evict() == 0
+    assert os.path.exists(shared)
+
+
+def test_evict_keeps_files_still_referenced(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=150)
+    digest = 'c' * 64
+    shared = add_entry(cache, "http://y/1.jpg", digest, 100, 3 * 86400)
+    add_entry(cache, "http://y/2.jpg", digest, 100, 2 * 86400)
+    other = add_entry(cache, "http://y/3.jpg", 'd' * 64, 100, 86400)
+
+    # 淘汰最旧的两个URL后同一内容才不再被引用，此时总量已降到上限以内
+    assert cache.evict() == 2
+    assert not os.path.exists(shared)
+    assert os.path.exists(other)
+    assert cache.get_stats() == {'entries': 1, 'bytes': 100, 'max_bytes': 150}
+
+
+def test_touch_paths_protects_files_from_eviction(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=50)
+    path = add_entry(cache, "http://z/1.jpg", 'e' * 64, 100, 3 * 86400)
+
+    assert cache.touch_paths([path]) == []
+    assert cache.evict() == 0
+    assert os.path.exists(path)
+    assert cache.touch_paths([path + ".missing"]) == [path + ".missing"]
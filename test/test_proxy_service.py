@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.core.services.proxy_service import ProxyService
+
+
+class ProxyStubHandler(BaseHTTPRequestHandler):
+    """最小HTTP正向代理：记录收到的绝对URL并直接返回200"""
+    requests = []
+
+    def do_GET(self):
+        ProxyStubHandler.requests.append(self.path)
+        body = b'{"origin": "127.0.0.1"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_probe_goes_through_proxy(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        service = ProxyService()
+        monkeypatch.setattr(service, 'PROXY_TEST_URL', 'http://proxy-test.invalid/ip')
+        proxy_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        result = asyncio.run(service._probe_proxy(proxy_url, timeout=5))
+    finally:
+        server.shutdown()
+
+    assert result['test_result'], result['error_message']
+    assert result['latency'] is not None
+    assert ProxyStubHandler.requests == ['http://proxy-test.invalid/ip']
+
+
+def test_probe_reports_unreachable_proxy():
+    result = asyncio.run(ProxyService()._probe_proxy("http://127.0.0.1:1", timeout=2))
+    assert not result['test_result']
+    assert result['error_message']
@@ -0,0 +1,63 @@
+import asyncio
+
+from src.core import publish_engine as publish_engine_module
+from src.core.publish_engine import PublishEngine
+
+
+class FakePage:
+    def is_closed(self):
+        return False
+
+
+class FakePoster:
+    closed = []
+
+    def __init__(self, context_key, context_options):
+        self.context_key = context_key
+        self.context_options = context_options
+        self.page = FakePage()
+
+    async def initialize(self):
+        pass
+
+    async def post_article(self, title, content, images):
+        return True
+
+    async def close(self, force=False):
+        self.closed.append(self.context_key)
+
+
+def make_engine(monkeypatch, **kwargs):
+    FakePoster.closed = []
+    engine = PublishEngine(max_concurrency=2, proxy_interval=0, **kwargs)
+    monkeypatch.setattr(engine, '_prewarm', lambda user_id: None)
+    monkeypatch.setattr(engine, '_get_account_options', lambda user_id: ({}, None))
+    monkeypatch.setattr(publish_engine_module, 'XiaohongshuPoster', FakePoster)
+    return engine
+
+
+def test_finished_jobs_are_trimmed_to_history_limit(monkeypatch):
+    engine = make_engine(monkeypatch, max_history=2)
+
+    async def run():
+        return [await engine.publish(1, f"标题{index}", "正文") for index in range(3)]
+
+    results = asyncio.run(run())
+    # 最早完成的任务被移出历史，但等待方仍拿到了结果
+    assert [job.status for job in results] == ["published"] * 3
+    assert list(engine.jobs) == [results[1].job_id, results[2].job_id]
+    assert engine.get_stats()['published'] == 2
+
+
+def test_idle_posters_are_closed_least_recently_used_first(monkeypatch):
+    engine = make_engine(monkeypatch, max_idle_posters=2)
+
+    async def run():
+        for user_id in (1, 2, 1, 3):
+            await engine.publish(user_id, "标题", "正文")
+
+    asyncio.run(run())
+    # 账号1重新使用过，超出空闲上限时先关闭最久未用的账号2
+    assert FakePoster.closed == ["user:2"]
+    assert list(engine._posters) == [1, 3]
+    assert not engine._account_locks
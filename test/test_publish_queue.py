@@ -0,0 +1,153 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from src.config.database import db_manager
+from src.core.models.content import PublishQueueJob
+from src.core.publish_queue import PublishQueue
+from src.core.services.publish_queue_service import publish_queue_service
+
+
+def enqueue():
+    return publish_queue_service.enqueue(title="标题", content="正文", idempotency_key=uuid.uuid4().hex)
+
+
+def drain_pending():
+    """把其他用例遗留的待执行任务领取掉，避免干扰本用例"""
+    while publish_queue_service.claim_next("drain", 3600):
+        pass
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_cannot_finish():
+    drain_pending()
+    job = enqueue()
+
+    # 第一个工作者领取后租约立即过期（模拟进程崩溃或任务超时）
+    claimed = publish_queue_service.claim_next("worker-a", -1)
+    assert claimed.id == job.id
+
+    reclaimed = publish_queue_service.claim_next("worker-b", 60)
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 2
+
+    # 原工作者既不能续约也不能完成任务
+    assert not publish_queue_service.renew(job.id, "worker-a", 60)
+    assert not publish_queue_service.complete(job.id, "worker-a")
+    assert publish_queue_service.complete(job.id, "worker-b")
+    assert publish_queue_service.get_job(job.id).status == "succeeded"
+
+
+def test_worker_renews_lease_for_long_jobs():
+    drain_pending()
+    job = enqueue()
+
+    async def slow_handler(job):
+        await asyncio.sleep(1.0)
+
+    async def run():
+        queue = PublishQueue(handler=slow_handler, worker_count=1, poll_interval=0.05)
+        queue.lease_seconds = 0.3
+        await queue.start()
+        try:
+            # 任务执行时间超过租约，续约使其不会被其他工作者领取
+            await asyncio.sleep(0.6)
+            assert publish_queue_service.claim_next("thief", 60) is None
+            await asyncio.sleep(0.8)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+    finished = publish_queue_service.get_job(job.id)
+    assert finished.status == "succeeded"
+    assert finished.attempts == 1
+
+
+def test_worker_abandons_job_when_lease_is_lost():
+    drain_pending()
+    job = enqueue()
+    cancelled = []
+
+    async def slow_handler(job):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(job.id)
+            raise
+
+    def steal():
+        session = db_manager.get_session_direct()
+        try:
+            session.query(PublishQueueJob).filter(PublishQueueJob.id == job.id).update(
+                {PublishQueueJob.locked_by: "thief",
+                 PublishQueueJob.locked_until: datetime.utcnow() + timedelta(hours=1)},
+                synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    async def run():
+        queue = PublishQueue(handler=slow_handler, worker_count=1, poll_interval=0.05)
+        queue.lease_seconds = 0.3
+        await queue.start()
+        try:
+            await asyncio.sleep(0.2)
+            steal()
+            await asyncio.sleep(0.4)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+    assert cancelled == [job.id]
+    assert publish_queue_service.get_job(job.id).locked_by == "thief"
+
+
+def test_lost_lease_cancels_the_engine_publish(monkeypatch):
+    from src.core.publish_engine import publish_engine
+
+    drain_pending()
+    job = enqueue()
+    started, cancelled = asyncio.Event(), []
+
+    class SlowPoster:
+        async def post_article(self, title, content, images):
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(title)
+                raise
+            return True
+
+    async def get_poster(user_id, context_options):
+        return SlowPoster()
+
+    monkeypatch.setattr(publish_engine, '_get_poster', get_poster)
+    monkeypatch.setattr(publish_engine, '_prewarm', lambda user_id: None)
+
+    def steal():
+        session = db_manager.get_session_direct()
+        try:
+            session.query(PublishQueueJob).filter(PublishQueueJob.id == job.id).update(
+                {PublishQueueJob.locked_by: "thief",
+                 PublishQueueJob.locked_until: datetime.utcnow() + timedelta(hours=1)},
+                synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    async def run():
+        publish_engine._semaphore = None
+        queue = PublishQueue(worker_count=1, poll_interval=0.05)
+        queue.lease_seconds = 0.3
+        await queue.start()
+        try:
+            await asyncio.wait_for(started.wait(), timeout=2)
+            # 发布进行中租约被其他工作者接管：引擎中的发布也必须停止
+            steal()
+            await asyncio.sleep(0.4)
+            assert not publish_engine._tasks
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+    assert cancelled == ["标题"]
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.config.database import db_manager
+from src.core.models.content import ContentTemplate, ScheduledTask
+from src.core.services.scheduled_task_service import (
+    last_occurrence, next_occurrence, occurrence, scheduled_task_service
+)
+
+
+def test_monthly_occurrence_clamps_to_month_end():
+    anchor = datetime(2026, 1, 31, 9, 0)
+    assert occurrence(anchor, 'monthly', 1) == datetime(2026, 2, 28, 9, 0)
+    assert occurrence(anchor, 'monthly', 2) == datetime(2026, 3, 31, 9, 0)
+    assert occurrence(anchor, 'monthly', 13) == datetime(2027, 2, 28, 9, 0)
+
+
+def test_next_occurrence_after_long_downtime():
+    anchor = datetime(2026, 1, 1, 8, 0)
+    # 停机一年后直接算出下一次，不逐周期推进
+    assert next_occurrence(anchor, 'daily', datetime(2027, 1, 1, 8, 0)) == datetime(2027, 1, 2, 8, 0)
+    assert next_occurrence(anchor, 'weekly', datetime(2026, 1, 8, 7, 59)) == datetime(2026, 1, 8, 8, 0)
+    assert next_occurrence(anchor, 'monthly', datetime(2026, 3, 1, 8, 0)) == datetime(2026, 4, 1, 8, 0)
+    assert next_occurrence(anchor, 'once', datetime(2026, 1, 1, 8, 0)) is None
+    assert next_occurrence(anchor, 'once', datetime(2025, 12, 31)) == anchor
+
+
+def test_last_occurrence():
+    anchor = datetime(2026, 1, 31, 9, 0)
+    assert last_occurrence(anchor, 'daily', datetime(2026, 1, 30)) is None
+    assert last_occurrence(anchor, 'daily', datetime(2026, 2, 3, 8, 0)) == datetime(2026, 2, 2, 9, 0)
+    assert last_occurrence(anchor, 'monthly', datetime(2026, 3, 30)) == datetime(2026, 2, 28, 9, 0)
+    assert last_occurrence(anchor, 'once', datetime(2027, 1, 1)) == anchor
+
+
+def make_template():
+    session = db_manager.get_session_direct()
+    try:
+        template = ContentTemplate(user_id=1, name="模板", title="模板标题", content="模板正文")
+        session.add(template)
+        session.commit()
+        return template.id
+    finally:
+        session.close()
+
+
+def test_task_requires_template():
+    with pytest.raises(ValueError):
+        scheduled_task_service.create_task(1, "无模板", datetime.now(), 'daily')
+
+
+def test_claim_run_uses_template_and_skips_when_template_deleted():
+    template_id = make_template()
+    run_time = datetime.now().replace(microsecond=0) - timedelta(minutes=1)
+    task = scheduled_task_service.create_task(1, "每日发布", run_time, 'daily', template_id=template_id)
+
+    payload = scheduled_task_service.claim_run(task.id, run_time, datetime.now(), timedelta(hours=1))
+    assert payload['run']
+    assert payload['title'] == "模板标题"
+    assert payload['content'] == "模板正文"
+    assert payload['next_run_time'] == run_time + timedelta(days=1)
+
+    session = db_manager.get_session_direct()
+    try:
+        session.query(ContentTemplate).filter(ContentTemplate.id == template_id).delete()
+        session.commit()
+    finally:
+        session.close()
+
+    # 模板已删除：推进到下一次但不发布
+    next_run = payload['next_run_time']
+    payload = scheduled_task_service.claim_run(task.id, next_run, next_run, timedelta(hours=1))
+    assert not payload['run']
+    assert payload['skip_reason']
+    assert scheduled_task_service.get_task(task.id).run_count == 1
+
+    session = db_manager.get_session_direct()
+    try:
+        session.query(ScheduledTask).filter(ScheduledTask.id == task.id).delete()
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,37 @@
+import time
+
+from src.core.session_store import SessionStore
+
+
+def cookie(name, expires=-1):
+    return {'name': name, 'value': 'x', 'domain': '.xiaohongshu.com', 'path': '/', 'expires': expires}
+
+
+def test_anonymous_cookies_are_not_a_login(tmp_path):
+    store = SessionStore(tmp_path)
+    snapshot = store.import_cookies("default", [cookie('a1'), cookie('webId')])
+    assert not snapshot['logged_in']
+    assert not store.is_valid("default")
+
+
+def test_expired_auth_cookie_is_not_a_login(tmp_path):
+    store = SessionStore(tmp_path)
+    snapshot = store.import_cookies("default", [cookie('a1'), cookie('web_session', time.time() - 10)])
+    assert not snapshot['logged_in']
+    assert not store.is_valid("default")
+
+
+def test_session_expires_with_auth_cookie(tmp_path):
+    store = SessionStore(tmp_path)
+    expires = time.time() + 3600
+    snapshot = store.import_cookies("default", [cookie('a1', time.time() + 86400), cookie('web_session', expires)])
+    assert snapshot['logged_in']
+    assert snapshot['expires_at'] == expires
+    assert store.is_valid("default")
+
+
+def test_session_cookie_is_capped_by_snapshot_ttl(tmp_path):
+    store = SessionStore(tmp_path)
+    snapshot = store.import_cookies("default", [cookie('galaxy_creator_session_id')])
+    assert snapshot['logged_in']
+    assert time.time() < snapshot['expires_at'] < time.time() + 8 * 24 * 3600
@@ -1,6 +1,8 @@
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
+from src.core.http_client import http_client
+
 def get_page_content(url):
     """
     Fetches and parses the content of a given URL.
@@ -9,11 +11,11 @@ def get_page_content(url):
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-        response.encoding = response.apparent_encoding # Or manually set to 'utf-8' if you know the encoding
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Pass raw bytes so BeautifulSoup detects the encoding from the page itself
+        soup = BeautifulSoup(response.content, 'html.parser')
 
         # Find the main content container using its class name
         content_div = soup.find('div', class_='view')
@@ -25,7 +27,7 @@ def get_page_content(url):
         else:
             return f"Could not find the content container with class='view'.\n\nFull HTML:\n{soup.prettify()}"
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"An error occurred: {e}"
 
 if __name__ == '__main__':